@@ -1,11 +1,39 @@
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import re
 from collections import Counter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Версия токенизатора: увеличить при изменении _preprocess_text, стоп-слов
+# или основ — сохранённые токены идей будут пересчитаны
+TOKENIZER_VERSION = 1
+
+TOKEN_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset({'и', 'в', 'на', 'не', 'что', 'это', 'для', 'по', 'к', 'у'})
+
+# Окончания русских слов, от длинных к коротким; отбрасывается самое длинное
+ENDINGS = sorted({
+    'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ых', 'их',
+    'ьев', 'ья', 'ье', 'ьи', 'ью',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ый', 'ий', 'ой', 'ей', 'ую', 'юю',
+    'ов', 'ев', 'ах', 'ях', 'ам', 'ям', 'ом', 'ем',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й'
+}, key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+LOOKUP_CACHE_SIZE = 100000
+# Слово-разделитель текстов в склеенной пачке categorize_batch
+BATCH_SEPARATOR = '\x00'
+
+def _stem(word: str) -> str:
+    """Грубая основа слова: без окончания, но не короче MIN_STEM_LENGTH"""
+    word = word.replace('ё', 'е')
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
 class SimpleAICategorizer:
     """Упрощенный AI для категоризации идей"""
     
@@ -43,47 +71,137 @@ class SimpleAICategorizer:
             'экологический': 'экология'
         }
         
+        self._build_index()
+        
     def categorize(self, text: str, title: str = "") -> Dict:
-        full_text = (title + " " + text).lower()
+        return self.categorize_tokens(self._preprocess_text(title + " " + text))
+    
+    def categorize_tokens(self, tokens: List[str]) -> Dict:
+        """Категоризация по уже разобранным словам (результат _preprocess_text)"""
+        scores = self._score_tokens(tokens)
         
-        tokens = self._preprocess_text(full_text)
+        best = max(range(len(scores)), key=scores.__getitem__)
         
-        scores = {}
-        total_matches = 0
+        return {
+            'main_category': self.categories[best],
+            'confidence': scores[best],
+            'all_scores': dict(zip(self.categories, scores)),
+            'tokens_analyzed': len(tokens)
+        }
+    
+    def categorize_batch(self, texts: List[str], titles: Optional[List[str]] = None) -> np.ndarray:
+        """Категоризация пачки текстов
+
+        Возвращает матрицу (len(texts), len(self.categories)) с теми же
+        нормированными оценками, что и categorize. Пачка режется на слова
+        одним вызовом split, каждое уникальное слово разбирается по индексу
+        один раз и получает строку в матрице весов слово -> категория, а
+        оценки текстов складываются np.bincount.
+        """
+        if titles is not None:
+            texts = [title + " " + text for title, text in zip(titles, texts)]
         
-        for category, keywords in self.category_keywords.items():
-            matches = 0
-            for token in tokens:
-                if token in keywords:
-                    matches += 1
-                elif token in self.synonyms and self.synonyms[token] in keywords:
-                    matches += 0.8
-            
-            scores[category] = matches
-            total_matches += matches
+        # Тексты разделены отдельным словом: номер текста для каждого
+        # слова — число разделителей перед ним
+        separator = f" {BATCH_SEPARATOR} "
+        if any(BATCH_SEPARATOR in text for text in texts):
+            texts = [text.replace(BATCH_SEPARATOR, " ") for text in texts]
+        tokens = separator.join(texts).lower().split()
         
-        if total_matches > 0:
-            for category in scores:
-                scores[category] = scores[category] / total_matches
-        else:
-            for category in self.category_keywords:
-                scores[category] = 1 / len(self.category_keywords)
+        # Строка 0 — слова без категории. Куски со знаками препинания
+        # дорезаются регуляркой; стоп-слова и короткие слова в индекс не
+        # входят, фильтровать их не нужно.
+        rows = {BATCH_SEPARATOR: -1}
+        weights = [np.zeros(len(self.categories))]
+        for token in set(tokens).difference(rows):
+            parts = (token,) if token.isalnum() else TOKEN_RE.findall(token)
+            matches = [match for part in parts for match in self._lookup(part)]
+            rows[token] = len(weights) if matches else 0
+            if matches:
+                row = np.zeros(len(self.categories))
+                for col, weight in matches:
+                    row[col] += weight
+                weights.append(row)
+        weights = np.array(weights)
         
-        main_category = max(scores.items(), key=lambda x: x[1])
+        token_rows = np.fromiter(map(rows.__getitem__, tokens), dtype=np.intp, count=len(tokens))
+        text_ids = np.cumsum(token_rows < 0)
+        matched = token_rows > 0
+        text_ids, token_rows = text_ids[matched], token_rows[matched]
         
-        return {
-            'main_category': main_category[0],
-            'confidence': main_category[1],
-            'all_scores': scores,
-            'tokens_analyzed': len(tokens)
-        }
+        scores = np.empty((len(texts), len(self.categories)))
+        for col in range(len(self.categories)):
+            scores[:, col] = np.bincount(text_ids, weights=weights[token_rows, col], minlength=len(texts))
+        return self._normalize(scores)
+    
+    def _score_tokens(self, tokens: List[str]) -> List[float]:
+        scores = [0.0] * len(self.categories)
+        for token in tokens:
+            for col, weight in self._lookup(token):
+                scores[col] += weight
+        
+        total = sum(scores)
+        if total > 0:
+            return [score / total for score in scores]
+        return [1 / len(self.categories)] * len(self.categories)
+    
+    def _normalize(self, scores: np.ndarray) -> np.ndarray:
+        totals = scores.sum(axis=1, keepdims=True)
+        uniform = np.full_like(scores, 1 / len(self.categories))
+        return np.divide(scores, totals, out=uniform, where=totals > 0)
+    
+    def _build_index(self):
+        """Инвертированный индекс: слово (и его основа) -> веса категорий"""
+        self.categories = list(self.category_keywords)
+        
+        index: Dict[str, Dict[int, float]] = {}
+        stems: Dict[str, Dict[int, float]] = {}
+        
+        def put(target: Dict, word: str, col: int, weight: float):
+            # Если слово встречается и как ключевое, и как синоним — берём больший вес
+            weights = target.setdefault(word, {})
+            weights[col] = max(weights.get(col, 0.0), weight)
+        
+        for col, keywords in enumerate(self.category_keywords.values()):
+            for keyword in keywords:
+                put(index, keyword, col, 1.0)
+                put(stems, _stem(keyword), col, 1.0)
+            for synonym, keyword in self.synonyms.items():
+                if keyword in keywords:
+                    put(index, synonym, col, 0.8)
+                    put(stems, _stem(synonym), col, 0.8)
+        
+        self._index = {word: tuple(weights.items()) for word, weights in index.items()}
+        self._stem_index = {stem: tuple(weights.items()) for stem, weights in stems.items()}
+        self._lookup_cache: Dict[str, Tuple[Tuple[int, float], ...]] = {}
     
-    def find_duplicates(self, text: str, existing_ideas: List[Dict]) -> List[Dict]:
+    def _lookup(self, token: str) -> Tuple[Tuple[int, float], ...]:
+        """Веса категорий для слова: точное совпадение, иначе по основе"""
+        matches = self._lookup_cache.get(token)
+        if matches is None:
+            matches = self._index.get(token)
+            if matches is None:
+                matches = self._stem_index.get(_stem(token), ())
+            if len(self._lookup_cache) >= LOOKUP_CACHE_SIZE:
+                self._lookup_cache.clear()
+            self._lookup_cache[token] = matches
+        return matches
+    
+    def find_duplicates(self, text: str, existing_ideas: List[Dict],
+                        text_tokens: Optional[List[str]] = None) -> List[Dict]:
+        """Идеи, похожие на текст по коэффициенту Жаккара слов
+
+        Если у идеи есть ключ 'tokens' (сохранённые слова описания), описание
+        повторно не разбирается.
+        """
         duplicates = []
-        text_tokens = set(self._preprocess_text(text))
+        text_tokens = set(self._preprocess_text(text) if text_tokens is None else text_tokens)
         
         for idea in existing_ideas:
-            idea_tokens = set(self._preprocess_text(idea['description']))
+            if 'tokens' in idea:
+                idea_tokens = set(idea['tokens'])
+            else:
+                idea_tokens = set(self._preprocess_text(idea['description']))
             
             intersection = len(text_tokens.intersection(idea_tokens))
             union = len(text_tokens.union(idea_tokens))
@@ -102,14 +220,7 @@ class SimpleAICategorizer:
         return sorted(duplicates, key=lambda x: x['similarity'], reverse=True)
     
     def _preprocess_text(self, text: str) -> List[str]:
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        
-        tokens = text.split()
-        
-        stop_words = {'и', 'в', 'на', 'не', 'что', 'это', 'для', 'по', 'к', 'у'}
-        tokens = [t for t in tokens if t not in stop_words and len(t) > 2]
-        
-        return tokens
+        return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 2 and t not in STOP_WORDS]
     
     def _explain_similarity(self, tokens1: set, tokens2: set) -> str:
         common = tokens1.intersection(tokens2)
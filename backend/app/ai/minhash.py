@@ -0,0 +1,192 @@
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+class MinHashLSH:
+    """MinHash-сигнатуры множеств слов и LSH-индекс по полосам
+
+    Сигнатура — num_perm минимумов хеша слов при разных перестановках;
+    доля совпавших позиций двух сигнатур оценивает коэффициент Жаккара.
+    Сигнатура режется на bands полос по rows значений; тексты, у которых
+    совпала хотя бы одна полоса, считаются кандидатами в дубликаты. Для
+    каждой полосы ключи хранятся отсортированным массивом, поэтому поиск —
+    bands двоичных поисков вместо сравнения со всеми идеями. Новые записи
+    копятся в небольшом буфере и вливаются в массивы пачками.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 32, seed: int = 1,
+                 merge_threshold: int = 4096):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.merge_threshold = merge_threshold
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._keys: List[str] = []
+            self._row_of: Dict[str, int] = {}
+            self._alive = np.zeros(0, dtype=bool)
+            self._band_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+            self._band_rows = np.zeros((self.bands, 0), dtype=np.int32)
+            self._pending_keys: List[np.ndarray] = []
+            self._pending_rows: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._row_of
+
+    # Сигнатуры
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        """MinHash-сигнатура множества слов (uint32, длина num_perm)"""
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode('utf-8')) for token in set(tokens)), dtype=np.uint64
+        )
+        if not len(hashes):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Ключи полос: rows значений сигнатуры, свёрнутые в uint32
+
+        Для одной сигнатуры — вектор длины bands, для матрицы сигнатур —
+        матрица (кол-во сигнатур, bands).
+        """
+        bands = signatures.reshape(signatures.shape[:-1] + (self.bands, self.rows)).astype(np.uint64)
+        keys = np.zeros(bands.shape[:-1], dtype=np.uint64)
+        for column in range(self.rows):
+            keys = keys * np.uint64(0x9E3779B97F4A7C15) + bands[..., column]
+        return (keys ^ (keys >> np.uint64(32))).astype(np.uint32)
+
+    @staticmethod
+    def is_empty(signature: np.ndarray) -> bool:
+        return bool((signature == MAX_HASH).all())
+
+    # Изменение индекса
+
+    def insert(self, key: str, signature: np.ndarray):
+        with self._lock:
+            self.remove(key)
+            if self.is_empty(signature):
+                return
+            row = self._new_row(key)
+            self._pending_keys.append(self.band_keys(signature))
+            self._pending_rows.append(row)
+            if len(self._pending_rows) >= self.merge_threshold:
+                self._merge()
+
+    def load(self, keys: List[str], signatures: np.ndarray):
+        """Пакетная загрузка (signatures — матрица len(keys) × num_perm)"""
+        with self._lock:
+            for key in keys:
+                self.remove(key)
+            non_empty = ~(signatures == MAX_HASH).all(axis=1)
+            keys = [key for key, keep in zip(keys, non_empty) if keep]
+            signatures = signatures[non_empty]
+
+            rows = np.array([self._new_row(key) for key in keys], dtype=np.int32)
+            band_keys = np.ascontiguousarray(self.band_keys(signatures).T)
+            self._merge(band_keys, np.broadcast_to(rows, band_keys.shape))
+
+    def remove(self, key: str):
+        with self._lock:
+            row = self._row_of.pop(key, None)
+            if row is not None:
+                self._alive[row] = False
+
+    def _new_row(self, key: str) -> int:
+        row = len(self._keys)
+        self._keys.append(key)
+        self._row_of[key] = row
+        if row >= len(self._alive):
+            grown = np.zeros(max(1024, 2 * len(self._alive)), dtype=bool)
+            grown[:len(self._alive)] = self._alive
+            self._alive = grown
+        self._alive[row] = True
+        return row
+
+    def _merge(self, band_keys: Optional[np.ndarray] = None, band_rows: Optional[np.ndarray] = None):
+        """Вливание буфера (и/или пачки) в отсортированные массивы полос"""
+        if band_keys is None:
+            band_keys = np.zeros((self.bands, 0), dtype=np.uint32)
+            band_rows = np.zeros((self.bands, 0), dtype=np.int32)
+        if self._pending_rows:
+            band_keys = np.concatenate([band_keys, np.stack(self._pending_keys, axis=1)], axis=1)
+            band_rows = np.concatenate(
+                [band_rows, np.broadcast_to(np.array(self._pending_rows, dtype=np.int32),
+                                            (self.bands, len(self._pending_rows)))], axis=1)
+            self._pending_keys, self._pending_rows = [], []
+        if not band_keys.shape[1]:
+            return
+
+        order = np.argsort(band_keys, axis=1, kind='stable')
+        new_keys = np.take_along_axis(band_keys, order, axis=1)
+        new_rows = np.take_along_axis(band_rows, order, axis=1)
+
+        merged_keys = np.empty((self.bands, self._band_keys.shape[1] + new_keys.shape[1]), dtype=np.uint32)
+        merged_rows = np.empty(merged_keys.shape, dtype=np.int32)
+        for band in range(self.bands):
+            positions = np.searchsorted(self._band_keys[band], new_keys[band])
+            merged_keys[band] = np.insert(self._band_keys[band], positions, new_keys[band])
+            merged_rows[band] = np.insert(self._band_rows[band], positions, new_rows[band])
+        self._band_keys, self._band_rows = merged_keys, merged_rows
+
+    # Поиск
+
+    def query(self, signature: np.ndarray, limit: int = 50,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Кандидаты в дубликаты: (ключ, оценка сходства), лучшие первыми
+
+        Оценка — доля совпавших полос f, пересчитанная в Жаккара как
+        f ** (1 / rows); она нужна для порядка, точную проверку делает
+        вызывающий код.
+        """
+        if self.is_empty(signature):
+            return []
+        keys = self.band_keys(signature)
+
+        with self._lock:
+            found = []
+            for band in range(self.bands):
+                sorted_keys = self._band_keys[band]
+                start = np.searchsorted(sorted_keys, keys[band], side='left')
+                end = np.searchsorted(sorted_keys, keys[band], side='right')
+                if end > start:
+                    found.append(self._band_rows[band, start:end])
+            if self._pending_rows:
+                pending = np.stack(self._pending_keys) == keys
+                hits = np.repeat(np.array(self._pending_rows, dtype=np.int32), pending.sum(axis=1))
+                found.append(hits)
+            if not found:
+                return []
+
+            rows, counts = np.unique(np.concatenate(found), return_counts=True)
+            alive = self._alive[rows]
+            rows, counts = rows[alive], counts[alive]
+            best = np.argsort(-counts, kind='stable')
+            result = []
+            for index in best:
+                key = self._keys[rows[index]]
+                if key == exclude:
+                    continue
+                result.append((key, float((counts[index] / self.bands) ** (1 / self.rows))))
+                if len(result) >= limit:
+                    break
+            return result
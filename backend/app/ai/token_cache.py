@@ -0,0 +1,57 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+class TokenCache:
+    """Ограниченный LRU-кэш разобранных слов по id идеи со счётчиками"""
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, ...]]:
+        with self._lock:
+            tokens = self._items.get(key)
+            if tokens is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return tokens
+
+    def put(self, key: Hashable, tokens):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = tuple(tokens)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
@@ -0,0 +1,339 @@
+import asyncio
+import bisect
+import threading
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models, response_cache
+from .map_tiles import grid_index
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+IdeaKey = Tuple[str, str, str]
+
+ACTIVE_STATUSES = {
+    models.IdeaStatus.NEW.value,
+    models.IdeaStatus.UNDER_REVIEW.value,
+    models.IdeaStatus.IN_PROGRESS.value
+}
+TOP_PROBLEM_SCORE = 0.7
+TOP_PROBLEMS_LIMIT = 5
+# Тепловая карта: ячейка сетки в градусах (~500 м) и число самых плотных ячеек в ответе
+HEATMAP_CELL_DEG = 0.005
+HEATMAP_LIMIT = 1000
+
+def _value(enum_or_str) -> Optional[str]:
+    return getattr(enum_or_str, "value", enum_or_str)
+
+def _as_date(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def idea_key(idea) -> IdeaKey:
+    """Ключ счётчиков идеи: (категория, статус, приоритет)"""
+    return _value(idea.category), _value(idea.status), idea.priority
+
+def heatmap_cell(latitude: float, longitude: float) -> Tuple[int, int]:
+    """Ячейка тепловой карты (неотрицательные номера строки и столбца)"""
+    return int((latitude + 90) / HEATMAP_CELL_DEG), int((longitude + 180) / HEATMAP_CELL_DEG)
+
+class AnalyticsSnapshot:
+    """Агрегаты аналитики в памяти, поддерживаемые дельтами
+
+    Счётчики идей хранятся по ключу (категория, статус, приоритет) — всего и
+    по дням создания; пользователи и голоса — по дням; идеи для тепловой
+    карты — по ячейкам сетки HEATMAP_CELL_DEG. Запись обновляет счётчики
+    без пересчёта, а ответ за период собирается из дневных корзин
+    (не больше period_days шагов) и кэшируется до следующей дельты, поэтому
+    время ответа не зависит от размера таблицы ideas. reconcile() пересчитывает
+    всё из БД и сообщает о расхождениях.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._cache: Dict[Tuple[int, date], Dict] = {}
+        self._reset_state()
+
+    def _reset_state(self):
+        self.ideas_total: Counter = Counter()
+        self.ideas_daily: Dict[date, Counter] = {}
+        self.users_total = 0
+        self.users_daily: Counter = Counter()
+        self.votes_total = 0
+        self.votes_daily: Counter = Counter()
+        self.heatmap: Counter = Counter()
+        # Топ проблем: отсортированный список (-score, id) и заголовки
+        self._top: List[Tuple[float, str]] = []
+        self._top_titles: Dict[str, Tuple[str, float]] = {}
+        self._cache.clear()
+
+    # Загрузка и сверка
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load(db)
+                self._loaded = True
+
+    def _load(self, db: Session):
+        self._reset_state()
+        state = self._compute(db)
+        self.ideas_total = state["ideas_total"]
+        self.ideas_daily = state["ideas_daily"]
+        self.users_total = state["users_total"]
+        self.users_daily = state["users_daily"]
+        self.votes_total = state["votes_total"]
+        self.votes_daily = state["votes_daily"]
+        self.heatmap = state["heatmap"]
+        for idea_id, title, score in state["top"]:
+            self._top_add(idea_id, title, score)
+
+    @staticmethod
+    def _compute(db: Session) -> Dict:
+        """Полный пересчёт агрегатов из БД (несколько GROUP BY-запросов)"""
+        day = func.date(models.Idea.created_at)
+        ideas_total: Counter = Counter()
+        ideas_daily: Dict[date, Counter] = {}
+        rows = db.query(
+            models.Idea.category, models.Idea.status, models.Idea.priority, day,
+            func.count(models.Idea.id)
+        ).group_by(
+            models.Idea.category, models.Idea.status, models.Idea.priority, day
+        ).all()
+        for category, status, priority, created, count in rows:
+            key = (_value(category), _value(status), priority)
+            ideas_total[key] += count
+            ideas_daily.setdefault(_as_date(created), Counter())[key] += count
+
+        user_day = func.date(models.User.created_at)
+        users_daily = Counter({
+            _as_date(d): count for d, count in
+            db.query(user_day, func.count(models.User.id)).group_by(user_day).all()
+        })
+
+        vote_day = func.date(models.Vote.created_at)
+        votes_daily = Counter({
+            _as_date(d): count for d, count in
+            db.query(vote_day, func.count(models.Vote.id)).group_by(vote_day).all()
+        })
+
+        row = grid_index(db, (models.Idea.latitude + 90) / HEATMAP_CELL_DEG)
+        column = grid_index(db, (models.Idea.longitude + 180) / HEATMAP_CELL_DEG)
+        heatmap = Counter({
+            (r, c): count for r, c, count in
+            db.query(row, column, func.count(models.Idea.id)).group_by(row, column).all()
+        })
+
+        top = db.query(
+            models.Idea.id, models.Idea.title, models.Idea.importance_score
+        ).filter(
+            models.Idea.importance_score >= TOP_PROBLEM_SCORE
+        ).all()
+
+        return {
+            "ideas_total": ideas_total,
+            "ideas_daily": ideas_daily,
+            "users_total": sum(users_daily.values()),
+            "users_daily": users_daily,
+            "votes_total": sum(votes_daily.values()),
+            "votes_daily": votes_daily,
+            "heatmap": heatmap,
+            "top": top
+        }
+
+    def reconcile(self, db: Session) -> Dict:
+        """Пересчёт с нуля: возвращает расхождения и заменяет состояние"""
+        with self._lock:
+            state = self._compute(db)
+            drift = {}
+            if self._loaded:
+                drift = {
+                    "ideas": _counter_drift(self.ideas_total, state["ideas_total"]),
+                    "users": _counter_drift(self.users_daily, state["users_daily"]),
+                    "votes": _counter_drift(self.votes_daily, state["votes_daily"]),
+                    "heatmap": _counter_drift(self.heatmap, state["heatmap"])
+                }
+                drift = {name: diff for name, diff in drift.items() if diff}
+                if drift:
+                    logger.warning(f"Расхождение снимка аналитики с БД: {drift}")
+
+            self._load(db)
+            self._loaded = True
+            if drift:
+                response_cache.analytics_changed()
+            return drift
+
+    # Дельты
+
+    def idea_created(self, idea):
+        with self._lock:
+            if not self._loaded:
+                return
+            key = idea_key(idea)
+            self.ideas_total[key] += 1
+            self.ideas_daily.setdefault(_as_date(idea.created_at), Counter())[key] += 1
+            self.heatmap[heatmap_cell(idea.latitude, idea.longitude)] += 1
+            self._top_update(idea.id, idea.title, idea.importance_score)
+            self._cache.clear()
+
+    def idea_changed(self, idea, old_key: IdeaKey):
+        with self._lock:
+            if not self._loaded:
+                return
+            new_key = idea_key(idea)
+            if new_key != old_key:
+                daily = self.ideas_daily.setdefault(_as_date(idea.created_at), Counter())
+                self.ideas_total[old_key] -= 1
+                self.ideas_total[new_key] += 1
+                daily[old_key] -= 1
+                daily[new_key] += 1
+            self._top_update(idea.id, idea.title, idea.importance_score)
+            self._cache.clear()
+
+    def user_created(self, user):
+        with self._lock:
+            if not self._loaded:
+                return
+            self.users_total += 1
+            self.users_daily[_as_date(user.created_at)] += 1
+            self._cache.clear()
+
+    def vote_created(self, vote):
+        with self._lock:
+            if not self._loaded:
+                return
+            self.votes_total += 1
+            self.votes_daily[_as_date(vote.created_at)] += 1
+            self._cache.clear()
+
+    def _top_update(self, idea_id: str, title: str, score: Optional[float]):
+        if idea_id in self._top_titles:
+            self._top_remove(idea_id)
+        if score is not None and score >= TOP_PROBLEM_SCORE:
+            self._top_add(idea_id, title, score)
+
+    def _top_add(self, idea_id: str, title: str, score: float):
+        bisect.insort(self._top, (-score, idea_id))
+        self._top_titles[idea_id] = (title, score)
+
+    def _top_remove(self, idea_id: str):
+        _, score = self._top_titles.pop(idea_id)
+        i = bisect.bisect_left(self._top, (-score, idea_id))
+        if i < len(self._top) and self._top[i] == (-score, idea_id):
+            del self._top[i]
+
+    # Чтение
+
+    def get(self, db: Session, period_days: int = 30) -> Dict:
+        self.ensure_loaded(db)
+        today = date.today()
+        with self._lock:
+            cached = self._cache.get((period_days, today))
+            if cached is None:
+                cached = self._build(period_days, today)
+                self._cache[(period_days, today)] = cached
+            return cached
+
+    def _build(self, period_days: int, today: date) -> Dict:
+        total_ideas = active_ideas = completed_ideas = 0
+        for (category, status, priority), count in self.ideas_total.items():
+            total_ideas += count
+            if status in ACTIVE_STATUSES:
+                active_ideas += count
+            elif status == models.IdeaStatus.COMPLETED.value:
+                completed_ideas += count
+
+        by_category = {category.value: 0 for category in models.IdeaCategory}
+        by_status = {status.value: 0 for status in models.IdeaStatus}
+        by_priority = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+        ideas_by_day = {}
+        recent_ideas = recent_users = recent_votes = 0
+
+        for offset in range(period_days - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            recent_users += self.users_daily.get(day, 0)
+            recent_votes += self.votes_daily.get(day, 0)
+
+            daily = self.ideas_daily.get(day)
+            if not daily:
+                continue
+            day_total = 0
+            for (category, status, priority), count in daily.items():
+                if not count:
+                    continue
+                day_total += count
+                by_category[category] += count
+                if status is not None:
+                    by_status[status] += count
+                by_priority[priority] += count
+            if day_total:
+                ideas_by_day[day.isoformat()] = day_total
+                recent_ideas += day_total
+
+        return {
+            "total_ideas": total_ideas,
+            "active_ideas": active_ideas,
+            "completed_ideas": completed_ideas,
+            "total_users": self.users_total,
+            "by_category": by_category,
+            "by_status": by_status,
+            "by_priority": by_priority,
+            "top_problems": [
+                {"id": idea_id, "title": self._top_titles[idea_id][0], "score": -score}
+                for score, idea_id in self._top[:TOP_PROBLEMS_LIMIT]
+            ],
+            "heatmap": [
+                {
+                    "latitude": round((r + 0.5) * HEATMAP_CELL_DEG - 90, 6),
+                    "longitude": round((c + 0.5) * HEATMAP_CELL_DEG - 180, 6),
+                    "count": count
+                }
+                for (r, c), count in self.heatmap.most_common(HEATMAP_LIMIT) if count
+            ],
+            "trends": {
+                "ideas_per_day": round(recent_ideas / period_days, 2),
+                "users_per_day": round(recent_users / period_days, 2),
+                "votes_per_day": round(recent_votes / period_days, 2),
+                "ideas_by_day": ideas_by_day
+            }
+        }
+
+def _counter_drift(current: Counter, actual: Counter) -> Dict:
+    drift = {}
+    for key in set(current) | set(actual):
+        if current.get(key, 0) != actual.get(key, 0):
+            drift[str(key)] = {"snapshot": current.get(key, 0), "actual": actual.get(key, 0)}
+    return drift
+
+# Глобальный снимок аналитики процесса
+analytics_snapshot = AnalyticsSnapshot()
+
+def reconcile_once() -> Dict:
+    db = SessionLocal()
+    try:
+        return analytics_snapshot.reconcile(db)
+    finally:
+        db.close()
+
+async def run_reconcile_job(interval_seconds: float):
+    """Периодическая сверка снимка аналитики с БД"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(reconcile_once)
+        except Exception as e:
+            logger.error(f"Ошибка сверки снимка аналитики: {e}")
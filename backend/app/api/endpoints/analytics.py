@@ -1,7 +1,37 @@
-from fastapi import APIRouter
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Query, Response
+from sqlalchemy.orm import Session
+
+from ...database import get_db
+from ... import crud, http_cache
+from ...response_cache import ANALYTICS_TAG, response_cache
+from ...analytics_snapshot import analytics_snapshot
 
 router = APIRouter()
 
 @router.get("/analytics")
-async def get_analytics():
-    return {"total": 0}
\ No newline at end of file
+def get_analytics(
+    response: Response,
+    period_days: int = Query(30, ge=1, le=3650),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    # Тренды по дням сдвигаются и без записей — дата входит в ETag
+    not_modified = http_cache.conditional(response, if_none_match, ANALYTICS_TAG,
+                                          extra=date.today().isoformat())
+    if not_modified:
+        return not_modified
+    return crud.get_analytics_cached(db, period_days=period_days)
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Счётчики кэша ответов: попадания, промахи, вытеснения"""
+    return response_cache.stats()
+
+@router.post("/analytics/reconcile")
+def reconcile_analytics(db: Session = Depends(get_db)):
+    """Пересчёт снимка аналитики с нуля и отчёт о расхождениях"""
+    drift = analytics_snapshot.reconcile(db)
+    return {"status": "ok" if not drift else "drift_fixed", "drift": drift}
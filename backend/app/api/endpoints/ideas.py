@@ -1,11 +1,163 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import uuid
+
+from ...database import get_db
+from ... import crud, fast_json, http_cache, map_tiles, response_cache, schemas
 
 router = APIRouter()
 
-@router.get("/ideas")
-async def get_ideas():
-    return [{"id": 1, "title": "Тестовая идея", "category": "sport"}]
+def _bbox(bbox: Optional[str]):
+    if bbox is None:
+        return None
+    try:
+        return map_tiles.parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/ideas", response_model=List[schemas.IdeaResponse], response_class=fast_json.FastJSONResponse)
+def get_ideas(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[str] = Query(None, description="юг,запад,север,восток"),
+    city: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    try:
+        ideas = crud.get_ideas_cached(db, skip=skip, limit=limit, category=category,
+                                      status=status, priority=priority, bbox=_bbox(bbox), city=city)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.respond(ideas, response)
+
+@router.get("/ideas/page", response_model=schemas.IdeaPage, response_class=fast_json.FastJSONResponse)
+def get_ideas_page(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[str] = Query(None, description="юг,запад,север,восток"),
+    city: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Лента идей с курсорной пагинацией (стоимость не зависит от номера страницы)"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    try:
+        items, next_cursor = crud.get_ideas_page(db, cursor=cursor, limit=limit, category=category,
+                                                 status=status, priority=priority,
+                                                 bbox=_bbox(bbox), city=city, as_dicts=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.respond({"items": items, "next_cursor": next_cursor}, response)
+
+@router.get("/ideas/search", response_model=List[schemas.IdeaResponse], response_class=fast_json.FastJSONResponse)
+def search_ideas(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=500),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[str] = Query(None, description="юг,запад,север,восток"),
+    city: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Полнотекстовый поиск по заголовкам и описаниям идей"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    try:
+        ideas = crud.search_ideas(db, q, limit=limit, category=category, status=status,
+                                  priority=priority, bbox=_bbox(bbox), city=city, as_dicts=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.respond(ideas, response)
+
+@router.get("/cities/{city}/ideas", response_model=schemas.IdeaPage, response_class=fast_json.FastJSONResponse)
+def get_city_ideas(
+    city: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Новые идеи города с курсорной пагинацией"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    try:
+        items, next_cursor = crud.get_ideas_by_city_page(db, city, cursor=cursor, limit=limit, as_dicts=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.respond({"items": items, "next_cursor": next_cursor}, response)
+
+@router.get("/ideas/{idea_id}", response_model=schemas.IdeaResponse, response_class=fast_json.FastJSONResponse)
+def get_idea(
+    idea_id: uuid.UUID,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    not_modified = http_cache.conditional(response, if_none_match, response_cache.idea_tag(idea_id))
+    if not_modified:
+        return not_modified
+    idea = crud.get_idea_cached(db, idea_id)
+    if not idea:
+        raise HTTPException(status_code=404, detail="Idea not found")
+    return fast_json.respond(idea, response)
+
+@router.post("/ideas", response_model=schemas.IdeaResponse)
+def create_idea(idea: schemas.IdeaCreate, db: Session = Depends(get_db)):
+    return crud.create_idea(db, idea)
+
+@router.post("/ideas/duplicates", response_model=List[schemas.DuplicateCandidate])
+def find_duplicates(
+    check: schemas.DuplicateCheck,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Проверка описания новой идеи на дубликаты перед отправкой"""
+    return crud.find_duplicate_ideas(db, check.description, limit=limit)
+
+@router.post("/ideas/{idea_id}/vote", response_model=schemas.VoteResponse)
+def vote_for_idea(
+    idea_id: uuid.UUID,
+    vote_type: str = Body("up", embed=True, pattern="^(up|down)$"),
+    x_user_id: Optional[uuid.UUID] = Header(None),
+    x_visitor_id: Optional[uuid.UUID] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Голос за идею; повторный голос того же пользователя меняет его тип
 
-@router.post("/ideas")
-async def create_idea():
-    return {"status": "created"}
\ No newline at end of file
+    Голосующий — пользователь из X-User-Id или посетитель сайта из
+    X-Visitor-Id (id, который браузер хранит в localStorage).
+    """
+    if not crud.get_idea(db, idea_id):
+        raise HTTPException(status_code=404, detail="Idea not found")
+    
+    if x_user_id is not None:
+        if not crud.get_user(db, x_user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        user_id = x_user_id
+    elif x_visitor_id is not None:
+        user_id = crud.get_visitor_user(db, x_visitor_id).id
+    else:
+        raise HTTPException(status_code=400, detail="X-User-Id or X-Visitor-Id header required")
+    
+    return crud.create_vote(db, schemas.VoteCreate(idea_id=idea_id, vote_type=vote_type), user_id)
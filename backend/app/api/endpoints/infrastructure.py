@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.orm import Session
+from typing import Optional
+import io
+
+from ...database import get_db
+from ... import infrastructure_loader
+
+router = APIRouter()
+
+@router.post("/infrastructure/import")
+def import_infrastructure(
+    file: UploadFile = File(..., description="GeoJSON, GeoJSON Lines или CSV"),
+    format: Optional[str] = Query(None, pattern="^(geojson|csv)$", description="По умолчанию по расширению"),
+    replace: bool = False,
+    type_property: str = "type",
+    db: Session = Depends(get_db)
+):
+    """Импорт справочника инфраструктуры в работающий сервер
+
+    Объекты сразу попадают в пространственный индекс этого процесса, а
+    идеи затронутых категорий ставятся в очередь пересчёта приоритетов.
+    """
+    fmt = format or infrastructure_loader.detect_format(file.filename or "")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        count = infrastructure_loader.load_infrastructure(
+            db, stream, fmt, replace=replace, type_property=type_property
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Ошибка разбора файла: {e}")
+    finally:
+        stream.detach()
+    return {"status": "ok", "loaded": count}
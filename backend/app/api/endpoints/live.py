@@ -0,0 +1,103 @@
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import os
+
+from ... import map_tiles, schemas
+from ...live_updates import LiveBusFull, live_bus
+
+router = APIRouter()
+
+# Комментарий-пинг SSE держит соединение открытым через прокси
+HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+
+def _parse_bbox(bbox: Optional[str]):
+    return map_tiles.parse_bbox(bbox) if bbox else None
+
+@router.websocket("/live/ws")
+async def live_websocket(
+    websocket: WebSocket,
+    bbox: Optional[str] = None,
+    category: Optional[List[schemas.IdeaCategory]] = Query(None)
+):
+    """События по идеям в bbox и категориях подписки
+
+    Клиент меняет фильтр сообщением {"bbox": "юг,запад,север,восток" | null,
+    "category": [...] | null}, не переподключаясь.
+    """
+    try:
+        subscription = live_bus.subscribe(_parse_bbox(bbox), category)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+    except LiveBusFull:
+        await websocket.close(code=1013)
+        return
+
+    async def send():
+        while True:
+            await websocket.send_text(await subscription.get())
+
+    sender = None
+    try:
+        await websocket.accept()
+        sender = asyncio.create_task(send())
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                categories = [schemas.IdeaCategory(item) for item in message.get("category") or []]
+                subscription.update(_parse_bbox(message.get("bbox")), categories)
+            except (AttributeError, TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if sender is not None:
+            sender.cancel()
+        live_bus.unsubscribe(subscription)
+
+@router.get("/live/events")
+async def live_events(
+    bbox: Optional[str] = Query(None, description="юг,запад,север,восток"),
+    category: Optional[List[schemas.IdeaCategory]] = Query(None)
+):
+    """Те же события через Server-Sent Events (фильтр меняется переподключением)"""
+    try:
+        bounds = _parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if live_bus.full:
+        raise HTTPException(status_code=503, detail="Слишком много подписчиков")
+
+    async def stream():
+        # Подписка — только в запущенном генераторе: если клиент отключился
+        # раньше, StreamingResponse отменит ответ и снимать будет нечего
+        try:
+            subscription = live_bus.subscribe(bounds, category)
+        except LiveBusFull:
+            return
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            live_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/live/stats")
+def get_live_stats():
+    """Подписчики и заполненность их очередей"""
+    return live_bus.stats()
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from ...database import get_db
+from ... import crud, fast_json, http_cache, map_tiles, schemas
+
+router = APIRouter()
+
+def _bbox(bbox: str):
+    try:
+        return map_tiles.parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/map/tiles/{z}/{x}/{y}")
+def get_map_tile(
+    response: Response,
+    z: int = Path(..., ge=0, le=map_tiles.MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Кластеры идей одного тайла z/x/y"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Тайл вне сетки зума")
+    return map_tiles.get_tile(db, z, x, y, category, status)
+
+@router.get("/map/clusters")
+def get_map_clusters(
+    response: Response,
+    bbox: str = Query(..., description="юг,запад,север,восток"),
+    zoom: int = Query(..., ge=0, le=map_tiles.MAX_ZOOM),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Кластеры идей в видимой области карты"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    return map_tiles.get_clusters(db, _bbox(bbox), zoom, category, status)
+
+@router.get("/map/heatmap")
+def get_map_heatmap(
+    response: Response,
+    bbox: str = Query(..., description="юг,запад,север,восток"),
+    zoom: int = Query(..., ge=0, le=map_tiles.MAX_ZOOM),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Ячейки тепловой карты в видимой области"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    return map_tiles.get_heatmap(db, _bbox(bbox), zoom, category, status)
+
+@router.get("/map/markers", response_model=List[schemas.IdeaMarker],
+            response_class=fast_json.FastJSONResponse)
+def get_map_markers(
+    response: Response,
+    bbox: Optional[str] = Query(None, description="юг,запад,север,восток"),
+    limit: int = Query(1000, ge=1, le=10000),
+    category: Optional[schemas.IdeaCategory] = None,
+    status: Optional[schemas.IdeaStatus] = None,
+    priority: Optional[str] = None,
+    city: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Метки идей без кластеризации: координаты, категория, заголовок и важность"""
+    not_modified = http_cache.conditional(response, if_none_match)
+    if not_modified:
+        return not_modified
+    try:
+        markers = crud.get_idea_markers(db, limit=limit, category=category, status=status,
+                                        priority=priority, bbox=_bbox(bbox) if bbox else None, city=city)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json.respond(markers, response)
+
+@router.get("/map/stats")
+def get_map_stats():
+    """Состояние кэша тайлов"""
+    return map_tiles.tile_cache.stats()
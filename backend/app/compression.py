@@ -0,0 +1,157 @@
+"""Сжатие ответов Brotli / GZip
+
+CompressionMiddleware выбирает кодировку по Accept-Encoding (br, если
+установлен пакет brotli, иначе gzip) и сжимает только текстовые типы
+(JSON, HTML, JS, CSS, SVG) размером от minimum_size байт; потоковые
+ответы сжимаются по частям. Строгий ETag сжатого ответа становится
+слабым: байты тела отличаются от несжатого варианта.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotli необязателен: без пакета остаётся gzip
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml"
+)
+
+class _GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        # wbits=31 — формат gzip (заголовок и CRC), а не голый deflate
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+def _accepted(accept_encoding: str):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых (q=0)"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    return accepted
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, scope: Scope):
+        accepted = _accepted(Headers(scope=scope).get("Accept-Encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return _BrotliCompressor(self.brotli_quality)
+        if "gzip" in accepted:
+            return _GzipCompressor(self.gzip_level)
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        compressor = self._compressor(scope) if scope["type"] == "http" else None
+        if compressor is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressionResponder(self.app, compressor, self.minimum_size)(scope, receive, send)
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, compressor, minimum_size: int):
+        self.app = app
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        # None — решение ещё не принято; False — ответ идёт как есть
+        self.compressing: Optional[bool] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _compressible(self) -> bool:
+        headers = Headers(raw=self.initial_message["headers"])
+        content_type = headers.get("content-type", "")
+        return (
+            "content-encoding" not in headers
+            and self.initial_message.get("status", 200) not in (204, 304)
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _set_headers(self, length: Optional[int]):
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.compressor.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            opaque = etag.strip('"')
+            headers["ETag"] = f'W/"{opaque}"'
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Заголовки отправляются вместе с первой частью тела
+            self.initial_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing is None:
+            self.compressing = self._compressible() and (more_body or len(body) >= self.minimum_size)
+            if not self.compressing:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            if more_body:
+                self._set_headers(None)
+                body = self.compressor.process(body) + self.compressor.flush()
+            else:
+                body = self.compressor.process(body) + self.compressor.finish()
+                self._set_headers(len(body))
+            await self.send(self.initial_message)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if not self.compressing:
+            await self.send(message)
+            return
+        chunk = self.compressor.process(body)
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,14 +1,21 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import func, desc, case, and_, inspect, select, text, tuple_, type_coerce, update, DateTime, String
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Tuple
+import base64
+import json
 import uuid
 from datetime import datetime, timedelta
 
-from . import models, schemas
+from . import models, schemas, geo_index, duplicate_index, priority_updates, map_tiles, spatial, search, response_cache, fast_json, live_updates
+from .analytics_snapshot import analytics_snapshot, idea_key
+from .vote_buffer import vote_buffer
 
 # User CRUD
 def get_user(db: Session, user_id: uuid.UUID):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.query(models.User).filter(models.User.id == str(user_id)).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -24,11 +31,51 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    analytics_snapshot.user_created(db_user)
+    response_cache.analytics_changed()
     return db_user
 
 # Idea CRUD
 def get_idea(db: Session, idea_id: uuid.UUID):
-    return db.query(models.Idea).filter(models.Idea.id == idea_id).first()
+    return db.query(models.Idea).filter(models.Idea.id == str(idea_id)).first()
+
+def _priority_filter(priority: str):
+    """Условие на приоритет как диапазон importance_score (использует индекс)"""
+    bounds = {name: threshold for name, threshold in models.PRIORITY_THRESHOLDS}
+    names = [name for name, _ in models.PRIORITY_THRESHOLDS]
+    score = models.Idea.importance_score
+    
+    if priority == "low":
+        return score < models.PRIORITY_THRESHOLDS[-1][1]
+    if priority not in bounds:
+        return models.Idea.priority == priority
+    
+    condition = score >= bounds[priority]
+    position = names.index(priority)
+    if position > 0:
+        condition = and_(condition, score < bounds[names[position - 1]])
+    return condition
+
+def _filter_ideas(query, category: Optional[str] = None, status: Optional[str] = None,
+                  priority: Optional[str] = None):
+    if category:
+        query = query.filter(models.Idea.category == category)
+    if status:
+        query = query.filter(models.Idea.status == status)
+    if priority:
+        query = query.filter(_priority_filter(priority))
+    return query
+
+def _filter_area(db: Session, query, bbox: Optional[spatial.Bounds] = None, city: Optional[str] = None):
+    """Фильтр по bbox и/или границам города через пространственный индекс"""
+    if city:
+        bounds = spatial.city_bounds(city)
+        if bounds is None:
+            raise ValueError(f"Неизвестный город: {city}")
+        query = query.filter(spatial.bbox_condition(db, bounds))
+    if bbox:
+        query = query.filter(spatial.bbox_condition(db, bbox))
+    return query
 
 def get_ideas(
     db: Session,
@@ -36,43 +83,184 @@ def get_ideas(
     limit: int = 100,
     category: Optional[str] = None,
     status: Optional[str] = None,
-    priority: Optional[str] = None
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None,
+    as_dicts: bool = False
 ):
-    query = db.query(models.Idea)
+    """Идеи по убыванию важности; as_dicts — словари ответа (fast_json) вместо ORM-объектов"""
+    query = _filter_ideas(db.query(models.Idea), category, status, priority)
+    query = _filter_area(db, query, bbox, city)
+    query = query.order_by(desc(models.Idea.importance_score)).offset(skip).limit(limit)
+    return fast_json.idea_dicts(query) if as_dicts else query.all()
+
+def search_ideas(
+    db: Session,
+    q: str,
+    limit: int = 50,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None,
+    as_dicts: bool = False
+) -> List[models.Idea]:
+    """Идеи, подходящие под поисковый запрос, по убыванию релевантности"""
+    query = _filter_ideas(db.query(models.Idea), category, status, priority)
+    query = search.search(db, _filter_area(db, query, bbox, city), q)
+    if query is None:
+        return []
+    query = query.limit(limit)
+    return fast_json.idea_dicts(query) if as_dicts else query.all()
+
+def get_idea_markers(
+    db: Session,
+    limit: int = 1000,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None
+) -> List[dict]:
+    """Метки идей для карты (IdeaMarker) по убыванию важности — без описания и фото"""
+    query = _filter_ideas(db.query(models.Idea), category, status, priority)
+    query = _filter_area(db, query, bbox, city)
+    query = query.order_by(desc(models.Idea.importance_score)).limit(limit)
+    return fast_json.marker_dicts(query)
+
+def get_ideas_by_city(db: Session, city: str, limit: int = 100):
+    query = _filter_area(db, db.query(models.Idea), city=city)
+    return query.order_by(desc(models.Idea.created_at)).limit(limit).all()
+
+# Keyset-пагинация: курсор — (ключ сортировки, id) последней строки страницы
+def _encode_cursor(kind: str, value, idea_id: str) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps([kind, value, idea_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, kind: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_kind, value, idea_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if cursor_kind != kind:
+        raise ValueError("Курсор относится к другой выборке")
+    if isinstance(value, dict):
+        value = datetime.fromisoformat(value["dt"])
+    return value, idea_id
+
+def _sort_key(db: Session, column):
+    """Колонка в том виде, в каком её сравнивает БД
     
-    if category:
-        query = query.filter(models.Idea.category == category)
-    if status:
-        query = query.filter(models.Idea.status == status)
-    if priority:
-        query = query.filter(models.Idea.priority == priority)
+    SQLite хранит даты строками, причём CURRENT_TIMESTAMP — без микросекунд,
+    поэтому курсор по дате сравнивается с исходным текстом колонки.
+    """
+    if isinstance(column.type, DateTime) and db.get_bind().dialect.name == "sqlite":
+        return type_coerce(column, String)
+    return column
+
+def _keyset_page(db: Session, query, kind: str, column, cursor: Optional[str], limit: int,
+                 as_dicts: bool = False):
+    key = _sort_key(db, column)
+    if cursor:
+        value, idea_id = _decode_cursor(cursor, kind)
+        query = query.filter(tuple_(key, models.Idea.id) < tuple_(value, idea_id))
     
-    return query.order_by(desc(models.Idea.importance_score)).offset(skip).limit(limit).all()
+    if as_dicts:
+        query = fast_json.idea_rows(query)
+    rows = query.add_columns(key).order_by(desc(key), desc(models.Idea.id)).limit(limit + 1).all()
+    if as_dicts:
+        ideas = [fast_json.idea_dict(row[:-1]) for row in rows[:limit]]
+    else:
+        ideas = [idea for idea, _ in rows[:limit]]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        last_id = last.id if as_dicts else last[0].id
+        next_cursor = _encode_cursor(kind, last[-1], last_id)
+    return ideas, next_cursor
 
-def get_ideas_by_city(db: Session, city: str, limit: int = 100):
-    # Простая реализация - в реальности нужна геофильтрация
-    return db.query(models.Idea).order_by(desc(models.Idea.created_at)).limit(limit).all()
+def get_ideas_page(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None,
+    as_dicts: bool = False
+) -> Tuple[List[models.Idea], Optional[str]]:
+    """Страница идей по убыванию (importance_score, id) и курсор следующей страницы"""
+    query = _filter_ideas(db.query(models.Idea), category, status, priority)
+    query = _filter_area(db, query, bbox, city)
+    return _keyset_page(db, query, "score", models.Idea.importance_score, cursor, limit, as_dicts)
+
+def get_ideas_by_city_page(
+    db: Session,
+    city: str,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    as_dicts: bool = False
+) -> Tuple[List[models.Idea], Optional[str]]:
+    """Страница новых идей города по убыванию (created_at, id) и курсор следующей страницы"""
+    query = _filter_area(db, db.query(models.Idea), city=city)
+    return _keyset_page(db, query, "created", models.Idea.created_at, cursor, limit, as_dicts)
+
+ANONYMOUS_EMAIL = "anonymous@gorod-kontur.ru"
+VISITOR_EMAIL = "visitor-{}@gorod-kontur.ru"
+
+def _get_or_create_user(db: Session, email: str, full_name: str, password: str):
+    user = get_user_by_email(db, email)
+    if not user:
+        try:
+            user = create_user(db, schemas.UserCreate(
+                email=email, full_name=full_name, password=password
+            ))
+        except IntegrityError:
+            # Параллельный запрос успел создать пользователя первым
+            db.rollback()
+            user = get_user_by_email(db, email)
+    return user
+
+def get_anonymous_user(db: Session):
+    """Временный пользователь для действий без авторизации"""
+    return _get_or_create_user(db, ANONYMOUS_EMAIL, "Анонимный пользователь", "anonymous")
+
+def get_visitor_user(db: Session, visitor_id: uuid.UUID):
+    """Пользователь посетителя сайта без регистрации
+
+    visitor_id браузер создаёт один раз и хранит в localStorage, поэтому
+    голоса разных посетителей не сливаются в один.
+    """
+    return _get_or_create_user(db, VISITOR_EMAIL.format(visitor_id), "Посетитель сайта", "visitor")
 
 def create_idea(db: Session, idea: schemas.IdeaCreate, author_id: uuid.UUID = None):
     if author_id is None:
         # Создаём временного пользователя если нет авторизации
-        author = get_user_by_email(db, "anonymous@gorod-kontur.ru")
-        if not author:
-            author = create_user(db, schemas.UserCreate(
-                email="anonymous@gorod-kontur.ru",
-                full_name="Анонимный пользователь",
-                password="anonymous"
-            ))
-        author_id = author.id
+        author_id = get_anonymous_user(db).id
     
     db_idea = models.Idea(
         **idea.dict(),
         author_id=author_id,
         status=models.IdeaStatus.NEW
     )
+    duplicate_index.attach_fingerprint(db_idea)
     db.add(db_idea)
+    db.flush()
+    search.index_idea(db, db_idea)
     db.commit()
     db.refresh(db_idea)
+    geo_index.add_idea(db_idea)
+    duplicate_index.add_idea(db_idea)
+    analytics_snapshot.idea_created(db_idea)
+    map_tiles.idea_changed(db_idea)
+    priority_updates.idea_created(db_idea)
+    response_cache.idea_created(db_idea)
+    live_updates.idea_created(db_idea)
     return db_idea
 
 def update_idea(db: Session, idea_id: uuid.UUID, idea_update: schemas.IdeaUpdate):
@@ -80,86 +268,281 @@ def update_idea(db: Session, idea_id: uuid.UUID, idea_update: schemas.IdeaUpdate
     if not db_idea:
         return None
     
+    old_key = idea_key(db_idea)
+    old_category = db_idea.category
+    
     update_data = idea_update.dict(exclude_unset=True)
+    # Приоритет не хранится, а вычисляется из importance_score
+    update_data.pop("priority", None)
     for field, value in update_data.items():
         setattr(db_idea, field, value)
+    if "title" in update_data or "description" in update_data:
+        db.flush()
+        search.index_idea(db, db_idea)
     
     db.commit()
     db.refresh(db_idea)
+    analytics_snapshot.idea_changed(db_idea, old_key)
+    map_tiles.idea_changed(db_idea)
+    response_cache.idea_changed(db_idea, old_category)
+    live_updates.idea_changed(db_idea)
     return db_idea
 
-def get_similar_ideas(db: Session, lat: float, lon: float, category: str, radius: float = 200):
-    """Поиск похожих идей в радиусе"""
-    # В реальности здесь будет геопоиск по PostGIS
-    # Сейчас возвращаем идеи той же категории
-    return db.query(models.Idea).filter(
-        models.Idea.category == category
-    ).limit(10).all()
+def find_duplicate_ideas(db: Session, description: str, limit: int = 10):
+    """Идеи с похожим описанием (коэффициент Жаккара по словам выше порога)"""
+    return duplicate_index.find_duplicates(db, description, limit=limit)
+
+def get_similar_ideas(db: Session, lat: float, lon: float, category: str, radius: float = 200,
+                      limit: Optional[int] = None):
+    """Поиск идей той же категории в радиусе, от ближних к дальним"""
+    geo_index.ensure_loaded(db)
+    matches = geo_index.idea_index.radius(
+        getattr(category, "value", category), lat, lon, radius, limit=limit
+    )
+    if not matches:
+        return []
+    
+    ids = [item_id for _, item_id, _ in matches]
+    ideas = {i.id: i for i in db.query(models.Idea).filter(models.Idea.id.in_(ids)).all()}
+    return [ideas[i] for i in ids if i in ideas]
 
 # Vote CRUD
+_VOTE_KEY = {"user_id", "idea_id"}
+
+def ensure_vote_constraint(engine):
+    """Уникальность (user_id, idea_id) в таблице голосов, созданной до её появления
+
+    create_all не меняет существующую таблицу, а INSERT ... ON CONFLICT в
+    _insert_vote без уникального индекса не работает. Повторные голоса
+    анонимного пользователя оставлены разными людьми, поэтому каждый из них
+    переносится на своего нового посетителя. Повторные голоса остальных
+    пользователей удаляются (остаётся один на пару), счётчики затронутых
+    идей пересчитываются, затем создаётся индекс uq_votes_user_idea.
+    """
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        unique = inspector.get_unique_constraints("votes") + [
+            index for index in inspector.get_indexes("votes") if index["unique"]
+        ]
+        if any(set(item["column_names"]) == _VOTE_KEY for item in unique):
+            return
+        
+        anonymous_id = connection.execute(
+            select(models.User.id).where(models.User.email == ANONYMOUS_EMAIL)
+        ).scalar()
+        if anonymous_id is not None:
+            extra = connection.execute(text(
+                "SELECT id FROM votes WHERE user_id = :user_id AND id NOT IN "
+                "(SELECT MIN(id) FROM votes WHERE user_id = :user_id GROUP BY idea_id)"
+            ), {"user_id": anonymous_id}).scalars().all()
+            for vote_id in extra:
+                visitor_id = str(uuid.uuid4())
+                connection.execute(models.User.__table__.insert().values(
+                    id=visitor_id, email=VISITOR_EMAIL.format(visitor_id),
+                    full_name="Посетитель сайта", hashed_password="visitor_hashed"
+                ))
+                connection.execute(
+                    update(models.Vote).where(models.Vote.id == vote_id).values(user_id=visitor_id)
+                )
+        
+        duplicated = [row[0] for row in connection.execute(text(
+            "SELECT idea_id FROM votes GROUP BY user_id, idea_id HAVING COUNT(*) > 1"
+        ))]
+        if duplicated:
+            connection.execute(text(
+                "DELETE FROM votes WHERE id NOT IN "
+                "(SELECT MIN(id) FROM votes GROUP BY user_id, idea_id)"
+            ))
+            connection.execute(
+                update(models.Idea).where(models.Idea.id.in_(set(duplicated))).values(
+                    votes_count=models.Vote.__table__.select().with_only_columns(
+                        func.count()
+                    ).where(models.Vote.idea_id == models.Idea.id).scalar_subquery()
+                )
+            )
+        connection.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_votes_user_idea ON votes (user_id, idea_id)"
+        ))
+
+def _insert_vote(db: Session, values: dict) -> Optional[models.Vote]:
+    """INSERT голоса; None, если голос этого пользователя за идею уже есть"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = insert(models.Vote).values(**values).on_conflict_do_nothing(
+            index_elements=["user_id", "idea_id"]
+        ).returning(models.Vote)
+        return db.scalars(statement).first()
+    
+    db_vote = models.Vote(**values)
+    try:
+        with db.begin_nested():
+            db.add(db_vote)
+    except IntegrityError:
+        return None
+    return db_vote
+
 def create_vote(db: Session, vote: schemas.VoteCreate, user_id: uuid.UUID):
-    db_vote = models.Vote(
-        idea_id=vote.idea_id,
-        user_id=user_id,
-        vote_type=vote.vote_type
-    )
+    """Голос пользователя за идею
+    
+    Один голос на пару (пользователь, идея): повторный голос меняет vote_type.
+    Счётчик votes_count увеличивается атомарно на стороне БД или, если
+    включён буфер, копится в vote_buffer и записывается пакетно.
+    """
+    idea_id = str(vote.idea_id)
+    user_id = str(user_id)
+    
+    db_vote = _insert_vote(db, {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "idea_id": idea_id,
+        "vote_type": vote.vote_type
+    })
+    inserted = db_vote is not None
     
-    # Обновляем счётчик голосов в идее
-    idea = get_idea(db, vote.idea_id)
-    if idea:
-        idea.votes_count += 1
+    if not inserted:
+        db_vote = db.scalars(
+            update(models.Vote).where(
+                models.Vote.user_id == user_id,
+                models.Vote.idea_id == idea_id
+            ).values(vote_type=vote.vote_type).returning(models.Vote)
+        ).one()
+    elif not vote_buffer.enabled:
+        db.execute(
+            update(models.Idea).where(models.Idea.id == idea_id).values(
+                votes_count=models.Idea.votes_count + 1
+            ),
+            execution_options={"synchronize_session": False}
+        )
     
-    db.add(db_vote)
     db.commit()
-    db.refresh(db_vote)
+    
+    if inserted:
+        if vote_buffer.enabled:
+            vote_buffer.add(idea_id, 1)
+        analytics_snapshot.vote_created(db_vote)
+        priority_updates.idea_voted(idea_id)
+        if not vote_buffer.enabled:
+            response_cache.ideas_voted([idea_id])
+            live_updates.ideas_voted(db, [idea_id])
+        response_cache.analytics_changed()
     return db_vote
 
 # Analytics
 def get_analytics(db: Session, period_days: int = 30):
+    """Аналитика из снимка в памяти (обновляется дельтами при записи)"""
+    return analytics_snapshot.get(db, period_days)
+
+# Кэшированные ответы эндпоинтов (response_cache): JSON-совместимые словари
+def get_ideas_cached(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None
+) -> List[dict]:
+    key = response_cache.make_key(
+        "ideas", skip=skip, limit=limit, category=category, status=status, priority=priority,
+        bbox=bbox, city=spatial.city_key(city) if city else None
+    )
+    return response_cache.response_cache.get_or_compute(
+        key,
+        lambda: get_ideas(
+            db, skip=skip, limit=limit, category=category, status=status,
+            priority=priority, bbox=bbox, city=city, as_dicts=True
+        ),
+        tags=[response_cache.list_tag(category)],
+        tags_of=lambda ideas: [response_cache.idea_tag(idea["id"]) for idea in ideas]
+    )
+
+def get_idea_cached(db: Session, idea_id: uuid.UUID) -> Optional[dict]:
+    def compute():
+        row = fast_json.idea_rows(db.query(models.Idea).filter(models.Idea.id == str(idea_id))).first()
+        return fast_json.idea_dict(row) if row else None
+    return response_cache.response_cache.get_or_compute(
+        response_cache.make_key("idea", id=idea_id), compute,
+        tags=[response_cache.idea_tag(idea_id)]
+    )
+
+def get_analytics_cached(db: Session, period_days: int = 30) -> dict:
+    return response_cache.response_cache.get_or_compute(
+        response_cache.make_key("analytics", period_days=period_days, day=datetime.now().date()),
+        lambda: get_analytics(db, period_days),
+        tags=[response_cache.ANALYTICS_TAG]
+    )
+
+def compute_analytics(db: Session, period_days: int = 30):
+    """Аналитика напрямую из БД, без снимка"""
     end_date = datetime.now()
     start_date = end_date - timedelta(days=period_days)
     
-    # Базовая статистика
-    total_ideas = db.query(func.count(models.Idea.id)).scalar()
-    active_ideas = db.query(func.count(models.Idea.id)).filter(
-        models.Idea.status.in_([models.IdeaStatus.NEW, models.IdeaStatus.UNDER_REVIEW, models.IdeaStatus.IN_PROGRESS])
-    ).scalar()
-    completed_ideas = db.query(func.count(models.Idea.id)).filter(
-        models.Idea.status == models.IdeaStatus.COMPLETED
-    ).scalar()
-    total_users = db.query(func.count(models.User.id)).scalar()
-    
-    # По категориям
-    by_category = {}
-    for category in models.IdeaCategory:
-        count = db.query(func.count(models.Idea.id)).filter(
-            models.Idea.category == category,
-            models.Idea.created_at >= start_date
-        ).scalar()
-        by_category[category.value] = count
+    # Все счётчики по идеям — один GROUP BY (категория × статус × приоритет × период)
+    recent = case((models.Idea.created_at >= start_date, 1), else_=0)
+    rows = db.query(
+        models.Idea.category,
+        models.Idea.status,
+        models.Idea.priority,
+        func.count(models.Idea.id),
+        func.sum(recent)
+    ).group_by(
+        models.Idea.category, models.Idea.status, models.Idea.priority
+    ).all()
+    
+    active_statuses = {models.IdeaStatus.NEW, models.IdeaStatus.UNDER_REVIEW, models.IdeaStatus.IN_PROGRESS}
+    total_ideas = active_ideas = completed_ideas = recent_ideas = 0
+    by_category = {category.value: 0 for category in models.IdeaCategory}
+    by_status = {status.value: 0 for status in models.IdeaStatus}
+    by_priority = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+    
+    for category, status, priority, count, recent_count in rows:
+        recent_count = recent_count or 0
+        total_ideas += count
+        recent_ideas += recent_count
+        if status in active_statuses:
+            active_ideas += count
+        elif status == models.IdeaStatus.COMPLETED:
+            completed_ideas += count
+        
+        # Распределения — за выбранный период
+        by_category[category.value] += recent_count
+        if status is not None:
+            by_status[status.value] += recent_count
+        by_priority[priority] += recent_count
     
-    # По статусам
-    by_status = {}
-    for status in models.IdeaStatus:
-        count = db.query(func.count(models.Idea.id)).filter(
-            models.Idea.status == status,
+    # Пользователи: всего и за период
+    total_users, recent_users = db.query(
+        func.count(models.User.id),
+        func.sum(case((models.User.created_at >= start_date, 1), else_=0))
+    ).one()
+    
+    # Динамика по дням
+    day = func.date(models.Idea.created_at)
+    ideas_by_day = {
+        str(d): count for d, count in db.query(day, func.count(models.Idea.id)).filter(
             models.Idea.created_at >= start_date
-        ).scalar()
-        by_status[status.value] = count
+        ).group_by(day).order_by(day).all()
+    }
     
     # Топ проблем
-    top_problems = db.query(models.Idea).filter(
+    top_problems = db.query(models.Idea.id, models.Idea.title, models.Idea.importance_score).filter(
         models.Idea.importance_score >= 0.7
     ).order_by(desc(models.Idea.importance_score)).limit(5).all()
     
     return {
-        "total_ideas": total_ideas or 0,
-        "active_ideas": active_ideas or 0,
-        "completed_ideas": completed_ideas or 0,
+        "total_ideas": total_ideas,
+        "active_ideas": active_ideas,
+        "completed_ideas": completed_ideas,
         "total_users": total_users or 0,
         "by_category": by_category,
         "by_status": by_status,
-        "by_priority": {"critical": 0, "high": 0, "medium": 0, "low": 0},  # Заглушка
+        "by_priority": by_priority,
         "top_problems": [{"id": i.id, "title": i.title, "score": i.importance_score} for i in top_problems],
-        "trends": {"ideas_per_day": 5, "users_per_day": 2}  # Заглушка
-    }
\ No newline at end of file
+        "trends": {
+            "ideas_per_day": round(recent_ideas / period_days, 2) if period_days else 0,
+            "users_per_day": round((recent_users or 0) / period_days, 2) if period_days else 0,
+            "ideas_by_day": ideas_by_day
+        }
+    }
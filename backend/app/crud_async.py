@@ -0,0 +1,98 @@
+"""Асинхронные варианты функций crud для async-маршрутов
+
+Принимают AsyncSession (database.get_async_db): запросы идут через
+aiosqlite / asyncpg и не блокируют цикл событий, пока БД отвечает.
+Простые выборки написаны заново; функции, завязанные на индексы в памяти
+и диалект БД (фильтр по bbox, поиск, создание идеи, голос), выполняют
+синхронную реализацию из crud через AsyncSession.run_sync — логика
+и хуки после commit остаются в одном месте, а ввод-вывод всё равно идёт
+через асинхронный драйвер.
+
+Объекты возвращаются с уже загруженными столбцами; связи (author, votes)
+лениво в async не подгружаются — нужные связи загружайте явно.
+"""
+import uuid
+from typing import List, Optional, Tuple
+
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas, spatial
+
+# User CRUD
+async def get_user(db: AsyncSession, user_id: uuid.UUID):
+    return await db.get(models.User, str(user_id))
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email).limit(1))
+
+# Idea CRUD
+async def get_idea(db: AsyncSession, idea_id: uuid.UUID):
+    return await db.get(models.Idea, str(idea_id))
+
+async def get_ideas(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None
+):
+    if not bbox and not city:
+        query = crud._filter_ideas(select(models.Idea), category, status, priority)
+        result = await db.scalars(query.order_by(desc(models.Idea.importance_score)).offset(skip).limit(limit))
+        return result.all()
+    # Условие по bbox зависит от индекса, подготовленного для движка
+    return await db.run_sync(
+        crud.get_ideas, skip=skip, limit=limit, category=category, status=status,
+        priority=priority, bbox=bbox, city=city
+    )
+
+async def get_ideas_page(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None
+) -> Tuple[List[models.Idea], Optional[str]]:
+    return await db.run_sync(
+        crud.get_ideas_page, cursor=cursor, limit=limit, category=category, status=status,
+        priority=priority, bbox=bbox, city=city
+    )
+
+async def search_ideas(
+    db: AsyncSession,
+    q: str,
+    limit: int = 50,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    bbox: Optional[spatial.Bounds] = None,
+    city: Optional[str] = None
+) -> List[models.Idea]:
+    return await db.run_sync(
+        crud.search_ideas, q, limit=limit, category=category, status=status,
+        priority=priority, bbox=bbox, city=city
+    )
+
+async def get_ideas_by_city(db: AsyncSession, city: str, limit: int = 100):
+    return await db.run_sync(crud.get_ideas_by_city, city, limit=limit)
+
+async def create_idea(db: AsyncSession, idea: schemas.IdeaCreate, author_id: uuid.UUID = None):
+    return await db.run_sync(crud.create_idea, idea, author_id=author_id)
+
+async def update_idea(db: AsyncSession, idea_id: uuid.UUID, idea_update: schemas.IdeaUpdate):
+    return await db.run_sync(crud.update_idea, idea_id, idea_update)
+
+# Vote CRUD
+async def create_vote(db: AsyncSession, vote: schemas.VoteCreate, user_id: uuid.UUID):
+    return await db.run_sync(crud.create_vote, vote, user_id)
+
+# Analytics
+async def get_analytics(db: AsyncSession, period_days: int = 30):
+    return await db.run_sync(crud.get_analytics, period_days)
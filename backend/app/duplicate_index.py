@@ -0,0 +1,176 @@
+import os
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, contains_eager
+
+from . import models
+from .ai.categorizer import SimpleAICategorizer, TOKENIZER_VERSION
+from .ai.minhash import MinHashLSH
+from .ai.token_cache import TokenCache
+
+logger = logging.getLogger(__name__)
+
+# Версия сигнатур: увеличить при смене параметров MinHash (смена
+# токенизатора отслеживается отдельно через TOKENIZER_VERSION)
+SIGNATURE_VERSION = 1
+
+categorizer = SimpleAICategorizer()
+minhash_index = MinHashLSH(num_perm=64, bands=32)
+# Слова описаний по id идеи, чтобы повторные проверки не ходили в БД
+token_cache = TokenCache(int(os.getenv("IDEA_TOKEN_CACHE_SIZE", "50000")))
+
+_loaded = False
+_load_lock = threading.Lock()
+
+def idea_tokens(description: Optional[str]) -> List[str]:
+    return categorizer._preprocess_text(description or "")
+
+def compute_signature(description: Optional[str]) -> np.ndarray:
+    return minhash_index.signature(idea_tokens(description))
+
+def _encode(signature: np.ndarray) -> bytes:
+    return signature.astype('<u4').tobytes()
+
+def _decode(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype='<u4')
+
+def _is_current():
+    return (models.IdeaFingerprint.version == SIGNATURE_VERSION) & \
+        (models.IdeaFingerprint.tokenizer_version == TOKENIZER_VERSION)
+
+def attach_fingerprint(idea: models.Idea):
+    """Разбор описания и сигнатура при записи идеи (сохраняются вместе с идеей)"""
+    tokens = idea_tokens(idea.description)
+    values = {
+        'version': SIGNATURE_VERSION,
+        'tokenizer_version': TOKENIZER_VERSION,
+        'tokens': tokens,
+        'signature': _encode(minhash_index.signature(tokens))
+    }
+    if idea.fingerprint is None:
+        idea.fingerprint = models.IdeaFingerprint(**values)
+    else:
+        for field, value in values.items():
+            setattr(idea.fingerprint, field, value)
+
+def add_idea(idea: models.Idea):
+    """Инкрементальное обновление индекса после сохранения идеи"""
+    if idea.fingerprint is None:
+        return
+    token_cache.put(idea.id, idea.fingerprint.tokens)
+    if _loaded:
+        minhash_index.insert(idea.id, _decode(idea.fingerprint.signature))
+
+def get_idea_tokens(db: Session, idea_ids: List[str]) -> Dict[str, Tuple[str, ...]]:
+    """Слова описаний идей: из кэша, иначе из сохранённых отпечатков
+
+    Описание разбирается заново, только если отпечатка нет или он посчитан
+    другой версией токенизатора (такие отпечатки пересчитывает _backfill).
+    """
+    result = {}
+    missing = []
+    for idea_id in idea_ids:
+        tokens = token_cache.get(idea_id)
+        if tokens is None:
+            missing.append(idea_id)
+        else:
+            result[idea_id] = tokens
+
+    if missing:
+        rows = db.query(models.IdeaFingerprint.idea_id, models.IdeaFingerprint.tokens).filter(
+            models.IdeaFingerprint.idea_id.in_(missing),
+            models.IdeaFingerprint.tokenizer_version == TOKENIZER_VERSION
+        ).all()
+        for row in rows:
+            result[row.idea_id] = tuple(row.tokens)
+
+        stale = [idea_id for idea_id in missing if idea_id not in result]
+        if stale:
+            rows = db.query(models.Idea.id, models.Idea.description).filter(models.Idea.id.in_(stale)).all()
+            for row in rows:
+                result[row.id] = tuple(idea_tokens(row.description))
+
+        for idea_id in missing:
+            if idea_id in result:
+                token_cache.put(idea_id, result[idea_id])
+    return result
+
+def ensure_loaded(db: Session):
+    """Построение индекса из сохранённых сигнатур при первом обращении
+
+    Описания заново токенизируются только у идей без сигнатуры или с
+    сигнатурой устаревшей версии; посчитанное сохраняется в БД.
+    """
+    global _loaded
+    if _loaded:
+        return
+
+    with _load_lock:
+        if _loaded:
+            return
+
+        _backfill(db)
+
+        keys, blobs = [], []
+        rows = db.query(models.IdeaFingerprint.idea_id, models.IdeaFingerprint.signature).filter(
+            _is_current()
+        ).yield_per(10000)
+        for row in rows:
+            keys.append(row.idea_id)
+            blobs.append(row.signature)
+
+        minhash_index.clear()
+        if keys:
+            signatures = np.frombuffer(b"".join(blobs), dtype='<u4').reshape(len(keys), minhash_index.num_perm)
+            minhash_index.load(keys, signatures)
+        _loaded = True
+
+        logger.info(f"Индекс дубликатов построен: {len(minhash_index)} идей")
+
+def _backfill(db: Session, batch_size: int = 1000):
+    while True:
+        # Отпечатки берутся из того же JOIN, без отдельного запроса на идею
+        ideas = db.query(models.Idea).outerjoin(models.Idea.fingerprint).options(
+            contains_eager(models.Idea.fingerprint)
+        ).filter(
+            (models.IdeaFingerprint.idea_id.is_(None)) | ~_is_current()
+        ).limit(batch_size).all()
+        if not ideas:
+            return
+        for idea in ideas:
+            attach_fingerprint(idea)
+            token_cache.invalidate(idea.id)
+        db.commit()
+        logger.info(f"Пересчитаны отпечатки {len(ideas)} идей")
+
+def find_duplicates(db: Session, text: str, exclude_id: Optional[str] = None,
+                    limit: int = 10, max_candidates: int = 50) -> List[Dict]:
+    """Поиск похожих идей: кандидаты из LSH, затем точная проверка Жаккара"""
+    ensure_loaded(db)
+    text_tokens = idea_tokens(text)
+    candidates = minhash_index.query(minhash_index.signature(text_tokens),
+                                     limit=max_candidates, exclude=exclude_id)
+    if not candidates:
+        return []
+
+    ids = [key for key, _ in candidates]
+    titles = dict(db.query(models.Idea.id, models.Idea.title).filter(models.Idea.id.in_(ids)).all())
+    tokens = get_idea_tokens(db, [idea_id for idea_id in ids if idea_id in titles])
+    ideas = [{'id': idea_id, 'title': titles[idea_id], 'tokens': tokens[idea_id]} for idea_id in tokens]
+    return categorizer.find_duplicates(text, ideas, text_tokens=text_tokens)[:limit]
+
+def categorize_ideas(db: Session, idea_ids: List[str]) -> Dict[str, Dict]:
+    """Категоризация сохранённых идей по описанию без повторного разбора"""
+    tokens = get_idea_tokens(db, idea_ids)
+    return {idea_id: categorizer.categorize_tokens(list(words)) for idea_id, words in tokens.items()}
+
+def reset():
+    """Сброс индекса (будет перестроен при следующем обращении)"""
+    global _loaded
+    with _load_lock:
+        _loaded = False
+        minhash_index.clear()
+        token_cache.clear()
@@ -0,0 +1,101 @@
+"""Быстрая сериализация списков идей
+
+Обычный путь ответа — ORM-объекты, проверка каждого поля моделью
+IdeaResponse (from_attributes) и json.dumps. Быстрый путь:
+  - из БД выбираются только столбцы IdeaResponse — кортежи без сборки
+    ORM-объектов (idea_rows);
+  - словари ответа собираются напрямую, в порядке полей IdeaResponse и с
+    теми же JSON-значениями (idea_dict);
+  - для карты — ещё более узкая проекция IdeaMarker (marker_dicts);
+  - FastJSONResponse кодирует их orjson (или компактным json.dumps, если
+    orjson не установлен).
+Маршрут выбирает быстрый путь сам, возвращая FastJSONResponse: FastAPI
+не проверяет готовый Response по response_model, а схема в OpenAPI
+остаётся прежней. Данные берутся из БД, где они уже прошли проверку
+при записи.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from . import models, schemas
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него — json.dumps
+    orjson = None
+
+def _projection(schema):
+    """Поля схемы и столбцы Idea под них; priority не хранится, а вычисляется"""
+    fields = tuple(schema.model_fields)
+    columns = tuple(getattr(models.Idea, name) for name in fields if name != "priority")
+    return fields, columns
+
+IDEA_FIELDS, IDEA_COLUMNS = _projection(schemas.IdeaResponse)
+# Метка на карте: без описания, адреса и счётчиков
+MARKER_FIELDS, MARKER_COLUMNS = _projection(schemas.IdeaMarker)
+_IDEA_NAMES = tuple(column.key for column in IDEA_COLUMNS)
+_MARKER_NAMES = tuple(column.key for column in MARKER_COLUMNS)
+
+def idea_rows(query):
+    """Запрос по models.Idea (с фильтрами, порядком, join) → кортежи столбцов ответа"""
+    return query.with_entities(*IDEA_COLUMNS)
+
+def _row_dict(row, names, fields) -> Dict[str, Any]:
+    item = dict(zip(names, row))
+    for name in ("category", "status"):
+        if name in item:
+            item[name] = _value(item[name])
+    for name in ("created_at", "updated_at"):
+        if name in item:
+            item[name] = _isoformat(item[name])
+    item["priority"] = models.priority_for(item["importance_score"])
+    return {name: item[name] for name in fields}
+
+def idea_dict(row) -> Dict[str, Any]:
+    """Словарь ответа из кортежа idea_rows, как IdeaResponse.model_dump(mode="json")"""
+    return _row_dict(row, _IDEA_NAMES, IDEA_FIELDS)
+
+def idea_dicts(query) -> List[Dict[str, Any]]:
+    return [idea_dict(row) for row in idea_rows(query).all()]
+
+def marker_dicts(query) -> List[Dict[str, Any]]:
+    """Запрос по models.Idea → словари IdeaMarker (выбираются только их столбцы)"""
+    return [
+        _row_dict(row, _MARKER_NAMES, MARKER_FIELDS)
+        for row in query.with_entities(*MARKER_COLUMNS).all()
+    ]
+
+def _value(value):
+    return value.value if isinstance(value, Enum) else value
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def _default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ через orjson без проверки по response_model"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
+
+def respond(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """FastJSONResponse с заголовками, уже выставленными в параметре response (ETag и т. п.)"""
+    headers = None
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return FastJSONResponse(content, headers=headers)
@@ -0,0 +1,64 @@
+import math
+import numpy as np
+
+# Эллипсоид WGS84 (тот же, что использует geopy.distance.geodesic)
+WGS84_A = 6378137.0
+WGS84_E2 = 0.00669437999014
+
+def _curvature_radii(lat_rad):
+    """Радиусы кривизны эллипсоида: меридиана (M) и первого вертикала (N)"""
+    sin2 = np.sin(lat_rad) ** 2
+    w = 1 - WGS84_E2 * sin2
+    meridian = WGS84_A * (1 - WGS84_E2) / w ** 1.5
+    normal = WGS84_A / np.sqrt(w)
+    return meridian, normal
+
+def distance_matrix(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Матрица расстояний в метрах между точками (lat1, lon1) и (lat2, lon2)
+
+    Эллипсоидальная аппроксимация на касательной плоскости в средней широте
+    пары точек. На городских расстояниях (до нескольких км) расхождение
+    с geopy.distance.geodesic меньше 1 мм, поэтому пороги 200 м / 1000 м
+    срабатывают так же, как в поштучном расчёте.
+    """
+    lat1 = np.radians(np.asarray(lat1, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(lon1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lat2, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(lon2, dtype=float))[None, :]
+
+    meridian, normal = _curvature_radii((lat1 + lat2) / 2)
+    dlat = lat2 - lat1
+    dlon = (lon2 - lon1 + np.pi) % (2 * np.pi) - np.pi
+
+    dy = meridian * dlat
+    dx = normal * np.cos((lat1 + lat2) / 2) * dlon
+    return np.hypot(dx, dy)
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние в метрах между двумя точками (скалярный вариант distance_matrix)"""
+    phi = math.radians((lat1 + lat2) / 2)
+    w = 1 - WGS84_E2 * math.sin(phi) ** 2
+    meridian = WGS84_A * (1 - WGS84_E2) / w ** 1.5
+    normal = WGS84_A / math.sqrt(w)
+
+    dlat = math.radians(lat2 - lat1)
+    dlon = (math.radians(lon2 - lon1) + math.pi) % (2 * math.pi) - math.pi
+    return math.hypot(normal * math.cos(phi) * dlon, meridian * dlat)
+
+def distances(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Попарные расстояния в метрах между i-ми точками двух массивов"""
+    lat1 = np.radians(np.asarray(lat1, dtype=float))
+    lon1 = np.radians(np.asarray(lon1, dtype=float))
+    lat2 = np.radians(np.asarray(lat2, dtype=float))
+    lon2 = np.radians(np.asarray(lon2, dtype=float))
+
+    meridian, normal = _curvature_radii((lat1 + lat2) / 2)
+    dlat = lat2 - lat1
+    dlon = (lon2 - lon1 + np.pi) % (2 * np.pi) - np.pi
+    return np.hypot(normal * np.cos((lat1 + lat2) / 2) * dlon, meridian * dlat)
+
+def meters_per_degree(lat):
+    """Длина градуса широты и градуса долготы в метрах на широте lat"""
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    meridian, normal = _curvature_radii(lat_rad)
+    return np.radians(meridian), np.radians(normal * np.cos(lat_rad))
@@ -0,0 +1,554 @@
+import math
+import threading
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from . import models
+from .geo import distance_m, distances, meters_per_degree
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111_320.0
+# Наименьший радиус кривизны эллипсоида (меридиана на экваторе)
+EARTH_MIN_RADIUS = 6_335_439.0
+
+Cell = Tuple[int, int]
+Match = Tuple[float, str, Any]
+
+class GridIndex:
+    """Сеточный пространственный индекс в памяти
+
+    Точки раскладываются по ключам (категория идеи, тип объекта) и по
+    ячейкам фиксированного размера в градусах. Поиск в радиусе и k ближайших
+    просматривает только ячейки вокруг точки запроса, а точное расстояние
+    считается лишь для попавших в них точек.
+    """
+
+    # При таком числе занятых ячеек перебор быстрее обхода колец
+    BRUTE_FORCE_LIMIT = 64
+
+    def __init__(self, cell_size_m: float = 200):
+        self.cell_size_m = cell_size_m
+        self.cell_deg = cell_size_m / METERS_PER_DEGREE_LAT
+        self._cells: Dict[str, Dict[Cell, Dict[str, Tuple[float, float, Any]]]] = {}
+        self._bounds: Dict[str, List[int]] = {}
+        self._points: Dict[str, Tuple[str, Cell]] = {}
+        # Снимки ключей для nearest_many; сбрасываются при изменении ключа
+        self._snapshots: Dict[str, "_Snapshot"] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._points
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._bounds.clear()
+            self._points.clear()
+            self._snapshots.clear()
+
+    def insert(self, item_id: str, key: str, lat: float, lon: float, payload: Any = None):
+        """Добавление (или перемещение) точки"""
+        with self._lock:
+            if item_id in self._points:
+                self.remove(item_id)
+
+            cell = self._cell(lat, lon)
+            self._snapshots.pop(key, None)
+            self._cells.setdefault(key, {}).setdefault(cell, {})[item_id] = (lat, lon, payload)
+            self._points[item_id] = (key, cell)
+
+            bounds = self._bounds.get(key)
+            if bounds is None:
+                self._bounds[key] = [cell[0], cell[0], cell[1], cell[1]]
+            else:
+                bounds[0] = min(bounds[0], cell[0])
+                bounds[1] = max(bounds[1], cell[0])
+                bounds[2] = min(bounds[2], cell[1])
+                bounds[3] = max(bounds[3], cell[1])
+
+    def remove(self, item_id: str) -> bool:
+        with self._lock:
+            location = self._points.pop(item_id, None)
+            if location is None:
+                return False
+
+            key, cell = location
+            self._snapshots.pop(key, None)
+            bucket = self._cells[key][cell]
+            del bucket[item_id]
+            if not bucket:
+                del self._cells[key][cell]
+            return True
+
+    def ids(self, keys: Union[str, Iterable[str], None] = None) -> List[str]:
+        """Id всех точек с указанными ключами"""
+        with self._lock:
+            return [
+                item_id
+                for key in self._keys(keys)
+                for bucket in self._cells.get(key, {}).values()
+                for item_id in bucket
+            ]
+
+    def radius(self, keys: Union[str, Iterable[str]], lat: float, lon: float,
+               radius_m: float, limit: Optional[int] = None) -> List[Match]:
+        """Точки в радиусе radius_m метров: [(расстояние, id, payload)] по возрастанию"""
+        dlat = radius_m / METERS_PER_DEGREE_LAT
+        dlon = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        min_cell = self._cell(lat - dlat, lon - dlon)
+        max_cell = self._cell(lat + dlat, lon + dlon)
+
+        matches = []
+        with self._lock:
+            for key in self._keys(keys):
+                cells = self._cells.get(key)
+                if not cells:
+                    continue
+
+                if (max_cell[0] - min_cell[0] + 1) * (max_cell[1] - min_cell[1] + 1) > len(cells):
+                    candidates = cells.values()
+                else:
+                    candidates = (
+                        cells[(cy, cx)]
+                        for cy in range(min_cell[0], max_cell[0] + 1)
+                        for cx in range(min_cell[1], max_cell[1] + 1)
+                        if (cy, cx) in cells
+                    )
+
+                for bucket in candidates:
+                    for item_id, (p_lat, p_lon, payload) in bucket.items():
+                        distance = distance_m(lat, lon, p_lat, p_lon)
+                        if distance <= radius_m:
+                            matches.append((distance, item_id, payload))
+
+        matches.sort(key=lambda m: m[0])
+        return matches[:limit] if limit is not None else matches
+
+    def nearest(self, keys: Union[str, Iterable[str]], lat: float, lon: float,
+                k: int = 1, max_distance: Optional[float] = None) -> List[Match]:
+        """k ближайших точек: [(расстояние, id, payload)] по возрастанию"""
+        matches: List[Match] = []
+        with self._lock:
+            for key in self._keys(keys):
+                matches.extend(self._nearest_in_key(key, lat, lon, k, max_distance))
+
+        matches.sort(key=lambda m: m[0])
+        return matches[:k]
+
+    def nearest_many(self, keys: Union[str, Iterable[str]], lats, lons) -> Tuple[np.ndarray, List[Any]]:
+        """Ближайшая точка для каждой из точек запроса: (расстояния, payload)
+
+        Пакетный вариант nearest(k=1) для большого числа точек: каждый ключ
+        один раз переводится в массивы NumPy (см. _Snapshot), и кандидаты для
+        всех запросов проверяются векторно. Где точек с такими ключами нет,
+        расстояние равно inf, а payload — None.
+        """
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        best = np.full(len(lats), np.inf)
+        payloads = np.full(len(lats), None, dtype=object)
+        if not len(lats):
+            return best, list(payloads)
+
+        with self._lock:
+            for key in self._keys(keys):
+                snapshot = self._snapshot(key)
+                if snapshot is None:
+                    continue
+
+                found, index = snapshot.nearest(lats, lons)
+                closer = found < best
+                best[closer] = found[closer]
+                payloads[closer] = snapshot.payloads[index[closer]]
+
+        return best, list(payloads)
+
+    def _snapshot(self, key: str) -> Optional["_Snapshot"]:
+        snapshot = self._snapshots.get(key)
+        if snapshot is None and self._cells.get(key):
+            snapshot = _Snapshot([
+                point for bucket in self._cells[key].values() for point in bucket.values()
+            ])
+            self._snapshots[key] = snapshot
+        return snapshot
+
+    def _nearest_in_key(self, key: str, lat: float, lon: float, k: int,
+                        max_distance: Optional[float]) -> List[Match]:
+        cells = self._cells.get(key)
+        if not cells:
+            return []
+
+        limit = max_distance if max_distance is not None else float('inf')
+        if len(cells) <= self.BRUTE_FORCE_LIMIT:
+            return self._scan(cells.values(), lat, lon, k, limit)
+
+        center = self._cell(lat, lon)
+        bounds = self._bounds[key]
+
+        found: List[Match] = []
+        ring = 0
+        while True:
+            ring_cells = [
+                cells[cell] for cell in _ring(center, ring) if cell in cells
+            ]
+            found = self._scan(ring_cells, lat, lon, k, limit, found)
+
+            # Всё, что за пределами просмотренных колец, не ближе ring ячеек;
+            # ширина ячейки по долготе сужается к полюсам
+            edge_lat = min(90.0, abs(lat) + (ring + 1) * self.cell_deg)
+            reach = ring * self.cell_size_m * max(math.cos(math.radians(edge_lat)), 1e-6)
+            if len(found) == k and found[-1][0] <= reach:
+                break
+            if reach > limit:
+                break
+            if (center[0] - ring <= bounds[0] and center[0] + ring >= bounds[1] and
+                    center[1] - ring <= bounds[2] and center[1] + ring >= bounds[3]):
+                break
+            if (2 * ring + 1) ** 2 > len(cells):
+                # Разреженные данные: дешевле перебрать всё
+                return self._scan(cells.values(), lat, lon, k, limit)
+            ring += 1
+
+        return found
+
+    @staticmethod
+    def _scan(buckets, lat: float, lon: float, k: int, limit: float,
+              found: Optional[List[Match]] = None) -> List[Match]:
+        found = list(found or [])
+        for bucket in buckets:
+            for item_id, (p_lat, p_lon, payload) in bucket.items():
+                distance = distance_m(lat, lon, p_lat, p_lon)
+                if distance <= limit:
+                    found.append((distance, item_id, payload))
+        found.sort(key=lambda m: m[0])
+        return found[:k]
+
+    def _keys(self, keys: Union[str, Iterable[str], None]) -> Iterable[str]:
+        if keys is None:
+            return list(self._cells.keys())
+        if isinstance(keys, str):
+            return [keys]
+        return keys
+
+class _Snapshot:
+    """Точки одного ключа в массивах NumPy, упорядоченные по ячейкам
+
+    Размер ячейки подбирается по плотности основной массы точек (в среднем
+    POINTS_PER_CELL на ячейку), ячейки нумеруются по строкам плотной сетки
+    в границах данных, так что ячейки одной строки лежат в массивах подряд.
+
+    Поиск в два шага. Сначала для каждого запроса просматриваются 3 × 3
+    соседние ячейки (по отрезку массива на строку): найденное не дальше
+    ширины ячейки точно ближайшее. Остальные запросы — вдали от точек —
+    идут по двухуровневому отсеву: занятые ячейки сгруппированы в блоки,
+    расстояние до первой точки каждого блока даёт верхнюю границу, и
+    раскрываются только блоки, а затем ячейки, чей прямоугольник ближе неё.
+
+    Кандидаты сравниваются в локальной плоской метрике по широте запроса;
+    почти равные (в пределах её погрешности) перепроверяются точным
+    расстоянием, так что результат совпадает с GridIndex.nearest.
+    """
+
+    POINTS_PER_CELL = 2
+    MIN_CELL_M = 50.0
+    MAX_CELLS = 4_000_000
+    # Ограничение числа пар (запрос, кандидат) в одном векторном шаге
+    BLOCK_PAIRS = 2_000_000
+
+    def __init__(self, points: List[Tuple[float, float, Any]]):
+        lat = np.array([p[0] for p in points], dtype=float)
+        lon = np.array([p[1] for p in points], dtype=float)
+
+        self.lat0, self.lon0 = lat.min(), lon.min()
+        max_abs_lat = min(89.0, max(abs(lat.min()), abs(lat.max())))
+        cos_lat = max(math.cos(math.radians(max_abs_lat)), 1e-6)
+
+        # Плотность по 90% точек, чтобы редкие далёкие объекты не раздували ячейки
+        lat_lo, lat_hi = np.percentile(lat, [5, 95])
+        lon_lo, lon_hi = np.percentile(lon, [5, 95])
+        height = max((lat_hi - lat_lo) * METERS_PER_DEGREE_LAT, self.MIN_CELL_M)
+        width = max((lon_hi - lon_lo) * METERS_PER_DEGREE_LAT * cos_lat, self.MIN_CELL_M)
+        cell_m = max(self.MIN_CELL_M, math.sqrt(height * width * self.POINTS_PER_CELL / (0.9 * len(points))))
+
+        full_height = (lat.max() - self.lat0) * METERS_PER_DEGREE_LAT
+        full_width = (lon.max() - self.lon0) * METERS_PER_DEGREE_LAT * cos_lat
+        cell_m = max(cell_m, math.sqrt(full_height * full_width / self.MAX_CELLS))
+
+        self.cell_m = cell_m
+        self.cell_lat = cell_m / METERS_PER_DEGREE_LAT
+        # Ячейка не уже cell_m на самой дальней от экватора широте данных
+        self.cell_lon = cell_m / (METERS_PER_DEGREE_LAT * cos_lat)
+
+        cy = ((lat - self.lat0) // self.cell_lat).astype(np.int64)
+        cx = ((lon - self.lon0) // self.cell_lon).astype(np.int64)
+        self.ny, self.nx = int(cy.max()) + 1, int(cx.max()) + 1
+        cell = cy * self.nx + cx
+        order = np.argsort(cell, kind='stable')
+
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.payloads = np.empty(len(points), dtype=object)
+        self.payloads[:] = [points[i][2] for i in order]
+        self.cell_start = np.searchsorted(cell[order], np.arange(self.ny * self.nx + 1))
+
+        # Занятые ячейки, сгруппированные в блоки factor × factor ячеек
+        occupied = np.flatnonzero(np.diff(self.cell_start))
+        occupied_y, occupied_x = np.divmod(occupied, self.nx)
+        self.factor = max(2, int(round(len(occupied) ** 0.25)))
+        block = (occupied_y // self.factor) * (self.nx // self.factor + 1) + occupied_x // self.factor
+        by_block = np.argsort(block, kind='stable')
+        occupied, occupied_y, occupied_x = occupied[by_block], occupied_y[by_block], occupied_x[by_block]
+
+        self.cells_start = self.cell_start[occupied]
+        self.cells_count = self.cell_start[occupied + 1] - self.cells_start
+        self.cells_lat = self.lat0 + occupied_y * self.cell_lat
+        self.cells_lon = self.lon0 + occupied_x * self.cell_lon
+
+        block = block[by_block]
+        first = np.flatnonzero(np.r_[True, block[1:] != block[:-1]])
+        self.blocks_start = first
+        self.blocks_count = np.diff(np.r_[first, len(block)])
+        self.blocks_lat = self.lat0 + (occupied_y[first] // self.factor) * self.factor * self.cell_lat
+        self.blocks_lon = self.lon0 + (occupied_x[first] // self.factor) * self.factor * self.cell_lon
+        # Любая точка блока: расстояние до неё — верхняя граница для запроса
+        self.blocks_point = self.cells_start[first]
+
+    def nearest(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(расстояние, индекс в payloads) ближайшей точки для каждого запроса"""
+        found = np.full(len(lats), np.inf)
+        index = np.full(len(lats), -1, dtype=np.int64)
+        scale = np.stack(meters_per_degree(lats), axis=1)
+        # Относительная погрешность плоской метрики на единицу расстояния
+        error = np.abs(np.tan(np.radians(np.clip(lats, -89.0, 89.0)))) / (2 * EARTH_MIN_RADIUS)
+
+        self._search_near(lats, lons, scale, error, found, index)
+
+        # Точки вне соседних ячеек не ближе ширины ячейки (по долготе она
+        # сужается к полюсам; запас — на отличие градуса от METERS_PER_DEGREE_LAT)
+        edge_lat = np.minimum(89.9, np.abs(lats) + self.cell_lat)
+        reach = 0.99 * np.minimum(
+            self.cell_m, self.cell_lon * METERS_PER_DEGREE_LAT * np.cos(np.radians(edge_lat))
+        )
+        far = np.flatnonzero(found > reach)
+        if len(far):
+            self._search_far(far, lats, lons, scale, error, found, index)
+        return found, index
+
+    def _search_near(self, lats: np.ndarray, lons: np.ndarray, scale: np.ndarray,
+                     error: np.ndarray, found: np.ndarray, index: np.ndarray):
+        """Ближайшее среди точек 3 × 3 ячеек вокруг каждого запроса"""
+        cy = np.floor((lats - self.lat0) / self.cell_lat).astype(np.int64)
+        cx = np.floor((lons - self.lon0) / self.cell_lon).astype(np.int64)
+        x_lo = np.clip(cx - 1, 0, self.nx - 1)
+        x_hi = np.clip(cx + 1, 0, self.nx - 1)
+        x_valid = (cx + 1 >= 0) & (cx - 1 < self.nx)
+
+        starts = np.zeros((len(lats), 3), dtype=np.int64)
+        counts = np.zeros((len(lats), 3), dtype=np.int64)
+        for k in range(3):
+            y = cy - 1 + k
+            valid = x_valid & (y >= 0) & (y < self.ny)
+            row = np.where(valid, y, 0) * self.nx
+            starts[:, k] = np.where(valid, self.cell_start[row + x_lo], 0)
+            counts[:, k] = np.where(valid, self.cell_start[row + x_hi + 1], 0) - starts[:, k]
+
+        per_query = np.cumsum(counts.sum(axis=1))
+        splits = np.searchsorted(
+            per_query, np.arange(1, per_query[-1] // self.BLOCK_PAIRS + 1) * self.BLOCK_PAIRS
+        )
+        for block in np.split(np.arange(len(lats)), splits):
+            if len(block):
+                self._search_block(np.repeat(block, 3), starts[block].ravel(), counts[block].ravel(),
+                                   lats, lons, scale, error, found, index)
+
+    def _search_far(self, queries: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+                    scale: np.ndarray, error: np.ndarray, found: np.ndarray, index: np.ndarray):
+        """Ближайшее для далёких запросов с отсевом блоков и ячеек по границам"""
+        step = max(1, self.BLOCK_PAIRS // len(self.blocks_start))
+        for start in range(0, len(queries), step):
+            block = queries[start:start + step]
+
+            # Верхняя граница (с запасом на погрешность метрики) и блоки внутри неё
+            upper = np.sqrt(self._planar(block[:, None], self.lat[self.blocks_point],
+                                         self.lon[self.blocks_point], lats, lons, scale).min(axis=1))
+            upper = upper * (1 + 2 * error[block] * upper) + 1e-6
+            rows, blocks = np.nonzero(
+                self._gap(block[:, None], self.blocks_lat, self.blocks_lon, self.factor,
+                          lats, lons, scale) <= (upper ** 2)[:, None]
+            )
+
+            # Ячейки выбранных блоков внутри той же границы
+            owner, cells = _expand(self.blocks_start[blocks], self.blocks_count[blocks])
+            query = block[rows][owner]
+            gap = self._gap(query, self.cells_lat[cells], self.cells_lon[cells], 1, lats, lons, scale)
+            near = gap <= (upper ** 2)[rows][owner]
+            cells, query, gap = cells[near], query[near], gap[near]
+
+            # Граница точнее — по первым точкам оставшихся ячеек
+            group_start = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+            tighter = np.sqrt(np.minimum.reduceat(self._planar(
+                query, self.lat[self.cells_start[cells]], self.lon[self.cells_start[cells]],
+                lats, lons, scale), group_start))
+            tighter = tighter * (1 + 2 * error[query[group_start]] * tighter) + 1e-6
+            near = gap <= np.repeat(tighter ** 2, np.diff(np.r_[group_start, len(query)]))
+            cells, query = cells[near], query[near]
+            self._search_block(query, self.cells_start[cells], self.cells_count[cells],
+                               lats, lons, scale, error, found, index)
+
+    def _planar(self, query, p_lat, p_lon, lats, lons, scale) -> np.ndarray:
+        """Квадрат расстояния в плоской метрике по широте запроса"""
+        dx = (p_lon - lons[query]) * scale[query, 1]
+        dy = (p_lat - lats[query]) * scale[query, 0]
+        return dx * dx + dy * dy
+
+    def _gap(self, query, sw_lat, sw_lon, size: int, lats, lons, scale) -> np.ndarray:
+        """Квадрат расстояния от запроса до прямоугольника size × size ячеек"""
+        q_lat, q_lon = lats[query], lons[query]
+        dx = np.maximum(np.maximum(sw_lon - q_lon, q_lon - sw_lon - size * self.cell_lon), 0) * scale[query, 1]
+        dy = np.maximum(np.maximum(sw_lat - q_lat, q_lat - sw_lat - size * self.cell_lat), 0) * scale[query, 0]
+        return dx * dx + dy * dy
+
+    def _search_block(self, queries: np.ndarray, starts: np.ndarray, counts: np.ndarray,
+                      lats: np.ndarray, lons: np.ndarray, scale: np.ndarray, error: np.ndarray,
+                      found: np.ndarray, index: np.ndarray):
+        """Ближайшее по отрезкам массивов точек; queries сгруппированы по запросу"""
+        owner, candidate = _expand(starts, counts)
+        if not len(candidate):
+            return
+        query = queries[owner]
+        d2 = self._planar(query, self.lat[candidate], self.lon[candidate], lats, lons, scale)
+
+        group_start = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+        sizes = np.diff(np.r_[group_start, len(query)])
+        best = np.sqrt(np.minimum.reduceat(d2, group_start))
+
+        # Точное расстояние — для всех, кто в пределах погрешности от лучшего
+        limit = best * (1 + 2 * error[query[group_start]] * best) + 1e-6
+        close = np.flatnonzero(d2 <= np.repeat(limit ** 2, sizes))
+        query, candidate = query[close], candidate[close]
+        d = distances(lats[query], lons[query], self.lat[candidate], self.lon[candidate])
+
+        group_start = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+        best = np.minimum.reduceat(d, group_start)
+        is_best = np.flatnonzero(d == np.repeat(best, np.diff(np.r_[group_start, len(query)])))
+        # Первый из равных в каждой группе
+        first = is_best[np.r_[True, query[is_best][1:] != query[is_best][:-1]]]
+
+        chosen = query[first]
+        closer = d[first] < found[chosen]
+        found[chosen[closer]] = d[first][closer]
+        index[chosen[closer]] = candidate[first][closer]
+
+def _expand(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Отрезки [start, start + count) подряд: (номер отрезка, позиция) для каждого элемента"""
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(counts)), counts)
+    positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    return owner, positions
+
+def _ring(center: Cell, ring: int) -> Iterable[Cell]:
+    """Ячейки на границе квадрата (2 * ring + 1) × (2 * ring + 1) вокруг center"""
+    cy, cx = center
+    if ring == 0:
+        yield center
+        return
+    for dx in range(-ring, ring + 1):
+        yield cy - ring, cx + dx
+        yield cy + ring, cx + dx
+    for dy in range(-ring + 1, ring):
+        yield cy + dy, cx - ring
+        yield cy + dy, cx + ring
+
+# Глобальные индексы: идеи по категориям и объекты инфраструктуры по типам
+idea_index = GridIndex(cell_size_m=200)
+infrastructure_index = GridIndex(cell_size_m=1000)
+
+_loaded = False
+_load_lock = threading.Lock()
+
+def _category_value(category) -> str:
+    return getattr(category, 'value', category)
+
+def idea_payload(idea) -> Dict:
+    """Данные идеи, которых достаточно для IdeaPrioritizer"""
+    return {
+        'id': idea.id,
+        'category': _category_value(idea.category),
+        'latitude': idea.latitude,
+        'longitude': idea.longitude,
+        'created_at': idea.created_at
+    }
+
+def add_idea(idea):
+    """Инкрементальное обновление индекса при создании идеи"""
+    if _loaded:
+        idea_index.insert(idea.id, _category_value(idea.category),
+                          idea.latitude, idea.longitude, idea_payload(idea))
+
+def infrastructure_payload(obj) -> Dict:
+    return {
+        'id': obj.id,
+        'type': obj.type,
+        'latitude': obj.latitude,
+        'longitude': obj.longitude,
+        'condition': obj.condition or 'unknown'
+    }
+
+def add_infrastructure_object(obj):
+    """Инкрементальное обновление индекса при добавлении объекта инфраструктуры"""
+    if _loaded:
+        infrastructure_index.insert(obj.id, obj.type, obj.latitude, obj.longitude,
+                                    infrastructure_payload(obj))
+
+def ensure_loaded(db: Session):
+    """Построение индексов из БД при первом обращении"""
+    global _loaded
+    if _loaded:
+        return
+
+    with _load_lock:
+        if _loaded:
+            return
+
+        idea_index.clear()
+        infrastructure_index.clear()
+
+        rows = db.query(
+            models.Idea.id, models.Idea.category, models.Idea.latitude,
+            models.Idea.longitude, models.Idea.created_at
+        ).yield_per(10000)
+        for row in rows:
+            idea_index.insert(row.id, _category_value(row.category),
+                              row.latitude, row.longitude, idea_payload(row))
+
+        objects = db.query(
+            models.InfrastructureObject.id, models.InfrastructureObject.type,
+            models.InfrastructureObject.latitude, models.InfrastructureObject.longitude,
+            models.InfrastructureObject.condition
+        ).yield_per(10000)
+        for obj in objects:
+            infrastructure_index.insert(obj.id, obj.type, obj.latitude, obj.longitude,
+                                        infrastructure_payload(obj))
+
+        _loaded = True
+
+        logger.info(f"Пространственный индекс построен: {len(idea_index)} идей, "
+                    f"{len(infrastructure_index)} объектов инфраструктуры")
+
+def reset():
+    """Сброс индексов (будут перестроены при следующем обращении)"""
+    global _loaded
+    with _load_lock:
+        _loaded = False
+        idea_index.clear()
+        infrastructure_index.clear()
@@ -0,0 +1,134 @@
+"""HTTP-кэширование: условные запросы к API и статика с хешем в имени
+
+API: слабый ETag ответа строится из версии данных (response_cache.etag) до
+обращения к БД. Если он совпал с If-None-Match, эндпоинт сразу отвечает
+304, а Cache-Control: no-cache заставляет браузер каждый раз спрашивать
+сервер, но не скачивать данные заново.
+
+Статика (HashedStaticFiles): в index.html ссылки /static/<файл>
+заменяются на /static/<имя>.<хеш содержимого><расширение>. Такой адрес
+меняется вместе с файлом, поэтому отдаётся с Cache-Control: immutable на
+год; сам index.html и адреса без хеша браузер перепроверяет (no-cache).
+"""
+import hashlib
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from fastapi import Response
+from starlette.datastructures import Headers
+from starlette.responses import HTMLResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from .response_cache import DATA_TAG, response_cache
+
+NO_CACHE = "no-cache"
+IMMUTABLE = "public, max-age=31536000, immutable"
+HASH_LENGTH = 10
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return (tag[2:] if tag.startswith("W/") else tag).strip('"')
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Слабое сравнение If-None-Match с ETag (RFC 9110, 13.1.2)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+def conditional(response: Response, if_none_match: Optional[str], *tags: str,
+                extra: str = "") -> Optional[Response]:
+    """ETag по версиям тегов (по умолчанию — data); ответ 304, если у клиента та же версия
+
+    Вызывается до чтения данных: запись между расчётом ETag и запросом
+    к БД даст клиенту новые данные со старым ETag, и следующий запрос
+    просто получит 200.
+    """
+    etag = response_cache.etag(tags or (DATA_TAG,), extra)
+    response.headers["Cache-Control"] = NO_CACHE
+    if etag is None:
+        return None
+    response.headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": NO_CACHE})
+    return None
+
+_HASHED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<suffix>\.[^./]+)$")
+_STATIC_LINK = re.compile(r'(?P<attr>(?:href|src)=")/static/(?P<path>[^"?#]+)"')
+
+class HashedStaticFiles(StaticFiles):
+    """StaticFiles с адресами по хешу содержимого и заголовками кэширования"""
+
+    def __init__(self, *args, url_prefix: str = "/static", index: str = "index.html", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url_prefix = url_prefix
+        self.index = index
+        # Хеши по пути с проверкой mtime: правка файла в разработке меняет адрес
+        self._hashes: Dict[str, Tuple[float, str]] = {}
+
+    def content_hash(self, path: str) -> Optional[str]:
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not os.path.isfile(full_path):
+            return None
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == stat_result.st_mtime:
+            return cached[1]
+        with open(full_path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()[:HASH_LENGTH]
+        self._hashes[path] = (stat_result.st_mtime, digest)
+        return digest
+
+    def asset_url(self, path: str) -> str:
+        digest = self.content_hash(path)
+        if digest is None:
+            return f"{self.url_prefix}/{path}"
+        stem, suffix = os.path.splitext(path)
+        return f"{self.url_prefix}/{stem}.{digest}{suffix}"
+
+    def _render_index(self, scope: Scope) -> Response:
+        full_path, _ = self.lookup_path(self.index)
+        with open(full_path, encoding="utf-8") as file:
+            html = _STATIC_LINK.sub(
+                lambda match: f'{match["attr"]}{self.asset_url(match["path"])}"', file.read()
+            )
+        etag = f'W/"{hashlib.sha256(html.encode()).hexdigest()[:16]}"'
+        headers = {"ETag": etag, "Cache-Control": NO_CACHE}
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(html, headers=headers)
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # Слабое сравнение: после сжатия клиент присылает W/"..."
+        if etag_matches(request_headers.get("if-none-match"), response_headers.get("etag")):
+            return True
+        return super().is_not_modified(response_headers, request_headers)
+
+    async def _file_response(self, path: str, scope: Scope, cache_control: str):
+        response = await super().get_response(path, scope)
+        etag = response.headers.get("etag")
+        if etag and not etag.startswith(("W/", '"')):
+            # Starlette отдаёт ETag без кавычек
+            response.headers["etag"] = f'"{etag}"'
+        response.headers.setdefault("Cache-Control", cache_control)
+        return response
+
+    async def get_response(self, path: str, scope: Scope):
+        if path == self.index:
+            return self._render_index(scope)
+
+        match = _HASHED_NAME.match(path)
+        if match is not None:
+            original = match["stem"] + match["suffix"]
+            digest = self.content_hash(original)
+            if digest is not None:
+                # Устаревший хеш — отдаём текущий файл, но без долгого кэша
+                return await self._file_response(
+                    original, scope, IMMUTABLE if digest == match["hash"] else NO_CACHE
+                )
+
+        return await self._file_response(path, scope, NO_CACHE)
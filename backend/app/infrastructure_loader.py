@@ -0,0 +1,294 @@
+"""Импорт справочника объектов инфраструктуры из GeoJSON и CSV
+
+Файлы читаются потоково: объекты GeoJSON разбираются по одному прямо из
+массива features (или построчно для GeoJSON Lines), строки CSV — через
+csv.DictReader, и пишутся в infrastructure_objects пачками.
+
+Работающий сервер загружает справочник через
+    POST /api/infrastructure/import (multipart-файл; ?format=csv, ?replace=true)
+— объекты сразу попадают в его пространственный индекс, а затронутые идеи
+ставятся в очередь пересчёта приоритетов.
+
+Из командной строки (из папки backend):
+    python -m app.infrastructure_loader objects.geojson [--format csv] [--replace]
+Это отдельный процесс: он пишет только в БД. Запущенный сервер увидит
+новые объекты и пересчитает приоритеты только после перезапуска.
+"""
+import argparse
+import csv
+import json
+import logging
+import uuid
+from types import SimpleNamespace
+from typing import IO, Dict, Iterator, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from . import models, geo_index, priority_updates
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Допустимые названия колонок CSV
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng')
+
+def _first(row: Dict, names) -> Optional[str]:
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return value
+    return None
+
+def _object_row(object_type, latitude, longitude, name=None, condition=None) -> Optional[Dict]:
+    if not object_type or latitude is None or longitude is None:
+        return None
+    return {
+        'id': str(uuid.uuid4()),
+        'type': str(object_type).strip(),
+        'latitude': float(latitude),
+        'longitude': float(longitude),
+        'name': name or None,
+        'condition': condition or None
+    }
+
+# CSV
+
+def iter_csv(stream: IO[str]) -> Iterator[Dict]:
+    """Строки CSV с колонками type, latitude/lat, longitude/lon/lng, name, condition"""
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        try:
+            obj = _object_row(row.get('type'), _first(row, LATITUDE_COLUMNS),
+                              _first(row, LONGITUDE_COLUMNS), row.get('name'), row.get('condition'))
+        except ValueError:
+            obj = None
+        if obj is None:
+            logger.warning(f"Строка {line_number} пропущена: нет типа или координат")
+            continue
+        yield obj
+
+# GeoJSON
+
+def _point(geometry: Optional[Dict]):
+    """Точка объекта: сама точка или центр вершин линии/полигона"""
+    if not geometry:
+        return None
+    coordinates = geometry.get('coordinates')
+    if geometry.get('type') == 'Point':
+        return coordinates[1], coordinates[0]
+
+    # Уникальные вершины: замыкающая вершина кольца совпадает с первой
+    vertices = set()
+    stack = [coordinates]
+    while stack:
+        item = stack.pop()
+        if item and isinstance(item[0], (int, float)):
+            vertices.add((item[0], item[1]))
+        elif item:
+            stack.extend(item)
+    if not vertices:
+        return None
+    return (sum(v[1] for v in vertices) / len(vertices),
+            sum(v[0] for v in vertices) / len(vertices))
+
+def _feature_row(feature: Dict, type_property: str) -> Optional[Dict]:
+    properties = feature.get('properties') or {}
+    point = _point(feature.get('geometry'))
+    if point is None:
+        return None
+    return _object_row(properties.get(type_property), point[0], point[1],
+                       properties.get('name'), properties.get('condition'))
+
+def _iter_json_array(stream: IO[str], key: str) -> Iterator[Dict]:
+    """Элементы массива key верхнего уровня без чтения всего файла в память"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+
+    def fill() -> bool:
+        nonlocal buffer, position
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    # Ищем начало массива: "key" ... [
+    marker = f'"{key}"'
+    while True:
+        index = buffer.find(marker, position)
+        if index >= 0:
+            bracket = buffer.find('[', index + len(marker))
+            if bracket >= 0:
+                position = bracket + 1
+                break
+        if not fill():
+            raise ValueError(f"В GeoJSON нет массива {key}")
+
+    while True:
+        # Пропускаем пробелы и запятые между элементами
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or not fill():
+                break
+        if position >= len(buffer):
+            raise ValueError("GeoJSON оборван")
+        if buffer[position] == ']':
+            return
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                break
+            except json.JSONDecodeError:
+                # Элемент не поместился в буфер целиком — дочитываем
+                if not fill():
+                    raise
+        position = end
+        yield item
+
+def iter_geojson(stream: IO[str], type_property: str = 'type') -> Iterator[Dict]:
+    """Объекты из FeatureCollection или GeoJSON Lines (по объекту в строке)"""
+    # Формат определяется по началу файла: первый объект разбирается целиком
+    # раньше, чем встретится ключ "features", только в GeoJSON Lines
+    head = ''
+    first = None
+    while '"features"' not in head:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        head += chunk
+        try:
+            first, _ = json.JSONDecoder().raw_decode(head.lstrip())
+            break
+        except json.JSONDecodeError:
+            continue
+    source = _PrefixedStream(head, stream)
+
+    if isinstance(first, dict) and first.get('type') == 'Feature':
+        features = (json.loads(line) for line in source if line.strip())
+    else:
+        features = _iter_json_array(source, 'features')
+
+    for number, feature in enumerate(features, start=1):
+        try:
+            row = _feature_row(feature, type_property)
+        except (ValueError, TypeError, IndexError, AttributeError):
+            # Битые координаты пропускаем так же, как строки CSV
+            row = None
+        if row is None:
+            logger.warning(f"Объект {number} пропущен: нет типа или геометрии")
+            continue
+        yield row
+
+class _PrefixedStream:
+    """Текстовый поток с уже прочитанным началом"""
+
+    def __init__(self, prefix: str, stream: IO[str]):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> str:
+        if self._prefix:
+            data, self._prefix = self._prefix, ''
+            return data
+        return self._stream.read(size)
+
+    def __iter__(self) -> Iterator[str]:
+        lines = self._prefix.split('\n')
+        self._prefix = ''
+        for line in lines[:-1]:
+            yield line + '\n'
+        # Последняя строка начала оборвана — дочитываем её из потока
+        yield lines[-1] + self._stream.readline()
+        yield from self._stream
+
+# Загрузка
+
+def detect_format(filename: str) -> str:
+    return 'csv' if filename.lower().endswith('.csv') else 'geojson'
+
+def load_infrastructure(db: Session, stream: IO[str], fmt: str = 'geojson',
+                        replace: bool = False, batch_size: int = 5000,
+                        type_property: str = 'type') -> int:
+    """Потоковый импорт объектов; возвращает число загруженных
+
+    При replace=True удаление старых объектов и вставка новых идут одной
+    транзакцией, которая фиксируется только после разбора всего файла:
+    ошибка разбора откатывает её, и справочник остаётся прежним. Без
+    replace пачки фиксируются по мере загрузки.
+    """
+    rows = iter_csv(stream) if fmt == 'csv' else iter_geojson(stream, type_property)
+    table = models.InfrastructureObject.__table__
+
+    total = 0
+    types = set()
+    batch = []
+
+    def write():
+        nonlocal total
+        db.execute(insert(table), batch)
+        types.update(row['type'] for row in batch)
+        if not replace:
+            db.commit()
+            for row in batch:
+                geo_index.add_infrastructure_object(SimpleNamespace(**row))
+        total += len(batch)
+        batch.clear()
+
+    try:
+        if replace:
+            # Удалённые типы тоже влияют на оценки идей
+            types.update(row.type for row in db.query(models.InfrastructureObject.type).distinct())
+            db.execute(delete(table))
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                write()
+        if batch:
+            write()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if replace:
+            # Справочник заменён целиком (или замена откатилась) —
+            # индекс перечитается из БД
+            geo_index.reset()
+        for object_type in types:
+            priority_updates.infrastructure_changed(object_type)
+
+    logger.info(f"Загружено объектов инфраструктуры: {total}")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт объектов инфраструктуры")
+    parser.add_argument("path", help="Файл GeoJSON, GeoJSON Lines или CSV")
+    parser.add_argument("--format", choices=["geojson", "csv"], help="Формат (по умолчанию по расширению)")
+    parser.add_argument("--replace", action="store_true", help="Удалить существующие объекты")
+    parser.add_argument("--type-property", default="type", help="Свойство GeoJSON с типом объекта")
+    args = parser.parse_args()
+
+    from .database import SessionLocal, engine, Base
+    Base.metadata.create_all(bind=engine)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8", newline="") as stream:
+            count = load_infrastructure(db, stream, args.format or detect_format(args.path),
+                                        replace=args.replace, type_property=args.type_property)
+        print(f"Загружено объектов: {count}")
+        print("Запущенный сервер увидит их после перезапуска "
+              "(или загрузите файл через POST /api/infrastructure/import)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
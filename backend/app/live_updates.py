@@ -0,0 +1,289 @@
+"""Живые обновления идей и голосов для открытых карт (WebSocket / SSE)
+
+Запись в crud (create_idea, update_idea, create_vote), буфер голосов и
+пересчёт приоритетов публикуют события в шину LiveBus. Шина один раз
+кодирует событие в JSON и раскладывает его по очередям подписчиков,
+у которых идея попадает в bbox и категорию подписки (кандидаты берутся
+из сетки по bbox подписок, а не перебором всех соединений). Клиенты БД не
+опрашивают: данные события берутся из только что записанной идеи (для
+голосов — один запрос на пачку, и только при наличии подписчиков).
+
+События (поле type):
+  - idea_created / idea_updated — idea: поля IdeaMarker, status и votes_count;
+  - idea_voted — idea: id, category, latitude, longitude, votes_count;
+  - resync — очередь подписчика переполнилась, часть событий потеряна:
+    клиенту нужно заново загрузить видимые данные.
+Каждое событие несёт сквозной номер seq.
+
+Публикация приходит из потоков (синхронные маршруты, буфер голосов,
+пересчёт приоритетов) и передаётся в цикл событий через
+call_soon_threadsafe, поэтому никогда не ждёт медленных клиентов.
+Очередь каждого подписчика ограничена (LIVE_QUEUE_SIZE): отстающий
+клиент теряет накопленные события и получает один resync, а память на
+соединение не растёт.
+"""
+import asyncio
+import json
+import math
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .spatial import Bounds
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него — json.dumps
+    orjson = None
+
+class LiveBusFull(Exception):
+    """Достигнуто ограничение на число подписчиков"""
+
+def _encode(event: Dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(event).decode()
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+def _value(value):
+    return getattr(value, "value", value)
+
+# Ячейка сетки подписок (~1 км); bbox больше MAX_CELLS ячеек (отдалённая
+# карта) проверяется на каждом событии, как подписка без bbox
+CELL_DEGREES = 0.01
+MAX_CELLS = 256
+
+Cell = Tuple[int, int]
+
+def _cell(lat: float, lon: float) -> Cell:
+    return int(math.floor(lat / CELL_DEGREES)), int(math.floor(lon / CELL_DEGREES))
+
+def _cells(bbox: Bounds) -> Optional[Tuple[Cell, ...]]:
+    south, west, north, east = bbox
+    (min_i, min_j), (max_i, max_j) = _cell(south, west), _cell(north, east)
+    if (max_i - min_i + 1) * (max_j - min_j + 1) > MAX_CELLS:
+        return None
+    return tuple((i, j) for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1))
+
+# Место в очереди, где были сброшены события; кодируется при выдаче
+_RESYNC = object()
+
+class Subscription:
+    """Подписка одного соединения: фильтр и ограниченная очередь сообщений"""
+
+    def __init__(self, bus: "LiveBus", bbox: Optional[Bounds], categories: Optional[Iterable[str]],
+                 maxsize: int):
+        self.bus = bus
+        self.maxsize = maxsize
+        self.bbox = None
+        self.categories = None
+        self.cells: Optional[Tuple[Cell, ...]] = ()
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._ready = asyncio.Event()
+        self.update(bbox, categories)
+
+    def update(self, bbox: Optional[Bounds], categories: Optional[Iterable[str]]):
+        """Смена фильтра (клиент сдвинул карту или сменил категорию)"""
+        self.bbox = tuple(bbox) if bbox else None
+        self.categories = frozenset(_value(category) for category in categories) if categories else None
+        self.bus._index(self)
+
+    def matches(self, idea: Dict) -> bool:
+        if self.categories is not None and idea["category"] not in self.categories:
+            return False
+        if self.bbox is not None:
+            south, west, north, east = self.bbox
+            return south <= idea["latitude"] <= north and west <= idea["longitude"] <= east
+        return True
+
+    def put(self, message: str):
+        """Постановка в очередь без ожидания; при переполнении — сброс и resync"""
+        if len(self._queue) >= self.maxsize:
+            dropped = sum(1 for item in self._queue if item is not _RESYNC)
+            self.dropped += dropped
+            self.bus.counters["dropped"] += dropped
+            self.bus.counters["resyncs"] += 1
+            self._queue.clear()
+            self._queue.append(_RESYNC)
+        self._queue.append(message)
+        self._ready.set()
+
+    async def get(self) -> str:
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        message = self._queue.popleft()
+        return self.bus.resync_message() if message is _RESYNC else message
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+class LiveBus:
+    """Шина событий в памяти процесса с раздачей подписчикам в цикле событий"""
+
+    def __init__(self, queue_size: int = 256, max_subscribers: int = 10000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        # Подписки по ячейкам сетки bbox; без bbox или с очень большим — в _everywhere
+        self._cells: Dict[Cell, Set[Subscription]] = defaultdict(set)
+        self._everywhere: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self.counters = {"published": 0, "delivered": 0, "dropped": 0, "resyncs": 0}
+
+    @property
+    def active(self) -> bool:
+        """Есть ли кому отправлять (иначе события даже не собираются)"""
+        return self._loop is not None and bool(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+
+    def stop(self):
+        self._loop = None
+        for subscription in list(self._subscribers):
+            self.unsubscribe(subscription)
+
+    def subscribe(self, bbox: Optional[Bounds] = None,
+                  categories: Optional[Iterable[str]] = None) -> Subscription:
+        if self.full:
+            raise LiveBusFull(f"Подписчиков уже {len(self._subscribers)}")
+        subscription = Subscription(self, bbox, categories, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        self._unindex(subscription)
+
+    def _index(self, subscription: Subscription):
+        self._unindex(subscription)
+        cells = _cells(subscription.bbox) if subscription.bbox else None
+        if cells is None:
+            subscription.cells = None
+            self._everywhere.add(subscription)
+            return
+        subscription.cells = cells
+        for cell in cells:
+            self._cells[cell].add(subscription)
+
+    def _unindex(self, subscription: Subscription):
+        if subscription.cells is None:
+            self._everywhere.discard(subscription)
+            return
+        for cell in subscription.cells:
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(subscription)
+                if not bucket:
+                    del self._cells[cell]
+        subscription.cells = ()
+
+    def _next_seq(self) -> int:
+        with self._seq_lock:
+            self._seq += 1
+            return self._seq
+
+    def resync_message(self) -> str:
+        return _encode({"type": "resync", "seq": self._seq})
+
+    def publish(self, event_type: str, idea: Dict):
+        """Событие по идее; вызывается из любого потока"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        event = {"type": event_type, "seq": self._next_seq(), "idea": idea}
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(event)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._fanout, event)
+            except RuntimeError:  # цикл уже закрыт (остановка приложения)
+                pass
+
+    def _fanout(self, event: Dict):
+        self.counters["published"] += 1
+        message = None
+        idea = event["idea"]
+        candidates = list(self._everywhere)
+        candidates.extend(self._cells.get(_cell(idea["latitude"], idea["longitude"]), ()))
+        for subscription in candidates:
+            if not subscription.matches(idea):
+                continue
+            if message is None:
+                message = _encode(event)
+            subscription.put(message)
+            self.counters["delivered"] += 1
+
+    def stats(self) -> Dict:
+        queued = [len(subscription) for subscription in self._subscribers]
+        return {
+            **self.counters,
+            "subscribers": len(queued),
+            "queued": sum(queued),
+            "max_queued": max(queued, default=0),
+            "queue_size": self.queue_size,
+            "max_subscribers": self.max_subscribers
+        }
+
+live_bus = LiveBus(
+    queue_size=int(os.getenv("LIVE_QUEUE_SIZE", "256")),
+    max_subscribers=int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+)
+
+def idea_event(idea) -> Dict:
+    """Данные идеи для события: поля метки карты, статус и голоса"""
+    return {
+        "id": idea.id,
+        "title": idea.title,
+        "category": _value(idea.category),
+        "status": _value(idea.status),
+        "latitude": idea.latitude,
+        "longitude": idea.longitude,
+        "importance_score": idea.importance_score,
+        "priority": models.priority_for(idea.importance_score),
+        "votes_count": idea.votes_count or 0
+    }
+
+# Хуки записи
+def idea_created(idea):
+    if live_bus.active:
+        live_bus.publish("idea_created", idea_event(idea))
+
+def idea_changed(idea):
+    if live_bus.active:
+        live_bus.publish("idea_updated", idea_event(idea))
+
+def ideas_voted(db: Session, idea_ids: Iterable[str]):
+    """Новые счётчики голосов — один запрос на пачку, только при наличии подписчиков"""
+    if not live_bus.active:
+        return
+    idea_ids: List[str] = list(idea_ids)
+    if not idea_ids:
+        return
+    rows = db.query(
+        models.Idea.id, models.Idea.category, models.Idea.latitude,
+        models.Idea.longitude, models.Idea.votes_count
+    ).filter(models.Idea.id.in_(idea_ids)).all()
+    for row in rows:
+        live_bus.publish("idea_voted", {
+            "id": row.id,
+            "category": _value(row.category),
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "votes_count": row.votes_count or 0
+        })
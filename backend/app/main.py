@@ -1,19 +1,33 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
+import asyncio
 import os
 from dotenv import load_dotenv
 
-from .database import engine, Base
-from . import schemas, crud, services
+from .database import engine, async_engine, Base, SessionLocal, ensure_indexes
+from . import schemas, crud, services, spatial, search
+from . import telegram_bot
+from .compression import CompressionMiddleware
+from .http_cache import HashedStaticFiles
 from .telegram_bot import init_bot
+from .analytics_snapshot import run_reconcile_job
+from .vote_buffer import vote_buffer
+from .priority_updates import priority_updater
+from .live_updates import live_bus
+from .telegram_queue import start_dispatcher, stop_dispatcher
+from .telegram_updates import start_update_processor, stop_update_processor
 
 # Загрузка переменных окружения
 load_dotenv()
 
-# Создание таблиц БД
+# Создание таблиц БД, недостающих индексов моделей, пространственного и
+# полнотекстового индексов идей
 Base.metadata.create_all(bind=engine)
+ensure_indexes(engine)
+crud.ensure_vote_constraint(engine)
+spatial.ensure_index(engine)
+search.ensure_index(engine)
 
 app = FastAPI(
     title="Городской Контур API",
@@ -32,15 +46,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Подключение статических файлов
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Сжатие ответов (Brotli, если установлен пакет brotli, иначе GZip)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+
+# Подключение статических файлов: ресурсы из index.html — по адресам с хешем содержимого
+app.mount("/static", HashedStaticFiles(directory="static"), name="static")
 
 # Подключение роутеров напрямую
-from .api.endpoints import ideas, users, analytics, telegram
+from .api.endpoints import ideas, users, analytics, map, live, infrastructure, telegram
 app.include_router(ideas.router, prefix="/api", tags=["ideas"])
 app.include_router(users.router, prefix="/api", tags=["users"])
 app.include_router(analytics.router, prefix="/api", tags=["analytics"])
+app.include_router(map.router, prefix="/api", tags=["map"])
+app.include_router(live.router, prefix="/api", tags=["live"])
+app.include_router(infrastructure.router, prefix="/api", tags=["infrastructure"])
 app.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
+app.include_router(telegram_bot.router, prefix="/telegram", tags=["telegram"])
 
 @app.get("/")
 async def root():
@@ -62,8 +83,54 @@ async def startup_event():
     if telegram_token:
         init_bot(telegram_token)
         print("✅ Telegram бот инициализирован")
+        
+        # Очередь исходящих сообщений (0 воркеров — отправка напрямую)
+        queue_workers = int(os.getenv("TELEGRAM_QUEUE_WORKERS", "4"))
+        if queue_workers > 0:
+            await start_dispatcher(
+                telegram_bot.telegram_bot,
+                SessionLocal,
+                workers=queue_workers,
+                global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+                chat_rate=float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+            )
+        
+        # Фоновая обработка вебхука (0 воркеров — обработка внутри запроса)
+        update_workers = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "4"))
+        if update_workers > 0:
+            await start_update_processor(
+                telegram_bot.handle_update,
+                SessionLocal,
+                workers=update_workers
+            )
     else:
         print("⚠️ TELEGRAM_BOT_TOKEN не установлен")
+    
+    # Периодическая сверка снимка аналитики с БД (0 — отключить)
+    reconcile_interval = float(os.getenv("ANALYTICS_RECONCILE_INTERVAL", "3600"))
+    if reconcile_interval > 0:
+        asyncio.create_task(run_reconcile_job(reconcile_interval))
+    
+    # Пакетная запись счётчиков голосов (VOTE_FLUSH_INTERVAL_MS > 0)
+    vote_buffer.start()
+    
+    # Пересчёт приоритетов по событиям (PRIORITY_DEBOUNCE_MS < 0 — выключен)
+    priority_updater.start()
+    
+    # Живые обновления карты (WebSocket / SSE) раздаются в этом цикле событий
+    live_bus.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Завершение фоновых задач"""
+    vote_buffer.stop()
+    priority_updater.stop()
+    live_bus.stop()
+    await stop_update_processor()
+    await stop_dispatcher()
+    if telegram_bot.telegram_bot:
+        await telegram_bot.telegram_bot.close()
+    await async_engine.dispose()
 
 if __name__ == "__main__":
     import uvicorn
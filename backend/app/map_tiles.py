@@ -0,0 +1,255 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.orm import Session
+
+from . import models, spatial
+
+# Тайлы в схеме Web Mercator (z/x/y), как у Яндекс.Карт и OSM
+MAX_ZOOM = 21
+# Ячеек кластеризации на сторону тайла: не больше CLUSTER_GRID² кластеров на тайл
+CLUSTER_GRID = int(os.getenv("MAP_CLUSTER_GRID", "8"))
+# Не больше тайлов на один запрос по bbox
+MAX_TILES = 64
+MAX_LATITUDE = 85.05112878
+
+Bounds = Tuple[float, float, float, float]
+
+def tile_for(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Тайл (x, y), в который попадает точка"""
+    n = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bounds(zoom: int, x: int, y: int) -> Bounds:
+    """Границы тайла: (юг, запад, север, восток)"""
+    n = 1 << zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+def _tile_range(bbox: Bounds, zoom: int) -> Tuple[int, int, int, int]:
+    south, west, north, east = bbox
+    x_min, y_max = tile_for(south, west, zoom)
+    x_max, y_min = tile_for(north, east, zoom)
+    return x_min, y_min, x_max, y_max
+
+def tiles_for_bbox(bbox: Bounds, zoom: int) -> List[Tuple[int, int]]:
+    """Тайлы, покрывающие bbox = (юг, запад, север, восток)"""
+    x_min, y_min, x_max, y_max = _tile_range(bbox, zoom)
+    return [(x, y) for y in range(y_min, y_max + 1) for x in range(x_min, x_max + 1)]
+
+def zoom_for_bbox(bbox: Bounds, zoom: int) -> int:
+    """Наибольший зум не выше заданного, при котором bbox покрывают не больше MAX_TILES тайлов"""
+    while zoom > 0:
+        x_min, y_min, x_max, y_max = _tile_range(bbox, zoom)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) <= MAX_TILES:
+            break
+        zoom -= 1
+    return zoom
+
+def grid_index(db: Session, expression):
+    """Номер ячейки сетки в SQL: целая часть неотрицательного выражения
+
+    CAST в SQLite отбрасывает дробную часть, а в PostgreSQL округляет,
+    поэтому там нужен явный floor — иначе номера ячеек из SQL разойдутся
+    с посчитанными в Python через int().
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(expression, Integer)
+    return cast(func.floor(expression), Integer)
+
+def parse_bbox(value: str) -> Bounds:
+    """bbox из строки «юг,запад,север,восток»"""
+    try:
+        south, west, north, east = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox: ожидается «юг,запад,север,восток»")
+    if south > north or west > east:
+        raise ValueError("bbox: юг должен быть не больше севера, запад — не больше востока")
+    return south, west, north, east
+
+class TileCache:
+    """LRU-кэш агрегатов по тайлам с инвалидацией по точке записи
+
+    Для тайла хранятся варианты с разными фильтрами. Запись идеи удаляет
+    все тайлы, в которые она попадает (по одному на зум). Счётчик
+    generation защищает от гонки: агрегат, посчитанный до записи,
+    не кладётся в кэш после неё.
+    """
+
+    def __init__(self, maxsize: int = 5000):
+        self.maxsize = maxsize
+        self._tiles: "OrderedDict[Tuple[int, int, int], Dict[Hashable, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, tile: Tuple[int, int, int], variant: Hashable) -> Optional[Dict]:
+        with self._lock:
+            variants = self._tiles.get(tile)
+            payload = variants.get(variant) if variants else None
+            if payload is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(tile)
+            self.hits += 1
+            return payload
+
+    def put(self, tile: Tuple[int, int, int], variant: Hashable, payload: Dict, generation: int):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._tiles.setdefault(tile, {})[variant] = payload
+            self._tiles.move_to_end(tile)
+            while len(self._tiles) > self.maxsize:
+                self._tiles.popitem(last=False)
+
+    def invalidate_point(self, lat: float, lon: float):
+        with self._lock:
+            self.generation += 1
+            for zoom in range(MAX_ZOOM + 1):
+                x, y = tile_for(lat, lon, zoom)
+                if self._tiles.pop((zoom, x, y), None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._tiles.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'tiles': len(self._tiles),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+tile_cache = TileCache(int(os.getenv("MAP_TILE_CACHE_SIZE", "5000")))
+
+def _compute_tile(db: Session, zoom: int, x: int, y: int,
+                  category: Optional[str], status: Optional[str]) -> Dict:
+    """Сеточная агрегация идей тайла одним GROUP BY
+
+    Тайл делится на CLUSTER_GRID × CLUSTER_GRID ячеек (равных по градусам
+    внутри тайла); для каждой непустой ячейки — число идей, центр масс и
+    суммарная важность. Для ячеек с одной идеей отдаётся сама идея.
+    """
+    south, west, north, east = tile_bounds(zoom, x, y)
+    cell_lat = (north - south) / CLUSTER_GRID
+    cell_lon = (east - west) / CLUSTER_GRID
+    row = grid_index(db, (models.Idea.latitude - south) / cell_lat)
+    column = grid_index(db, (models.Idea.longitude - west) / cell_lon)
+
+    query = db.query(
+        row, column,
+        func.count(models.Idea.id),
+        func.avg(models.Idea.latitude),
+        func.avg(models.Idea.longitude),
+        func.sum(models.Idea.importance_score),
+        func.max(models.Idea.importance_score),
+        func.min(models.Idea.id)
+    ).filter(
+        spatial.bbox_condition(db, (south, west, north, east)),
+        # Полуоткрытые границы: идея на общей границе тайлов попадает в один из них
+        models.Idea.latitude < north, models.Idea.longitude < east
+    )
+    if category:
+        query = query.filter(models.Idea.category == category)
+    if status:
+        query = query.filter(models.Idea.status == status)
+    rows = query.group_by(row, column).all()
+
+    single_ids = [idea_id for _, _, count, _, _, _, _, idea_id in rows if count == 1]
+    singles = {}
+    if single_ids:
+        for idea in db.query(
+            models.Idea.id, models.Idea.title, models.Idea.category,
+            models.Idea.priority
+        ).filter(models.Idea.id.in_(single_ids)):
+            singles[idea.id] = {
+                'id': idea.id,
+                'title': idea.title,
+                'category': getattr(idea.category, 'value', idea.category),
+                'priority': idea.priority
+            }
+
+    clusters = []
+    for _, _, count, lat, lon, weight, max_score, idea_id in rows:
+        cluster = {
+            'latitude': lat,
+            'longitude': lon,
+            'count': count,
+            'weight': round(weight or 0.0, 3),
+            'max_score': round(max_score or 0.0, 3)
+        }
+        if count == 1:
+            cluster['idea'] = singles.get(idea_id)
+        clusters.append(cluster)
+
+    return {'z': zoom, 'x': x, 'y': y, 'clusters': clusters}
+
+def get_tile(db: Session, zoom: int, x: int, y: int,
+             category: Optional[str] = None, status: Optional[str] = None) -> Dict:
+    """Агрегат тайла из кэша или из БД"""
+    tile = (zoom, x, y)
+    variant = (category, status)
+    payload = tile_cache.get(tile, variant)
+    if payload is None:
+        generation = tile_cache.generation
+        payload = _compute_tile(db, zoom, x, y, category, status)
+        tile_cache.put(tile, variant, payload, generation)
+    return payload
+
+def get_clusters(db: Session, bbox: Bounds, zoom: int,
+                 category: Optional[str] = None, status: Optional[str] = None) -> Dict:
+    """Кластеры всех тайлов, покрывающих bbox
+
+    Для слишком крупного bbox зум уменьшается, пока число тайлов не
+    уложится в MAX_TILES, — размер ответа ограничен MAX_TILES ×
+    CLUSTER_GRID² кластеров при любом числе идей.
+    """
+    zoom = zoom_for_bbox(bbox, zoom)
+    tiles = tiles_for_bbox(bbox, zoom)
+
+    # Кластеры отдаются по тайлам целиком: тайлы чуть шире bbox, зато
+    # идеи у его края не теряются из-за центра кластера за границей
+    clusters = []
+    for x, y in tiles:
+        clusters.extend(get_tile(db, zoom, x, y, category, status)['clusters'])
+    return {'zoom': zoom, 'total': sum(c['count'] for c in clusters), 'clusters': clusters}
+
+def get_heatmap(db: Session, bbox: Bounds, zoom: int,
+                category: Optional[str] = None, status: Optional[str] = None) -> Dict:
+    """Ячейки тепловой карты: [широта, долгота, число идей, суммарная важность]"""
+    result = get_clusters(db, bbox, zoom, category, status)
+    return {
+        'zoom': result['zoom'],
+        'total': result['total'],
+        'cells': [
+            [cluster['latitude'], cluster['longitude'], cluster['count'], cluster['weight']]
+            for cluster in result['clusters']
+        ]
+    }
+
+def idea_changed(idea):
+    """Идея записана: сброс тайлов, в которые она попадает"""
+    tile_cache.invalidate_point(idea.latitude, idea.longitude)
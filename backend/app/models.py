@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Enum, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Text, Boolean, ForeignKey, Enum, JSON, Index, UniqueConstraint, LargeBinary, case
+from sqlalchemy.orm import defer, deferred, relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 import uuid
 from enum import Enum as PyEnum
@@ -23,6 +24,17 @@ class IdeaStatus(str, PyEnum):
     COMPLETED = "completed"
     REJECTED = "rejected"
 
+# Границы приоритета по importance_score (как в IdeaPrioritizer._determine_priority)
+PRIORITY_THRESHOLDS = (("critical", 0.8), ("high", 0.6), ("medium", 0.4))
+
+def priority_for(score) -> str:
+    """Приоритет по importance_score"""
+    score = score or 0.0
+    for name, threshold in PRIORITY_THRESHOLDS:
+        if score >= threshold:
+            return name
+    return "low"
+
 class User(Base):
     __tablename__ = "users"
     
@@ -37,8 +49,8 @@ class User(Base):
     telegram_id = Column(String(50))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    ideas = relationship("Idea", back_populates="author")
-    votes = relationship("Vote", back_populates="user")
+    ideas = relationship("Idea", back_populates="author", lazy="raise")
+    votes = relationship("Vote", back_populates="user", lazy="raise")
 
 class Idea(Base):
     __tablename__ = "ideas"
@@ -65,16 +77,41 @@ class Idea(Base):
     infrastructure_deficit = Column(Float, default=0.0)
     social_weight = Column(Float, default=0.0)
     
-    # Файлы
-    photo_urls = Column(JSON, default=list)
+    # Файлы (в ответы API не входят — загружаются только при обращении)
+    photo_urls = deferred(Column(JSON, default=list))
     
     # Технические поля
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    author = relationship("User", back_populates="ideas")
-    votes = relationship("Vote", back_populates="idea")
-    comments = relationship("Comment", back_populates="idea")
+    # Связи не загружаются неявно: обращение без selectinload/joinedload в
+    # запросе — ошибка, а не N+1 запросов при сериализации списка
+    author = relationship("User", back_populates="ideas", lazy="raise")
+    votes = relationship("Vote", back_populates="idea", lazy="raise")
+    comments = relationship("Comment", back_populates="idea", lazy="raise")
+    # Отпечаток читает только индекс дубликатов: при записи одной идеи — по
+    # обращению, при пересчёте пачкой — через contains_eager
+    fingerprint = relationship("IdeaFingerprint", uselist=False, cascade="all, delete-orphan")
+    
+    # Составные индексы под keyset-пагинацию (в т.ч. с фильтрами)
+    __table_args__ = (
+        Index("ix_ideas_score_id", "importance_score", "id"),
+        Index("ix_ideas_category_score_id", "category", "importance_score", "id"),
+        Index("ix_ideas_status_score_id", "status", "importance_score", "id"),
+        Index("ix_ideas_created_id", "created_at", "id"),
+    )
+    
+    @hybrid_property
+    def priority(self):
+        """Приоритет, вычисляемый из importance_score"""
+        return priority_for(self.importance_score)
+    
+    @priority.expression
+    def priority(cls):
+        return case(
+            *[(cls.importance_score >= threshold, name) for name, threshold in PRIORITY_THRESHOLDS],
+            else_="low"
+        )
 
 class Vote(Base):
     __tablename__ = "votes"
@@ -85,8 +122,13 @@ class Vote(Base):
     vote_type = Column(String(10))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    user = relationship("User", back_populates="votes")
-    idea = relationship("Idea", back_populates="votes")
+    user = relationship("User", back_populates="votes", lazy="raise")
+    idea = relationship("Idea", back_populates="votes", lazy="raise")
+    
+    # Один голос пользователя за идею
+    __table_args__ = (
+        UniqueConstraint("user_id", "idea_id", name="uq_votes_user_idea"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -97,7 +139,21 @@ class Comment(Base):
     text = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    idea = relationship("Idea", back_populates="comments")
+    idea = relationship("Idea", back_populates="comments", lazy="raise")
+
+class IdeaFingerprint(Base):
+    """Разобранное описание идеи и его MinHash-сигнатура
+
+    Считаются один раз при записи идеи; отпечатки устаревших версий
+    пересчитываются при загрузке индекса дубликатов.
+    """
+    __tablename__ = "idea_fingerprints"
+    
+    idea_id = Column(String(36), ForeignKey("ideas.id"), primary_key=True)
+    version = Column(Integer, nullable=False)
+    tokenizer_version = Column(Integer, nullable=False)
+    tokens = Column(JSON, nullable=False)
+    signature = Column(LargeBinary, nullable=False)
 
 class InfrastructureObject(Base):
     __tablename__ = "infrastructure_objects"
@@ -108,4 +164,36 @@ class InfrastructureObject(Base):
     longitude = Column(Float, nullable=False)
     name = Column(String(255))
     condition = Column(String(50))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class TelegramOutbox(Base):
+    """Очередь исходящих сообщений Telegram"""
+    __tablename__ = "telegram_outbox"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(String(64), nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, nullable=False)
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_telegram_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+class TelegramProcessedUpdate(Base):
+    """Принятые обновления Telegram (защита от повторной доставки вебхука)"""
+    __tablename__ = "telegram_processed_updates"
+    
+    update_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    received_at = Column(DateTime, nullable=False, index=True)
+
+# Полные сущности Idea без тяжёлых столбцов — для внутренних пересчётов,
+# которым не нужны описание и фото; случайное обращение к ним — ошибка
+WITHOUT_HEAVY_COLUMNS = (
+    defer(Idea.description, raiseload=True),
+    defer(Idea.photo_urls, raiseload=True),
+)
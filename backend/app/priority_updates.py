@@ -0,0 +1,315 @@
+import os
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models, geo_index, map_tiles, response_cache, live_updates
+from .analytics_snapshot import analytics_snapshot, idea_key
+from .database import SessionLocal
+from .services import IdeaPrioritizer, _category_key
+from .vote_buffer import vote_buffer
+
+logger = logging.getLogger(__name__)
+
+class PriorityRecomputer:
+    """Пересчёт важности идей по событиям
+
+    События (голос, комментарий, новая идея рядом, изменение инфраструктуры)
+    помечают затронутые идеи «грязными». Фоновый поток раз в interval_ms
+    берёт идеи, помеченные не позже чем debounce_ms назад, и пересчитывает
+    их пачками через IdeaPrioritizer.score_batch: серия голосов за одну идею
+    даёт один пересчёт, а полный проход по таблице не нужен.
+
+    Старение тоже обрабатывается как событие: раз в sweep_interval секунд
+    sweep_decay помечает соседей тех молодых идей, чей возраст перешёл
+    границу суток, — только у них меняется фактор дубликатов.
+    """
+
+    def __init__(self, session_factory: Callable, debounce_ms: int = 2000,
+                 interval_ms: int = 500, batch_size: int = 500, city_population: int = 90000,
+                 sweep_interval: float = 3600):
+        self.session_factory = session_factory
+        self.debounce_ms = debounce_ms
+        self.interval_ms = interval_ms
+        self.batch_size = batch_size
+        self.city_population = city_population
+        self.sweep_interval = sweep_interval
+        self._last_sweep: Optional[datetime] = None
+        self.prioritizer = IdeaPrioritizer()
+        # id идеи -> момент первой пометки (time.monotonic)
+        self._dirty: Dict[str, float] = {}
+        # Новые идеи, чьих соседей нужно пометить, и изменившиеся типы инфраструктуры
+        self._new_ideas: Dict[str, float] = {}
+        self._infra_types: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"rescored": 0, "changed": 0, "batches": 0, "decayed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.debounce_ms >= 0
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty) + len(self._new_ideas)
+
+    # События
+
+    def mark_dirty(self, idea_ids: Iterable[str]):
+        now = time.monotonic()
+        with self._lock:
+            for idea_id in idea_ids:
+                self._dirty.setdefault(str(idea_id), now)
+
+    def idea_created(self, idea_id: str):
+        """Новая идея: сама идея и идеи той же категории в радиусе дубликатов"""
+        now = time.monotonic()
+        with self._lock:
+            self._dirty.setdefault(str(idea_id), now)
+            self._new_ideas.setdefault(str(idea_id), now)
+
+    def infrastructure_changed(self, object_type: str):
+        """Объект инфраструктуры добавлен, удалён или сменил состояние
+
+        Ближайший объект нужного типа может смениться у идеи на любом
+        расстоянии, поэтому помечаются все идеи категорий, для которых
+        этот тип важен. Такие события редки (импорт, правка справочника).
+        """
+        with self._lock:
+            self._infra_types.setdefault(object_type, time.monotonic())
+
+    # Пересчёт
+
+    def flush(self, force: bool = False) -> int:
+        """Пересчёт созревших идей; возвращает число пересчитанных"""
+        total = 0
+        while True:
+            db = self.session_factory()
+            try:
+                batch = self._take_due(db, force)
+                if not batch:
+                    return total
+                try:
+                    total += len(self.rescore(db, batch))
+                except Exception:
+                    # Возвращаем идеи в грязный набор, чтобы не потерять пересчёт
+                    self.mark_dirty(batch)
+                    raise
+            finally:
+                db.close()
+
+    def _take_due(self, db: Session, force: bool) -> List[str]:
+        deadline = time.monotonic() - self.debounce_ms / 1000
+        with self._lock:
+            new_ideas = [i for i, t in self._new_ideas.items() if force or t <= deadline]
+            infra_types = [k for k, t in self._infra_types.items() if force or t <= deadline]
+            for idea_id in new_ideas:
+                del self._new_ideas[idea_id]
+            for object_type in infra_types:
+                del self._infra_types[object_type]
+
+        if new_ideas or infra_types:
+            self.mark_dirty(self._expand(db, new_ideas, infra_types))
+
+        with self._lock:
+            due = [i for i, t in self._dirty.items() if force or t <= deadline][:self.batch_size]
+            for idea_id in due:
+                del self._dirty[idea_id]
+        return due
+
+    def _expand(self, db: Session, new_ideas: List[str], infra_types: List[str]) -> List[str]:
+        geo_index.ensure_loaded(db)
+        affected = []
+
+        radius = self.prioritizer.analysis_radius['duplicate_search']
+        rows = db.query(models.Idea.id, models.Idea.category, models.Idea.latitude,
+                        models.Idea.longitude).filter(models.Idea.id.in_(new_ideas)).all() if new_ideas else []
+        for row in rows:
+            affected.extend(
+                item_id for _, item_id, _ in geo_index.idea_index.radius(
+                    _category_key(row.category), row.latitude, row.longitude, radius
+                )
+            )
+
+        if infra_types:
+            categories = [
+                category for category, types in self.prioritizer.category_to_infra.items()
+                if set(types) & set(infra_types)
+            ]
+            affected.extend(geo_index.idea_index.ids(categories))
+        return affected
+
+    def rescore(self, db: Session, idea_ids: List[str]) -> Dict[str, Dict]:
+        """Пересчёт важности идей и запись изменившихся оценок"""
+        geo_index.ensure_loaded(db)
+        ideas = db.query(models.Idea).options(*models.WITHOUT_HEAVY_COLUMNS).filter(
+            models.Idea.id.in_(list(idea_ids))
+        ).all()
+        if not ideas:
+            return {}
+
+        payloads = [{
+            'id': idea.id,
+            'latitude': idea.latitude,
+            'longitude': idea.longitude,
+            'category': _category_key(idea.category),
+            'votes_count': (idea.votes_count or 0) + vote_buffer.pending(idea.id),
+            'comments_count': idea.comments_count or 0,
+            'created_at': idea.created_at
+        } for idea in ideas]
+
+        # Общий пул соседей для score_batch: лишние элементы пула не меняют
+        # результат, кандидаты дальше радиуса не считаются. Ближайшие объекты
+        # инфраструктуры score_batch берёт из индекса сам.
+        similar_ideas: Dict[str, Dict] = {}
+        for payload in payloads:
+            context = self.prioritizer.build_context(db, payload, self.city_population)
+            for other in context['similar_ideas']:
+                similar_ideas[other['id']] = other
+
+        results = self.prioritizer.score_batch(payloads, {
+            'similar_ideas': list(similar_ideas.values()),
+            'infrastructure_objects': None,
+            'city_population': self.city_population,
+            'now': datetime.now()
+        })
+
+        changed = []
+        for idea, result in zip(ideas, results):
+            values = {
+                'importance_score': result['final_score'],
+                'social_weight': result['components']['social_score'],
+                'infrastructure_deficit': result['components']['infrastructure_score']
+            }
+            if any(getattr(idea, field) != value for field, value in values.items()):
+                changed.append((idea, idea_key(idea)))
+                for field, value in values.items():
+                    setattr(idea, field, value)
+
+        # Хукам ниже нужны только что записанные значения: без expire_on_commit
+        # идеи не перечитываются из БД по одной после commit (N+1)
+        expire_on_commit, db.expire_on_commit = db.expire_on_commit, False
+        try:
+            db.commit()
+        finally:
+            db.expire_on_commit = expire_on_commit
+        for idea, old_key in changed:
+            analytics_snapshot.idea_changed(idea, old_key)
+            map_tiles.idea_changed(idea)
+            response_cache.idea_changed(idea)
+            live_updates.idea_changed(idea)
+
+        self.stats["rescored"] += len(ideas)
+        self.stats["changed"] += len(changed)
+        self.stats["batches"] += 1
+        return {idea.id: result for idea, result in zip(ideas, results)}
+
+    # Старение
+
+    def sweep_decay(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Пометка идей, у которых с прошлого прохода изменился фактор дубликатов
+
+        Вклад соседа зависит от целого числа суток его возраста, поэтому
+        оценка идеи меняется, только когда кто-то из соседей той же
+        категории моложе duplicate_decay_days перешёл границу суток. Такие
+        соседи ищутся по индексу created_at, остальные идеи не трогаются.
+        Возвращает число помеченных идей.
+        """
+        now = now or datetime.now()
+        last = self._last_sweep
+        decay_days = self.prioritizer.duplicate_decay_days
+        radius = self.prioritizer.analysis_radius['duplicate_search']
+
+        recent = db.query(
+            models.Idea.id, models.Idea.category, models.Idea.latitude,
+            models.Idea.longitude, models.Idea.created_at
+        ).filter(
+            models.Idea.created_at >= now - timedelta(days=decay_days + 1)
+        ).all()
+
+        geo_index.ensure_loaded(db)
+        affected = set()
+        for row in recent:
+            if row.created_at is None:
+                continue
+            previous_age = (last - row.created_at).days if last is not None else None
+            if previous_age is not None and (
+                previous_age == (now - row.created_at).days or previous_age >= decay_days
+            ):
+                continue
+            affected.update(
+                item_id for _, item_id, _ in geo_index.idea_index.radius(
+                    _category_key(row.category), row.latitude, row.longitude, radius
+                )
+                if item_id != row.id
+            )
+
+        self._last_sweep = now
+        self.mark_dirty(affected)
+        self.stats["decayed"] += len(affected)
+        return len(affected)
+
+    # Фоновый поток
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="priority-updates", daemon=True)
+        self._thread.start()
+        logger.info(f"Пересчёт приоритетов запущен, задержка {self.debounce_ms} мс")
+
+    def stop(self):
+        """Остановка фонового потока с пересчётом оставшегося"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.flush(force=True)
+
+    def _run(self):
+        next_sweep = time.monotonic()
+        while not self._stop.wait(self.interval_ms / 1000):
+            if self.sweep_interval > 0 and time.monotonic() >= next_sweep:
+                next_sweep = time.monotonic() + self.sweep_interval
+                db = self.session_factory()
+                try:
+                    self.sweep_decay(db)
+                except Exception as e:
+                    logger.error(f"Ошибка учёта старения идей: {e}")
+                finally:
+                    db.close()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка пересчёта приоритетов: {e}")
+
+# Задержка пересчёта в мс; отрицательное значение — пересчёт по событиям выключен
+priority_updater = PriorityRecomputer(
+    SessionLocal,
+    debounce_ms=int(os.getenv("PRIORITY_DEBOUNCE_MS", "2000")),
+    city_population=int(os.getenv("CITY_POPULATION", "90000")),
+    # Период учёта старения в секундах; 0 — не учитывать
+    sweep_interval=float(os.getenv("PRIORITY_DECAY_SWEEP_INTERVAL", "3600"))
+)
+
+def idea_created(idea):
+    if priority_updater.enabled:
+        priority_updater.idea_created(idea.id)
+
+def idea_voted(idea_id: str):
+    if priority_updater.enabled:
+        priority_updater.mark_dirty([idea_id])
+
+def idea_commented(idea_id: str):
+    if priority_updater.enabled:
+        priority_updater.mark_dirty([idea_id])
+
+def infrastructure_changed(object_type: str):
+    if priority_updater.enabled:
+        priority_updater.infrastructure_changed(object_type)
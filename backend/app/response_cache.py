@@ -0,0 +1,393 @@
+"""Кэш ответов горячих эндпоинтов (лента идей, идея, аналитика)
+
+Значение — готовый к отдаче JSON-совместимый ответ; ключ — пространство
+имён и нормализованные параметры запроса. Инвалидация по тегам: у тега
+есть номер версии, запись хранит версии своих тегов на момент расчёта и
+считается устаревшей, если хоть одна из них с тех пор выросла. Запись
+(crud.create_idea, update_idea, create_vote, пересчёт важности) повышает
+версии только затронутых тегов:
+  - idea:<id> — сама идея и все ленты, где она есть;
+  - ideas:<категория> и ideas:* — ленты с фильтром по её категории и без
+    него, в которые новая или изменившаяся идея может попасть;
+  - analytics — сводная аналитика;
+  - data — любая запись (версия данных для ETag лент).
+
+Версии тегов служат и слабыми ETag ответов (etag): пока версия не
+изменилась, клиенту можно ответить 304, не обращаясь к БД. Эпоха
+хранилища в ETag отличает версии после перезапуска процесса (memory)
+или очистки Redis.
+
+Хранилища (RESPONSE_CACHE_BACKEND):
+  - memory — TTL + LRU в памяти процесса (по умолчанию);
+  - redis — общий для всех воркеров Redis (RESPONSE_CACHE_REDIS_URL);
+    без пакета redis или адреса — LocalRedis, заменитель в памяти с теми же
+    командами (для разработки и проверки сериализации);
+  - off — без кэша.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_TAG = "analytics"
+DATA_TAG = "data"
+
+def idea_tag(idea_id) -> str:
+    return f"idea:{idea_id}"
+
+def list_tag(category=None) -> str:
+    return f"ideas:{_normalize(category) if category else '*'}"
+
+def _normalize(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (tuple, list)):
+        return [_normalize(item) for item in value]
+    return value
+
+def make_key(namespace: str, **params) -> str:
+    """Ключ из параметров запроса: None отбрасываются, порядок не важен"""
+    normalized = {name: _normalize(value) for name, value in sorted(params.items()) if value is not None}
+    payload = json.dumps(normalized, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f"{namespace}:{hashlib.sha1(payload.encode()).hexdigest()[:24]}"
+
+class MemoryBackend:
+    """TTL + LRU в памяти процесса
+
+    Версии тегов хранятся отдельно и не вытесняются: иначе сброс версии
+    в 0 снова сделал бы актуальными старые записи.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 2000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._epoch = uuid.uuid4().hex[:8]
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def epoch(self) -> Optional[str]:
+        return self._epoch
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class LocalRedis:
+    """Заменитель Redis в памяти: get, set(ex=), incr, mget, flushdb
+
+    Значения хранятся байтами, как их вернул бы Redis.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(key)
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._alive(key) for key in keys]
+
+    def set(self, key: str, value, ex: Optional[float] = None, nx: bool = False):
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            if nx and self._alive(key) is not None:
+                return None
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._alive(key) or 0) + 1
+            self._data[key] = (str(value).encode(), None)
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisBackend:
+    """Общее хранилище для всех воркеров поверх клиента Redis
+
+    Вытеснение по памяти — политикой самого Redis (maxmemory-policy
+    allkeys-lru), срок жизни — EX у каждой записи. Ошибки Redis не ломают
+    запросы: чтение считается промахом, запись пропускается.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "gk:cache:"):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+        self._epoch: Optional[str] = None
+
+    def get(self, key: str):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception as e:
+            self._error(e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, ttl: float):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False, default=str),
+                            ex=max(1, int(ttl)))
+        except Exception as e:
+            self._error(e)
+
+    def versions(self, tags: List[str]) -> List[int]:
+        if not tags:
+            return []
+        try:
+            return [int(value or 0) for value in self.client.mget([self.prefix + "tag:" + tag for tag in tags])]
+        except Exception as e:
+            self._error(e)
+            # Версия, которой заведомо нет, — запись не будет принята
+            return [-1] * len(tags)
+
+    def bump(self, tags: Iterable[str]):
+        for tag in tags:
+            try:
+                self.client.incr(self.prefix + "tag:" + tag)
+            except Exception as e:
+                self._error(e)
+
+    def epoch(self) -> Optional[str]:
+        """Общая для всех воркеров эпоха; первый воркер её создаёт"""
+        if self._epoch is None:
+            try:
+                self.client.set(self.prefix + "epoch", uuid.uuid4().hex[:8], nx=True)
+                raw = self.client.get(self.prefix + "epoch")
+            except Exception as e:
+                self._error(e)
+                return None
+            self._epoch = raw.decode() if isinstance(raw, bytes) else raw
+        return self._epoch
+
+    def clear(self):
+        # Общий Redis не очищается целиком: записи этого процесса сбрасываются
+        # повышением версий тегов (ResponseCache.clear)
+        pass
+
+    def _error(self, e: Exception):
+        self.errors += 1
+        logger.warning(f"Ошибка кэша Redis: {e}")
+
+    def stats(self) -> Dict:
+        return {'client': type(self.client).__name__, 'errors': self.errors}
+
+class ResponseCache:
+    """Кэш ответов с инвалидацией по тегам и счётчиками попаданий"""
+
+    def __init__(self, backend=None, ttl: float = 30.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Счётчик записей в этом процессе: ответ, посчитанный во время записи,
+        # в кэш не кладётся (версии тегов из списка могли быть прочитаны после неё)
+        self.generation = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.ttl > 0
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], tags: List[str] = (),
+                       tags_of: Optional[Callable[[Any], List[str]]] = None):
+        """Ответ из кэша или compute(); None не кэшируется
+
+        tags — теги, известные до расчёта; tags_of(value) — теги, зависящие
+        от самого ответа (например, id идей в ленте).
+        """
+        if not self.enabled:
+            return compute()
+
+        entry = self.backend.get(key)
+        if entry is not None:
+            entry_tags = list(entry["tags"])
+            if self.backend.versions(entry_tags) == [entry["tags"][tag] for tag in entry_tags]:
+                self._count("hits")
+                return entry["value"]
+            self._count("stale")
+        self._count("misses")
+
+        tags = list(tags)
+        generation = self.generation
+        versions = dict(zip(tags, self.backend.versions(tags)))
+        value = compute()
+        if value is None:
+            return value
+        extra = [tag for tag in (tags_of(value) if tags_of else []) if tag not in versions]
+        versions.update(zip(extra, self.backend.versions(extra)))
+        if generation == self.generation:
+            self.backend.set(key, {"value": value, "tags": versions}, self.ttl)
+        return value
+
+    def invalidate(self, *tags: str):
+        if not tags:
+            return
+        with self._lock:
+            self.generation += 1
+            if self.enabled:
+                self.invalidations += len(tags)
+        if self.enabled:
+            self.backend.bump((*tags, DATA_TAG))
+
+    def etag(self, tags: Iterable[str] = (DATA_TAG,), extra: str = "") -> Optional[str]:
+        """Слабый ETag из версий тегов; None, если версии сейчас недоступны
+
+        Без кэша — из счётчика записей процесса: после любой записи ETag
+        меняется у всех ответов.
+        """
+        if self.enabled:
+            epoch, versions = self.backend.epoch(), self.backend.versions(list(tags))
+            if epoch is None or any(version < 0 for version in versions):
+                return None
+        else:
+            epoch, versions = self._epoch, [self.generation]
+        parts = [epoch, *map(str, versions)] + ([extra] if extra else [])
+        return f'W/"{"-".join(parts)}"'
+
+    def clear(self):
+        if self.backend is not None:
+            with self._lock:
+                self.generation += 1
+            self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            result = {
+                'backend': self.backend.name if self.backend is not None else "off",
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+        if self.backend is not None:
+            result.update(self.backend.stats())
+        return result
+
+def create_backend(kind: str, maxsize: int, redis_url: str = ""):
+    kind = kind.lower()
+    if kind == "off":
+        return None
+    if kind == "redis":
+        client = None
+        if redis_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("Пакет redis не установлен, кэш ответов в LocalRedis")
+        else:
+            logger.warning("RESPONSE_CACHE_REDIS_URL не задан, кэш ответов в LocalRedis")
+        return RedisBackend(client if client is not None else LocalRedis())
+    return MemoryBackend(maxsize)
+
+response_cache = ResponseCache(
+    create_backend(
+        os.getenv("RESPONSE_CACHE_BACKEND", "memory"),
+        int(os.getenv("RESPONSE_CACHE_SIZE", "2000")),
+        os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+    ),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+)
+
+# Хуки записи
+
+def idea_created(idea):
+    response_cache.invalidate(list_tag(idea.category), list_tag(), ANALYTICS_TAG)
+
+def idea_changed(idea, old_category=None):
+    tags = [idea_tag(idea.id), list_tag(idea.category), list_tag(), ANALYTICS_TAG]
+    if old_category is not None and _normalize(old_category) != _normalize(idea.category):
+        tags.append(list_tag(old_category))
+    response_cache.invalidate(*tags)
+
+def ideas_voted(idea_ids: Iterable[str]):
+    """Изменился votes_count идей (порядок лент по важности не меняется)"""
+    response_cache.invalidate(*(idea_tag(idea_id) for idea_id in idea_ids))
+
+def analytics_changed():
+    response_cache.invalidate(ANALYTICS_TAG)
@@ -62,17 +62,41 @@ class IdeaResponse(IdeaBase):
     importance_score: float
     infrastructure_deficit: float
     social_weight: float
+    priority: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class IdeaMarker(BaseModel):
+    """Метка идеи на карте: только поля, нужные для отрисовки"""
+    id: uuid.UUID
+    title: str
+    category: IdeaCategory
+    latitude: float
+    longitude: float
+    importance_score: float
+    priority: Optional[str] = None
+
+class IdeaPage(BaseModel):
+    items: List[IdeaResponse]
+    next_cursor: Optional[str] = None
+
 class IdeaUpdate(BaseModel):
     status: Optional[IdeaStatus] = None
     importance_score: Optional[float] = None
     priority: Optional[str] = None
 
+class DuplicateCheck(BaseModel):
+    description: str = Field(..., min_length=1)
+
+class DuplicateCandidate(BaseModel):
+    idea_id: uuid.UUID
+    similarity: float
+    title: str
+    reason: str
+
 # Vote schemas
 class VoteCreate(BaseModel):
     idea_id: uuid.UUID
@@ -0,0 +1,190 @@
+"""Полнотекстовый поиск по заголовкам и описаниям идей
+
+SQLite: таблица FTS5 с текстом, уже разобранным на основы тем же
+токенизатором, что и у категоризатора (_stem), — встроенные токенизаторы
+FTS5 русских окончаний не знают. Строка индекса хранит id идеи и rowid
+строки ideas; запись поддерживается из crud в той же транзакции, что и
+сама идея, а при старте индекс сверяется с таблицей и при расхождении
+(или смене TOKENIZER_VERSION) строится заново. Ранжирование — bm25,
+заголовок весит вдвое больше описания.
+PostgreSQL: GIN-индекс по to_tsvector('russian', ...), его поддерживает
+сама БД; ранжирование — ts_rank_cd с весом A для заголовка.
+"""
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import database_key
+from .ai.categorizer import LOOKUP_CACHE_SIZE, STOP_WORDS, TOKEN_RE, TOKENIZER_VERSION, _stem
+
+logger = logging.getLogger(__name__)
+
+# Таблица зависит от версии токенизатора: при её смене индекс строится заново
+FTS_TABLE = f"ideas_fts_v{TOKENIZER_VERSION}"
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+REBUILD_BATCH = 5000
+
+ideas_fts = table(FTS_TABLE, column("rowid"), column("idea_id"), column("title"), column("description"))
+
+_SQLITE_STALE = f"""
+    SELECT
+        (SELECT count(*) FROM ideas) != (SELECT count(*) FROM {FTS_TABLE})
+        OR EXISTS (
+            SELECT 1 FROM {FTS_TABLE} f LEFT JOIN ideas i ON i.rowid = f.rowid
+            WHERE i.id IS NOT f.idea_id
+        )
+"""
+
+_POSTGRES_DOCUMENT = "coalesce(ideas.title, '') || ' ' || coalesce(ideas.description, '')"
+_POSTGRES_VECTOR = f"to_tsvector('russian'::regconfig, {_POSTGRES_DOCUMENT})"
+_POSTGRES_RANKED = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(ideas.title, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(ideas.description, '')), 'B')"
+)
+_POSTGRES_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_ideas_search ON ideas USING gin (({_POSTGRES_VECTOR}))",
+)
+
+# Способ поиска для каждого движка: "fts5", "tsvector" или "plain"
+_modes: Dict[Any, str] = {}
+_lock = threading.Lock()
+
+# Словарь описаний невелик, а перебор окончаний — основная цена разбора
+_cached_stem = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(_stem)
+
+def search_terms(value: str) -> List[str]:
+    """Основы слов текста без стоп-слов (одинаково для индекса и запроса)"""
+    return [_cached_stem(word) for word in TOKEN_RE.findall((value or "").lower()) if word not in STOP_WORDS]
+
+def _document(value: str) -> str:
+    return " ".join(search_terms(value))
+
+def ensure_index(engine) -> str:
+    """Создание и сверка индекса; возвращает способ поиска для движка"""
+    key = database_key(engine)
+    mode = _modes.get(key)
+    if mode is not None:
+        return mode
+    with _lock:
+        mode = _modes.get(key)
+        if mode is None:
+            mode = _prepare(engine)
+            _modes[key] = mode
+    return mode
+
+def _prepare(engine) -> str:
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    f"USING fts5(idea_id UNINDEXED, title, description, tokenize='unicode61')"
+                ))
+                # Индексы прежних версий токенизатора больше не нужны
+                for (name,) in connection.execute(text(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND sql LIKE 'CREATE VIRTUAL TABLE%' "
+                    "AND name LIKE 'ideas\\_fts\\_v%' ESCAPE '\\' AND name != :current"
+                ), {"current": FTS_TABLE}).all():
+                    connection.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                if connection.execute(text(_SQLITE_STALE)).scalar():
+                    _rebuild(connection)
+            return "fts5"
+        except OperationalError as e:
+            # SQLite собран без FTS5
+            logger.warning(f"FTS5 недоступен, поиск без индекса: {e}")
+            return "plain"
+    if dialect == "postgresql":
+        with engine.begin() as connection:
+            for statement in _POSTGRES_DDL:
+                connection.execute(text(statement))
+        return "tsvector"
+    return "plain"
+
+def _rebuild(connection):
+    logger.info("Перестройка полнотекстового индекса идей")
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    rows = connection.execute(text("SELECT rowid, id, title, description FROM ideas"))
+    while True:
+        batch = rows.fetchmany(REBUILD_BATCH)
+        if not batch:
+            break
+        connection.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, idea_id, title, description) "
+            f"VALUES (:rowid, :idea_id, :title, :description)"
+        ), [{
+            "rowid": rowid, "idea_id": idea_id,
+            "title": _document(title), "description": _document(description)
+        } for rowid, idea_id, title, description in batch])
+
+def reset():
+    """Забыть подготовленные движки (например, после пересоздания таблиц)"""
+    with _lock:
+        _modes.clear()
+
+def _mode(db: Session) -> str:
+    engine = db.get_bind()
+    return ensure_index(getattr(engine, "engine", engine))
+
+def index_idea(db: Session, idea: models.Idea):
+    """Запись идеи в индекс SQLite в текущей транзакции (до commit)
+
+    Идея должна быть уже отправлена в БД (flush), чтобы у неё был rowid.
+    В PostgreSQL индекс поддерживает сама БД. Если индекс в этом процессе
+    ещё не готовился, запись пропускается: сессия уже держит блокировку
+    записи SQLite, а подготовка всё равно сверит индекс с таблицей ideas.
+    """
+    engine = db.get_bind()
+    if _modes.get(database_key(getattr(engine, "engine", engine))) != "fts5":
+        return
+    rowid = db.execute(text("SELECT rowid FROM ideas WHERE id = :id"), {"id": idea.id}).scalar()
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), {"rowid": rowid})
+    db.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, idea_id, title, description) "
+        f"VALUES (:rowid, :idea_id, :title, :description)"
+    ), {
+        "rowid": rowid, "idea_id": idea.id,
+        "title": _document(idea.title), "description": _document(idea.description)
+    })
+
+def search(db: Session, query, q: str):
+    """Запрос идей, отфильтрованный по совпадению с q и упорядоченный по релевантности
+
+    query — запрос по models.Idea, возможно уже с фильтрами. Если в q нет
+    значимых слов, возвращается None.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    mode = _mode(db)
+    if mode == "fts5":
+        # Каждое слово — префикс основы: «площадк» найдёт «площадка», «площадки»
+        match = " ".join(f'"{term}"*' for term in dict.fromkeys(terms))
+        fts = literal_column(FTS_TABLE)
+        matches = select(
+            ideas_fts.c.rowid.label("rowid"),
+            func.bm25(fts, 0.0, TITLE_WEIGHT, DESCRIPTION_WEIGHT).label("rank")
+        ).where(fts.op("MATCH")(match)).subquery()
+        return query.join(matches, literal_column("ideas.rowid") == matches.c.rowid).order_by(
+            matches.c.rank, models.Idea.id
+        )
+    if mode == "tsvector":
+        tsquery = func.plainto_tsquery("russian", q)
+        return query.filter(literal_column(_POSTGRES_VECTOR).op("@@")(tsquery)).order_by(
+            func.ts_rank_cd(literal_column(_POSTGRES_RANKED), tsquery).desc(), models.Idea.id
+        )
+
+    # Без индекса: каждое слово запроса — подстрока заголовка или описания
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(models.Idea.title.ilike(pattern) | models.Idea.description.ilike(pattern))
+    return query.order_by(models.Idea.importance_score.desc(), models.Idea.id)
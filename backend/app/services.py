@@ -1,11 +1,18 @@
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from geopy.distance import geodesic
 import logging
 
+from .geo import distance_matrix
+from . import geo_index
+
 logger = logging.getLogger(__name__)
 
+def _category_key(category) -> str:
+    """Ключ категории: значение Enum или сама строка"""
+    return getattr(category, 'value', category)
+
 class IdeaPrioritizer:
     """Алгоритм интеллектуального ранжирования идей"""
     
@@ -27,13 +34,35 @@ class IdeaPrioritizer:
             'duplicate_search': 200,
             'infrastructure_search': 1000
         }
+        
+        # Вклад соседней идеи в фактор дубликатов убывает по целым суткам
+        # её возраста и обнуляется через столько дней
+        self.duplicate_decay_days = 30
+        
+        self.category_to_infra = {
+            'sport': ['football_field', 'playground', 'sport_complex'],
+            'art': ['mural', 'sculpture', 'art_object'],
+            'ecology': ['green_zone', 'park', 'waste_sorting'],
+            'infrastructure': ['bench', 'lighting', 'road']
+        }
+        
+        self.condition_weights = {
+            'poor': 0.8,
+            'average': 0.5,
+            'good': 0.2,
+            'unknown': 0.5
+        }
+        
+        # Максимальный размер блока матрицы расстояний (строки × столбцы)
+        self.batch_block_size = 2_000_000
     
     def calculate_importance_score(self, idea: Dict, context: Dict) -> Dict:
         duplicate_score = self._calculate_duplicate_factor(
             idea['latitude'], 
             idea['longitude'], 
             idea['category'],
-            context['similar_ideas']
+            context['similar_ideas'],
+            context.get('now')
         )
         
         social_score = self._calculate_social_factor(
@@ -46,7 +75,7 @@ class IdeaPrioritizer:
             idea['latitude'],
             idea['longitude'],
             idea['category'],
-            context['infrastructure_objects']
+            context.get('infrastructure_objects')
         )
         
         final_score = (
@@ -77,11 +106,38 @@ class IdeaPrioritizer:
             'recommended_action': self._get_recommended_action(priority)
         }
     
+    def build_context(self, db, idea: Dict, city_population: int) -> Dict:
+        """Контекст для calculate_importance_score из пространственного индекса
+        
+        Берутся идеи той же категории в радиусе поиска дубликатов. Объекты
+        инфраструктуры не выбираются: infrastructure_objects = None, и фактор
+        инфраструктуры сам ищет ближайший объект в индексе.
+        """
+        geo_index.ensure_loaded(db)
+        category = _category_key(idea['category'])
+        
+        similar_ideas = [
+            payload for _, item_id, payload in geo_index.idea_index.radius(
+                category, idea['latitude'], idea['longitude'],
+                self.analysis_radius['duplicate_search']
+            )
+            if item_id != idea.get('id')
+        ]
+
+        return {
+            'similar_ideas': similar_ideas,
+            'infrastructure_objects': None,
+            'city_population': city_population
+        }
+    
     def _calculate_duplicate_factor(self, lat: float, lon: float, 
-                                   category: str, similar_ideas: List[Dict]) -> float:
+                                   category: str, similar_ideas: List[Dict],
+                                   now: Optional[datetime] = None) -> float:
         if not similar_ideas:
             return 0.3
         
+        now = now or datetime.now()
+        
         nearby_duplicates = 0
         total_similarity = 0
         
@@ -92,8 +148,8 @@ class IdeaPrioritizer:
             if distance <= self.analysis_radius['duplicate_search']:
                 nearby_duplicates += 1
                 
-                days_diff = (datetime.now() - other_idea['created_at']).days
-                time_factor = max(0, 1 - (days_diff / 30))
+                days_diff = (now - other_idea['created_at']).days
+                time_factor = max(0, 1 - (days_diff / self.duplicate_decay_days))
                 
                 total_similarity += time_factor
         
@@ -119,30 +175,35 @@ class IdeaPrioritizer:
     
     def _calculate_infrastructure_factor(self, lat: float, lon: float,
                                         category: str, 
-                                        infrastructure: List[Dict]) -> float:
-        category_to_infra = {
-            'sport': ['football_field', 'playground', 'sport_complex'],
-            'art': ['mural', 'sculpture', 'art_object'],
-            'ecology': ['green_zone', 'park', 'waste_sorting'],
-            'infrastructure': ['bench', 'lighting', 'road']
-        }
-        
-        target_types = category_to_infra.get(category, [])
-        
-        if not target_types or not infrastructure:
-            return 0.5
-        
-        min_distance = float('inf')
-        closest_condition = 'unknown'
+                                        infrastructure: Optional[List[Dict]] = None) -> float:
+        """Фактор дефицита инфраструктуры по ближайшему объекту нужного типа
+
+        Если список объектов не передан (None), ближайший объект ищется
+        прямо в geo_index.infrastructure_index (индекс должен быть построен).
+        """
+        target_types = self.category_to_infra.get(category, [])
         
-        for obj in infrastructure:
-            if obj['type'] in target_types:
-                distance = geodesic((lat, lon), 
-                                   (obj['latitude'], obj['longitude'])).meters
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_condition = obj.get('condition', 'unknown')
+        if infrastructure is None:
+            if not target_types or not len(geo_index.infrastructure_index):
+                return 0.5
+            match = geo_index.infrastructure_index.nearest(target_types, lat, lon, k=1)
+            min_distance = match[0][0] if match else float('inf')
+            closest_condition = match[0][2]['condition'] if match else 'unknown'
+        else:
+            if not target_types or not infrastructure:
+                return 0.5
+            
+            min_distance = float('inf')
+            closest_condition = 'unknown'
+            
+            for obj in infrastructure:
+                if obj['type'] in target_types:
+                    distance = geodesic((lat, lon), 
+                                       (obj['latitude'], obj['longitude'])).meters
+                    
+                    if distance < min_distance:
+                        min_distance = distance
+                        closest_condition = obj.get('condition', 'unknown')
         
         if min_distance == float('inf'):
             distance_factor = 1.0
@@ -150,19 +211,238 @@ class IdeaPrioritizer:
             distance_factor = min(1.0, max(0.0, 
                 1 - (min_distance / self.analysis_radius['infrastructure_search'])))
         
-        condition_weights = {
-            'poor': 0.8,
-            'average': 0.5,
-            'good': 0.2,
-            'unknown': 0.5
-        }
-        
-        condition_factor = condition_weights.get(closest_condition, 0.5)
+        condition_factor = self.condition_weights.get(closest_condition, 0.5)
         
         infrastructure_factor = (distance_factor * 0.7 + condition_factor * 0.3)
         
         return infrastructure_factor
     
+    def score_batch(self, ideas: List[Dict], context: Dict) -> List[Dict]:
+        """Пакетный расчёт важности для списка идей на массивах NumPy
+
+        context содержит те же ключи, что и для calculate_importance_score,
+        но similar_ideas — общий пул кандидатов на весь пакет: каждой идее
+        достаются кандидаты её категории, кроме неё самой (по id). Без
+        infrastructure_objects ближайшие объекты берутся из пространственного
+        индекса (GridIndex.nearest_many), а не перебором всех пар. Можно
+        передать context['now'], чтобы зафиксировать момент расчёта
+        (calculate_importance_score его тоже учитывает).
+
+        Точность: при одинаковом now компоненты и итоговая оценка отличаются
+        от поштучного расчёта не более чем на 1e-6 (расстояния считаются
+        эллипсоидальной аппроксимацией с погрешностью < 1 мм на радиусах
+        поиска). Округлённые значения и приоритеты могут разойтись только
+        у оценок, попадающих ровно на границу округления или порога.
+        """
+        if not ideas:
+            return []
+
+        arrays = self._score_arrays(ideas, context, context.get('now') or datetime.now())
+
+        results = []
+        for i in range(len(ideas)):
+            duplicate_score = float(arrays['duplicate'][i])
+            social_score = float(arrays['social'][i])
+            infrastructure_score = float(arrays['infrastructure'][i])
+            final_score = float(arrays['final'][i])
+            priority = self._determine_priority(final_score)
+
+            results.append({
+                'final_score': round(final_score, 3),
+                'priority': priority,
+                'components': {
+                    'duplicate_score': round(duplicate_score, 3),
+                    'social_score': round(social_score, 3),
+                    'infrastructure_score': round(infrastructure_score, 3)
+                },
+                'weights': self.weights,
+                'explanation': self._generate_explanation(
+                    duplicate_score,
+                    social_score,
+                    infrastructure_score,
+                    priority
+                ),
+                'recommended_action': self._get_recommended_action(priority)
+            })
+
+        return results
+
+    def _score_arrays(self, ideas: List[Dict], context: Dict,
+                      now: datetime) -> Dict[str, np.ndarray]:
+        lat = np.array([idea['latitude'] for idea in ideas], dtype=float)
+        lon = np.array([idea['longitude'] for idea in ideas], dtype=float)
+
+        groups: Dict[str, List[int]] = {}
+        for i, idea in enumerate(ideas):
+            groups.setdefault(_category_key(idea['category']), []).append(i)
+
+        duplicate = self._batch_duplicate_factor(
+            ideas, lat, lon, groups, context.get('similar_ideas') or [], now
+        )
+
+        social = self._batch_social_factor(
+            np.array([idea['votes_count'] for idea in ideas], dtype=float),
+            np.array([idea['comments_count'] for idea in ideas], dtype=float),
+            context['city_population']
+        )
+
+        infrastructure = self._batch_infrastructure_factor(
+            lat, lon, groups, context.get('infrastructure_objects')
+        )
+
+        final = (
+            duplicate * self.weights['duplicate_factor'] +
+            social * self.weights['social_factor'] +
+            infrastructure * self.weights['infrastructure_factor']
+        )
+
+        return {
+            'duplicate': duplicate,
+            'social': social,
+            'infrastructure': infrastructure,
+            'final': final
+        }
+
+    def _batch_duplicate_factor(self, ideas: List[Dict], lat: np.ndarray, lon: np.ndarray,
+                                groups: Dict[str, List[int]], pool: List[Dict],
+                                now: datetime) -> np.ndarray:
+        result = np.full(len(ideas), 0.3)
+        radius = self.analysis_radius['duplicate_search']
+
+        pool_by_category: Dict[str, List[Dict]] = {}
+        for other_idea in pool:
+            pool_by_category.setdefault(_category_key(other_idea['category']), []).append(other_idea)
+
+        for category, rows in groups.items():
+            candidates = pool_by_category.get(category)
+            if not candidates:
+                continue
+
+            c_lat = np.array([c['latitude'] for c in candidates], dtype=float)
+            c_lon = np.array([c['longitude'] for c in candidates], dtype=float)
+            days_diff = np.array([(now - c['created_at']).days for c in candidates], dtype=float)
+            time_factor = np.maximum(0, 1 - days_diff / self.duplicate_decay_days)
+
+            # Позиция самой идеи в пуле кандидатов (её не считаем дубликатом)
+            position = {c.get('id'): j for j, c in enumerate(candidates) if c.get('id') is not None}
+            rows = np.array(rows)
+            self_col = np.array([
+                position.get(ideas[r].get('id'), -1) if ideas[r].get('id') is not None else -1
+                for r in rows
+            ])
+
+            total_similarity = np.empty(len(rows))
+            step = max(1, self.batch_block_size // len(candidates))
+            for start in range(0, len(rows), step):
+                block = rows[start:start + step]
+                nearby = distance_matrix(lat[block], lon[block], c_lat, c_lon) <= radius
+
+                own = self_col[start:start + step]
+                has_self = own >= 0
+                nearby[np.nonzero(has_self)[0], own[has_self]] = False
+
+                total_similarity[start:start + step] = nearby @ time_factor
+
+            duplicate_factor = np.minimum(1.0, total_similarity / 10)
+            duplicate_factor = np.where(
+                duplicate_factor > 0,
+                np.log1p(duplicate_factor * 10) / np.log1p(10),
+                duplicate_factor
+            )
+
+            # Если кроме самой идеи кандидатов нет — как при пустом similar_ideas
+            no_candidates = len(candidates) - (self_col >= 0) == 0
+            result[rows] = np.where(no_candidates, 0.3, duplicate_factor)
+
+        return result
+
+    def _batch_social_factor(self, votes: np.ndarray, comments: np.ndarray,
+                             population: int) -> np.ndarray:
+        if population == 0:
+            return np.zeros(len(votes))
+
+        engagement = votes + (comments * 2)
+        normalized_engagement = engagement / (population / 10000)
+
+        social_factor = 1 / (1 + np.exp(-(normalized_engagement - 5)))
+
+        return np.minimum(1.0, social_factor)
+
+    def _batch_infrastructure_factor(self, lat: np.ndarray, lon: np.ndarray,
+                                     groups: Dict[str, List[int]],
+                                     infrastructure: Optional[List[Dict]]) -> np.ndarray:
+        if infrastructure is None:
+            return self._indexed_infrastructure_factor(lat, lon, groups)
+
+        result = np.full(len(lat), 0.5)
+        if not infrastructure:
+            return result
+
+        for category, rows in groups.items():
+            target_types = self.category_to_infra.get(category, [])
+            if not target_types:
+                continue
+
+            objects = [obj for obj in infrastructure if obj['type'] in target_types]
+            if not objects:
+                # Подходящих объектов нет: максимальный дефицит, состояние неизвестно
+                result[rows] = 1.0 * 0.7 + self.condition_weights['unknown'] * 0.3
+                continue
+
+            o_lat = np.array([obj['latitude'] for obj in objects], dtype=float)
+            o_lon = np.array([obj['longitude'] for obj in objects], dtype=float)
+            o_condition = np.array([
+                self.condition_weights.get(obj.get('condition', 'unknown'), 0.5)
+                for obj in objects
+            ])
+
+            rows = np.array(rows)
+            min_distance = np.empty(len(rows))
+            condition_factor = np.empty(len(rows))
+            step = max(1, self.batch_block_size // len(objects))
+            for start in range(0, len(rows), step):
+                block = rows[start:start + step]
+                distances = distance_matrix(lat[block], lon[block], o_lat, o_lon)
+                closest = distances.argmin(axis=1)
+                min_distance[start:start + step] = distances[np.arange(len(block)), closest]
+                condition_factor[start:start + step] = o_condition[closest]
+
+            distance_factor = np.clip(
+                1 - (min_distance / self.analysis_radius['infrastructure_search']), 0.0, 1.0
+            )
+            result[rows] = distance_factor * 0.7 + condition_factor * 0.3
+
+        return result
+
+    def _indexed_infrastructure_factor(self, lat: np.ndarray, lon: np.ndarray,
+                                       groups: Dict[str, List[int]]) -> np.ndarray:
+        """Пакетный фактор инфраструктуры по пространственному индексу"""
+        result = np.full(len(lat), 0.5)
+        if not len(geo_index.infrastructure_index):
+            return result
+
+        for category, rows in groups.items():
+            target_types = self.category_to_infra.get(category, [])
+            if not target_types:
+                continue
+
+            rows = np.array(rows)
+            min_distance, closest = geo_index.infrastructure_index.nearest_many(
+                target_types, lat[rows], lon[rows]
+            )
+            condition_factor = np.array([
+                self.condition_weights.get(obj['condition'] if obj else 'unknown', 0.5)
+                for obj in closest
+            ])
+            # Подходящих объектов нет — максимальный дефицит, как в поштучном расчёте
+            distance_factor = np.where(
+                np.isinf(min_distance), 1.0,
+                np.clip(1 - (min_distance / self.analysis_radius['infrastructure_search']), 0.0, 1.0)
+            )
+            result[rows] = distance_factor * 0.7 + condition_factor * 0.3
+
+        return result
+
     def _determine_priority(self, score: float) -> str:
         if score >= self.thresholds['critical']:
             return 'critical'
@@ -245,19 +525,23 @@ class DataEnricher:
         return city_data.get(city_name, {'population': 50000, 'area_sqkm': 100})
     
     @staticmethod
-    def get_infrastructure_objects(lat: float, lon: float, radius: int = 1000) -> List[Dict]:
-        # Заглушка - в реальности запрос к геосервису
+    def get_infrastructure_objects(lat: float, lon: float, radius: int = 1000,
+                                   db=None) -> List[Dict]:
+        """Объекты справочника инфраструктуры в радиусе, ближайшие первыми
+
+        Справочник загружается через app.infrastructure_loader; без db
+        используется уже построенный пространственный индекс.
+        """
+        if db is not None:
+            geo_index.ensure_loaded(db)
         return [
-            {'type': 'football_field', 'latitude': lat + 0.001, 
-             'longitude': lon + 0.001, 'condition': 'good'},
-            {'type': 'playground', 'latitude': lat + 0.002, 
-             'longitude': lon + 0.002, 'condition': 'average'}
+            payload for _, _, payload in geo_index.infrastructure_index.radius(None, lat, lon, radius)
         ]
 
 def update_idea_priority(db, idea_id):
-    """Обновление приоритета идеи"""
-    # Здесь будет вызов алгоритма ранжирования
-    pass
+    """Немедленный пересчёт важности идеи (в обход очереди событий)"""
+    from .priority_updates import priority_updater
+    return priority_updater.rescore(db, [str(idea_id)]).get(str(idea_id))
 
 def get_responsible_team(category: str, priority: str) -> str:
     """Определение ответственной команды"""
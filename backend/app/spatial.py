@@ -0,0 +1,153 @@
+"""Пространственный индекс идей в БД для выборок по bbox
+
+SQLite: виртуальная таблица R*Tree ideas_rtree с ключом ideas.rowid,
+которую поддерживают триггеры на ideas, — любые записи (ORM, пакетные
+вставки, правки в консоли) попадают в индекс без участия приложения.
+PostgreSQL: GiST-индекс по point(longitude, latitude), без PostGIS.
+Прочие БД фильтруют по широте и долготе без индекса.
+
+Индекс создаётся при первом запросе к движку (ensure_index) и сверяется
+с таблицей ideas: после VACUUM SQLite может перенумеровать rowid.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, column, func, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import database_key
+
+logger = logging.getLogger(__name__)
+
+Bounds = Tuple[float, float, float, float]
+
+# Границы городов: (юг, запад, север, восток). Дополняются переменной
+# CITY_BOUNDS — JSON вида {"город": [юг, запад, север, восток]}
+CITY_BOUNDS: Dict[str, Bounds] = {
+    "kiselevsk": (53.93, 86.55, 54.05, 86.78),
+    "киселевск": (53.93, 86.55, 54.05, 86.78),
+}
+CITY_BOUNDS.update({
+    name.lower(): tuple(bounds)
+    for name, bounds in json.loads(os.getenv("CITY_BOUNDS", "{}")).items()
+})
+
+ideas_rtree = table(
+    "ideas_rtree",
+    column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon")
+)
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS ideas_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    """CREATE TRIGGER IF NOT EXISTS ideas_rtree_insert AFTER INSERT ON ideas BEGIN
+        INSERT OR REPLACE INTO ideas_rtree VALUES
+            (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS ideas_rtree_update AFTER UPDATE OF latitude, longitude ON ideas BEGIN
+        INSERT OR REPLACE INTO ideas_rtree VALUES
+            (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS ideas_rtree_delete AFTER DELETE ON ideas BEGIN
+        DELETE FROM ideas_rtree WHERE id = old.rowid;
+    END""",
+)
+
+# R*Tree хранит 32-битные float с округлением наружу, поэтому точка идеи
+# всегда внутри своего прямоугольника, но не обязательно совпадает с ним
+_SQLITE_STALE = """
+    SELECT
+        (SELECT count(*) FROM ideas) != (SELECT count(*) FROM ideas_rtree)
+        OR EXISTS (
+            SELECT 1 FROM ideas_rtree r LEFT JOIN ideas i ON i.rowid = r.id
+            WHERE i.rowid IS NULL
+               OR i.latitude NOT BETWEEN r.min_lat AND r.max_lat
+               OR i.longitude NOT BETWEEN r.min_lon AND r.max_lon
+        )
+"""
+
+_SQLITE_REBUILD = (
+    "DELETE FROM ideas_rtree",
+    "INSERT INTO ideas_rtree SELECT rowid, latitude, latitude, longitude, longitude FROM ideas",
+)
+
+_POSTGRES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_ideas_location ON ideas USING gist (point(longitude, latitude))",
+)
+
+# Способ выборки по bbox для каждого движка: "rtree", "gist" или "plain"
+_modes: Dict[Any, str] = {}
+_lock = threading.Lock()
+
+def ensure_index(engine) -> str:
+    """Создание и сверка индекса; возвращает способ выборки для движка"""
+    key = database_key(engine)
+    mode = _modes.get(key)
+    if mode is not None:
+        return mode
+    with _lock:
+        mode = _modes.get(key)
+        if mode is None:
+            mode = _prepare(engine)
+            _modes[key] = mode
+    return mode
+
+def _prepare(engine) -> str:
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        try:
+            with engine.begin() as connection:
+                for statement in _SQLITE_DDL:
+                    connection.execute(text(statement))
+                if connection.execute(text(_SQLITE_STALE)).scalar():
+                    logger.info("Перестройка R*Tree-индекса идей")
+                    for statement in _SQLITE_REBUILD:
+                        connection.execute(text(statement))
+            return "rtree"
+        except OperationalError as e:
+            # SQLite собран без модуля R*Tree
+            logger.warning(f"R*Tree недоступен, выборка по bbox без индекса: {e}")
+            return "plain"
+    if dialect == "postgresql":
+        with engine.begin() as connection:
+            for statement in _POSTGRES_DDL:
+                connection.execute(text(statement))
+        return "gist"
+    return "plain"
+
+def reset():
+    """Забыть подготовленные движки (например, после пересоздания таблиц)"""
+    with _lock:
+        _modes.clear()
+
+def city_key(city: str) -> str:
+    return city.strip().lower().replace("ё", "е")
+
+def city_bounds(city: str) -> Optional[Bounds]:
+    return CITY_BOUNDS.get(city_key(city))
+
+def bbox_condition(db: Session, bbox: Bounds):
+    """Условие «идея внутри bbox» через пространственный индекс БД"""
+    south, west, north, east = bbox
+    engine = db.get_bind()
+    mode = ensure_index(getattr(engine, "engine", engine))
+
+    exact = and_(
+        models.Idea.latitude.between(south, north),
+        models.Idea.longitude.between(west, east)
+    )
+    if mode == "rtree":
+        candidates = select(ideas_rtree.c.id).where(
+            ideas_rtree.c.max_lat >= south, ideas_rtree.c.min_lat <= north,
+            ideas_rtree.c.max_lon >= west, ideas_rtree.c.min_lon <= east
+        )
+        return and_(literal_column("ideas.rowid").in_(candidates), exact)
+    if mode == "gist":
+        return func.point(models.Idea.longitude, models.Idea.latitude).op("<@")(
+            func.box(func.point(west, south), func.point(east, north))
+        )
+    return exact
@@ -1,16 +1,19 @@
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, NamedTuple, Optional
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
-import requests
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import random
+import httpx
 import uuid
 import os
 
-from .database import get_db
+from .database import get_async_db, AsyncSessionLocal
 from .models import Idea, User
 from .schemas import IdeaCreate
-from .crud import create_idea
+from . import crud_async
 from .services import IdeaPrioritizer
+from . import telegram_queue, telegram_updates
 
 logger = logging.getLogger(__name__)
 
@@ -20,14 +23,38 @@ router = APIRouter()
 class TelegramBot:
     """Класс для управления Telegram ботом"""
     
-    def __init__(self, token: str):
+    def __init__(self, token: str, api_url: Optional[str] = None,
+                 timeout: float = 10.0, max_retries: int = 3, backoff: float = 0.5):
         self.token = token
-        self.base_url = f"https://api.telegram.org/bot{token}"
-        
-    def send_message(self, chat_id: str, text: str, 
-                    parse_mode: str = "HTML", 
-                    reply_markup: Optional[Dict] = None) -> bool:
-        url = f"{self.base_url}/sendMessage"
+        api_url = api_url or os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.timeout = httpx.Timeout(timeout, connect=5.0)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий пул соединений с keep-alive (создаётся при первом запросе)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=30.0
+                )
+            )
+        return self._client
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @staticmethod
+    def build_payload(chat_id: str, text: str, parse_mode: str = "HTML",
+                      reply_markup: Optional[Dict] = None) -> Dict:
         payload = {
             "chat_id": chat_id,
             "text": text,
@@ -36,16 +63,51 @@ class TelegramBot:
         
         if reply_markup:
             payload["reply_markup"] = reply_markup
-            
+        return payload
+    
+    async def deliver(self, payload: Dict) -> "DeliveryResult":
+        """Одна попытка sendMessage без повторов"""
         try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка отправки в Telegram: {e}")
-            return False
-    
-    def send_idea_notification(self, chat_id: str, idea: Idea) -> bool:
+            response = await self.client.post(f"{self.base_url}/sendMessage", json=payload)
+        except httpx.TransportError as e:
+            return DeliveryResult(False, error=str(e) or type(e).__name__)
+        
+        if response.status_code == 429:
+            # Telegram сообщает, сколько ждать до следующей попытки
+            return DeliveryResult(False, retry_after=_retry_after(response, 1.0),
+                                  error="Too Many Requests")
+        if response.status_code >= 400:
+            return DeliveryResult(False, error=f"HTTP {response.status_code}: {response.text[:200]}",
+                                  permanent=response.status_code < 500)
+        return DeliveryResult(True)
+    
+    async def send_message(self, chat_id: str, text: str, 
+                          parse_mode: str = "HTML", 
+                          reply_markup: Optional[Dict] = None) -> bool:
+        payload = self.build_payload(chat_id, text, parse_mode, reply_markup)
+        
+        for attempt in range(self.max_retries + 1):
+            result = await self.deliver(payload)
+            if result.ok:
+                return True
+            if result.permanent:
+                break
+            
+            if attempt < self.max_retries:
+                delay = result.retry_after or self.backoff * (2 ** attempt) * (1 + random.random())
+                logger.warning(f"Повтор отправки в Telegram через {delay:.1f} с: {result.error}")
+                await asyncio.sleep(delay)
+        
+        logger.error(f"Ошибка отправки в Telegram: {result.error}")
+        return False
+    
+    async def send_idea_notification(self, chat_id: str, idea: Idea) -> bool:
+        message, keyboard = self.idea_notification(idea)
+        return await self.send_message(chat_id, message, reply_markup=keyboard)
+    
+    @staticmethod
+    def idea_notification(idea: Idea):
+        """Текст и клавиатура уведомления о новой идее"""
         priority_emojis = {
             "critical": "🔴",
             "high": "🟠", 
@@ -88,7 +150,19 @@ class TelegramBot:
             ]]
         }
         
-        return self.send_message(chat_id, message, reply_markup=keyboard)
+        return message, keyboard
+
+class DeliveryResult(NamedTuple):
+    ok: bool
+    retry_after: Optional[float] = None
+    error: Optional[str] = None
+    permanent: bool = False
+
+def _retry_after(response: httpx.Response, default: float) -> float:
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return default
 
 # Глобальный экземпляр бота
 telegram_bot = None
@@ -99,16 +173,48 @@ def init_bot(token: str):
     telegram_bot = TelegramBot(token)
     logger.info(f"Telegram бот инициализирован с токеном: {token[:10]}...")
 
+async def queue_message(chat_id: str, text: str, reply_markup: Optional[Dict] = None):
+    """Отправка через очередь, если диспетчер запущен, иначе напрямую"""
+    if telegram_queue.message_dispatcher is not None:
+        await telegram_queue.message_dispatcher.enqueue(chat_id, text, reply_markup=reply_markup)
+    else:
+        await telegram_bot.send_message(chat_id, text, reply_markup=reply_markup)
+
+async def queue_idea_notification(chat_id: str, idea: Idea):
+    message, keyboard = telegram_bot.idea_notification(idea)
+    await queue_message(chat_id, message, reply_markup=keyboard)
+
 @router.post("/webhook")
-async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
-    """Вебхук для получения обновлений от Telegram"""
+async def telegram_webhook(request: Request):
+    """Вебхук для получения обновлений от Telegram
+
+    Отвечает сразу: обновление обрабатывается в фоне, а повторная доставка
+    того же update_id игнорируется.
+    """
     if not telegram_bot:
         raise HTTPException(status_code=500, detail="Бот не инициализирован")
     
     try:
         data = await request.json()
-        logger.debug(f"Получено обновление от Telegram: {data}")
-        
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректное тело запроса")
+    logger.debug(f"Получено обновление от Telegram: {data}")
+    
+    processor = telegram_updates.update_processor
+    if processor is not None:
+        accepted = await processor.submit(data)
+        return {"status": "ok" if accepted else "duplicate"}
+    
+    try:
+        await handle_update(data)
+        return {"status": "ok"}
+    except Exception as e:
+        logger.error(f"Ошибка обработки вебхука: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def handle_update(data: Dict):
+    """Обработка одного обновления Telegram"""
+    async with AsyncSessionLocal() as db:
         # Обработка callback_query
         if "callback_query" in data:
             callback = data["callback_query"]
@@ -118,33 +224,28 @@ async def telegram_webhook(request: Request, db: Session = Depends(get_db)):
         elif "message" in data and "text" in data["message"]:
             message = data["message"]
             await handle_message(message, db)
-            
-        return {"status": "ok"}
-    except Exception as e:
-        logger.error(f"Ошибка обработки вебхука: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
 
-async def handle_callback(callback: Dict, db: Session):
+async def handle_callback(callback: Dict, db: AsyncSession):
     """Обработка нажатий inline-кнопок"""
     callback_data = callback.get("data", "")
     chat_id = callback["message"]["chat"]["id"]
     
     if callback_data.startswith("vote_up_"):
         idea_id = callback_data.replace("vote_up_", "")
-        telegram_bot.send_message(
+        await queue_message(
             chat_id, 
             "✅ Ваш голос учтён! Спасибо за участие.",
             reply_markup={"remove_keyboard": True}
         )
     elif callback_data.startswith("vote_down_"):
         idea_id = callback_data.replace("vote_down_", "")
-        telegram_bot.send_message(
+        await queue_message(
             chat_id,
             "👎 Вы проголосовали против этой идеи.",
             reply_markup={"remove_keyboard": True}
         )
 
-async def handle_message(message: Dict, db: Session):
+async def handle_message(message: Dict, db: AsyncSession):
     """Обработка текстовых сообщений"""
     text = message["text"]
     chat_id = message["chat"]["id"]
@@ -163,10 +264,10 @@ async def handle_message(message: Dict, db: Session):
 
 Просто отправьте мне сообщение с вашей идеей для города!
         """
-        telegram_bot.send_message(chat_id, welcome_text)
+        await queue_message(chat_id, welcome_text)
     
     elif text.startswith("/idea"):
-        telegram_bot.send_message(
+        await queue_message(
             chat_id,
             "📝 <b>Предложите идею для города</b>\n\n"
             "Напишите сообщение в формате:\n"
@@ -180,7 +281,7 @@ async def handle_message(message: Dict, db: Session):
     else:
         await process_idea_from_message(chat_id, text, db)
 
-async def process_idea_from_message(chat_id: str, text: str, db: Session):
+async def process_idea_from_message(chat_id: str, text: str, db: AsyncSession):
     """Создание идеи из сообщения пользователя"""
     try:
         lines = text.split('\n')
@@ -203,9 +304,9 @@ async def process_idea_from_message(chat_id: str, text: str, db: Session):
                 idea_data["address"] = line.split(":", 1)[1].strip()
         
         idea_schema = IdeaCreate(**idea_data)
-        idea = create_idea(db=db, idea=idea_schema)
+        idea = await crud_async.create_idea(db, idea_schema)
         
-        telegram_bot.send_message(
+        await queue_message(
             chat_id,
             f"✅ <b>Идея сохранена!</b>\n\n"
             f"ID: {idea.id}\n"
@@ -216,29 +317,33 @@ async def process_idea_from_message(chat_id: str, text: str, db: Session):
         # Отправка уведомления в канал
         channel_id = os.getenv("TELEGRAM_CHANNEL_ID")
         if channel_id:
-            telegram_bot.send_idea_notification(channel_id, idea)
+            await queue_idea_notification(channel_id, idea)
         
     except Exception as e:
         logger.error(f"Ошибка обработки идеи: {e}")
-        telegram_bot.send_message(
+        await queue_message(
             chat_id,
             "❌ <b>Ошибка при сохранении идеи</b>\n\n"
             "Пожалуйста, попробуйте снова или используйте веб-сайт."
         )
 
 @router.post("/notify/{idea_id}")
-async def notify_new_idea(idea_id: uuid.UUID, db: Session = Depends(get_db)):
+async def notify_new_idea(idea_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
     """Уведомление о новой идеи через Telegram"""
     if not telegram_bot:
         raise HTTPException(status_code=500, detail="Бот не инициализирован")
     
-    idea = db.query(Idea).filter(Idea.id == idea_id).first()
+    idea = await crud_async.get_idea(db, idea_id)
     if not idea:
         raise HTTPException(status_code=404, detail="Idea not found")
     
     channel_id = os.getenv("TELEGRAM_CHANNEL_ID", "-1001234567890")
     
-    success = telegram_bot.send_idea_notification(channel_id, idea)
+    if telegram_queue.message_dispatcher is not None:
+        await queue_idea_notification(channel_id, idea)
+        return {"status": "notification_queued", "channel": channel_id}
+    
+    success = await telegram_bot.send_idea_notification(channel_id, idea)
     
     if success:
         return {"status": "notification_sent", "channel": channel_id}
@@ -0,0 +1,254 @@
+import asyncio
+import random
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, запас не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до свободного токена"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        """Пауза после 429 с retry_after"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                self.take()
+                return
+            await asyncio.sleep(wait)
+
+class MessageDispatcher:
+    """Фоновая отправка сообщений Telegram из персистентной очереди
+
+    Сообщения пишутся в таблицу telegram_outbox, поэтому обработчик вебхука
+    не ждёт Telegram, а недоставленное переживает перезапуск. Загрузчик
+    забирает готовые к отправке строки, воркеры отправляют их с учётом
+    глобального и поштучного (на чат) ведра токенов. При 429 чат ставится
+    на паузу на retry_after, сообщение откладывается без штрафа; при сетевых
+    и 5xx ошибках — повтор с экспоненциальной задержкой до max_attempts.
+    """
+
+    def __init__(self, bot, session_factory: Callable, workers: int = 4,
+                 global_rate: float = 30, chat_rate: float = 1, group_rate: float = 20 / 60,
+                 batch_size: int = 100, poll_interval: float = 1.0, max_attempts: int = 5):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.workers = workers
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "rate_limited": 0}
+
+    # Постановка в очередь
+
+    async def enqueue(self, chat_id, text: str, parse_mode: str = "HTML",
+                      reply_markup: Optional[Dict] = None) -> int:
+        payload = self.bot.build_payload(chat_id, text, parse_mode, reply_markup)
+        message_id = await asyncio.to_thread(self._insert, str(chat_id), payload)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return message_id
+
+    def _insert(self, chat_id: str, payload: Dict) -> int:
+        db = self.session_factory()
+        try:
+            message = models.TelegramOutbox(
+                chat_id=chat_id,
+                payload=payload,
+                status="pending",
+                next_attempt_at=datetime.utcnow()
+            )
+            db.add(message)
+            db.commit()
+            return message.id
+        finally:
+            db.close()
+
+    # Запуск и остановка
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        # Сообщения, взятые в работу до перезапуска, возвращаем в очередь
+        await asyncio.to_thread(self._execute, update(models.TelegramOutbox).where(
+            models.TelegramOutbox.status == "sending"
+        ).values(status="pending"))
+
+        self._tasks = [asyncio.create_task(self._feed())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        logger.info(f"Очередь сообщений Telegram запущена, воркеров: {self.workers}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Загрузчик и воркеры
+
+    async def _feed(self):
+        while True:
+            batch = []
+            # Не забираем из БД больше, чем воркеры успевают разобрать
+            free = self.batch_size - self._queue.qsize()
+            if free > 0:
+                try:
+                    batch = await asyncio.to_thread(self._claim_due, free)
+                except Exception as e:
+                    logger.error(f"Ошибка чтения очереди Telegram: {e}")
+
+            for message in batch:
+                self._queue.put_nowait(message)
+
+            if len(batch) < free or free <= 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _claim_due(self, limit: int):
+        db = self.session_factory()
+        try:
+            rows = db.query(
+                models.TelegramOutbox.id, models.TelegramOutbox.chat_id,
+                models.TelegramOutbox.payload, models.TelegramOutbox.attempts
+            ).filter(
+                models.TelegramOutbox.status == "pending",
+                models.TelegramOutbox.next_attempt_at <= datetime.utcnow()
+            ).order_by(models.TelegramOutbox.id).limit(limit).all()
+
+            if rows:
+                db.execute(update(models.TelegramOutbox).where(
+                    models.TelegramOutbox.id.in_([row.id for row in rows]),
+                    models.TelegramOutbox.status == "pending"
+                ).values(status="sending"))
+                db.commit()
+            return [dict(row._mapping) for row in rows]
+        finally:
+            db.close()
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                # Забываем чаты, чьи вёдра полны и не на паузе
+                self._chat_buckets = {
+                    key: b for key, b in self._chat_buckets.items() if b.delay() > 0 or b.tokens < b.capacity
+                }
+            # Группы и каналы (отрицательные id) ограничены строже личных чатов
+            rate = self.group_rate if chat_id.startswith("-") else self.chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate)
+        return bucket
+
+    def _requeue_later(self, message: Dict, delay: float):
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, message)
+
+    async def _work(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                logger.error(f"Ошибка отправки из очереди Telegram: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: Dict):
+        bucket = self._chat_bucket(message["chat_id"])
+        wait = bucket.delay()
+        if wait > 0:
+            # Не держим воркер ради одного чата — вернёмся к сообщению позже
+            self._requeue_later(message, wait)
+            return
+
+        await self.global_bucket.acquire()
+        bucket.take()
+        result = await self.bot.deliver(message["payload"])
+
+        if result.ok:
+            self.stats["sent"] += 1
+            await asyncio.to_thread(self._mark, message["id"], status="sent",
+                                    sent_at=datetime.utcnow(), last_error=None)
+        elif result.retry_after is not None:
+            self.stats["rate_limited"] += 1
+            bucket.block(result.retry_after)
+            self._requeue_later(message, result.retry_after)
+        elif result.permanent or message["attempts"] + 1 >= self.max_attempts:
+            self.stats["failed"] += 1
+            logger.error(f"Сообщение {message['id']} не доставлено: {result.error}")
+            await asyncio.to_thread(self._mark, message["id"], status="failed",
+                                    attempts=message["attempts"] + 1, last_error=result.error)
+        else:
+            self.stats["retried"] += 1
+            delay = 2 ** message["attempts"] * (1 + random.random())
+            await asyncio.to_thread(self._mark, message["id"], status="pending",
+                                    attempts=message["attempts"] + 1, last_error=result.error,
+                                    next_attempt_at=datetime.utcnow() + timedelta(seconds=delay))
+
+    def _mark(self, message_id: int, **values):
+        self._execute(update(models.TelegramOutbox).where(
+            models.TelegramOutbox.id == message_id
+        ).values(**values))
+
+    def _execute(self, statement):
+        db = self.session_factory()
+        try:
+            db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+
+# Глобальный диспетчер (создаётся при старте приложения)
+message_dispatcher: Optional[MessageDispatcher] = None
+
+async def start_dispatcher(bot, session_factory: Callable, **options) -> MessageDispatcher:
+    global message_dispatcher
+    message_dispatcher = MessageDispatcher(bot, session_factory, **options)
+    await message_dispatcher.start()
+    return message_dispatcher
+
+async def stop_dispatcher():
+    global message_dispatcher
+    if message_dispatcher is not None:
+        await message_dispatcher.stop()
+        message_dispatcher = None
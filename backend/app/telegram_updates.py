@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+def update_chat_id(update: Dict):
+    """Чат, к которому относится обновление (ключ упорядочивания)"""
+    if "message" in update:
+        return update["message"].get("chat", {}).get("id")
+    if "callback_query" in update:
+        callback = update["callback_query"]
+        chat = callback.get("message", {}).get("chat", {})
+        return chat.get("id", callback.get("from", {}).get("id"))
+    return None
+
+class UpdateProcessor:
+    """Асинхронная обработка обновлений вебхука Telegram
+
+    Вебхук только регистрирует update_id и ставит обновление в очередь,
+    поэтому Telegram получает ответ сразу и не шлёт повторов. Повторно
+    доставленные обновления отсекаются по update_id: сначала по LRU в
+    памяти, затем по таблице telegram_processed_updates. Обновления одного
+    чата всегда попадают к одному воркеру и обрабатываются по порядку.
+    """
+
+    def __init__(self, handler: Callable[[Dict], Awaitable[None]], session_factory: Callable,
+                 workers: int = 4, queue_size: int = 1000, seen_size: int = 10000,
+                 retention: timedelta = timedelta(days=2)):
+        self.handler = handler
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.seen_size = seen_size
+        self.retention = retention
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._queues: List[asyncio.Queue] = []
+        self._tasks = []
+        self.stats = {"accepted": 0, "duplicates": 0, "processed": 0, "errors": 0}
+
+    async def start(self):
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+        self._tasks.append(asyncio.create_task(self._prune_periodically()))
+        logger.info(f"Обработка обновлений Telegram запущена, воркеров: {self.workers}")
+
+    async def stop(self, timeout: float = 5.0):
+        """Остановка: даём воркерам дообработать очередь"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Не все обновления Telegram обработаны до остановки")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, update: Dict) -> bool:
+        """Приём обновления; False, если оно уже было принято раньше"""
+        update_id = update.get("update_id")
+        if update_id is not None:
+            if update_id in self._seen:
+                self._seen.move_to_end(update_id)
+                self.stats["duplicates"] += 1
+                return False
+
+            # Запоминаем сразу, чтобы параллельный повтор не прошёл дальше;
+            # если записать не удалось, Telegram повторит — забываем id
+            self._remember(update_id)
+            try:
+                registered = await asyncio.to_thread(self._register, update_id)
+            except Exception:
+                self._seen.pop(update_id, None)
+                raise
+            if not registered:
+                self.stats["duplicates"] += 1
+                return False
+
+        chat_id = update_chat_id(update)
+        shard = hash(chat_id if chat_id is not None else update_id) % self.workers
+        await self._queues[shard].put(update)
+        self.stats["accepted"] += 1
+        return True
+
+    def _remember(self, update_id: int):
+        self._seen[update_id] = None
+        if len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+
+    def _register(self, update_id: int) -> bool:
+        db = self.session_factory()
+        try:
+            db.add(models.TelegramProcessedUpdate(update_id=update_id, received_at=datetime.utcnow()))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.handler(update)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Ошибка обработки обновления {update.get('update_id')}: {e}")
+            finally:
+                queue.task_done()
+
+    async def _prune_periodically(self, interval: float = 3600):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self._prune)
+            except Exception as e:
+                logger.error(f"Ошибка очистки принятых обновлений Telegram: {e}")
+
+    def _prune(self):
+        """Удаление старых update_id: Telegram не повторяет доставку так долго"""
+        db = self.session_factory()
+        try:
+            db.query(models.TelegramProcessedUpdate).filter(
+                models.TelegramProcessedUpdate.received_at < datetime.utcnow() - self.retention
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+# Глобальный обработчик (создаётся при старте приложения)
+update_processor: Optional[UpdateProcessor] = None
+
+async def start_update_processor(handler: Callable[[Dict], Awaitable[None]],
+                                 session_factory: Callable, **options) -> UpdateProcessor:
+    global update_processor
+    update_processor = UpdateProcessor(handler, session_factory, **options)
+    await update_processor.start()
+    return update_processor
+
+async def stop_update_processor():
+    global update_processor
+    if update_processor is not None:
+        await update_processor.stop()
+        update_processor = None
@@ -0,0 +1,104 @@
+import os
+import threading
+import logging
+from collections import defaultdict
+from typing import Callable, Dict
+
+from sqlalchemy import bindparam, update
+
+from . import live_updates, models, response_cache
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class VoteCounterBuffer:
+    """Буфер отложенной записи счётчиков голосов
+
+    Дельты votes_count копятся в памяти по идеям и раз в interval_ms
+    записываются одним пакетным UPDATE. Популярная идея с тысячами голосов
+    в минуту получает одну запись за интервал вместо записи на каждый голос.
+    """
+
+    def __init__(self, session_factory: Callable, interval_ms: int = 0):
+        self.session_factory = session_factory
+        self.interval_ms = interval_ms
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_ms > 0
+
+    def add(self, idea_id: str, delta: int = 1):
+        with self._lock:
+            self._pending[idea_id] += delta
+
+    def pending(self, idea_id: str) -> int:
+        """Ещё не записанная в БД дельта по идее"""
+        with self._lock:
+            return self._pending.get(idea_id, 0)
+
+    def flush(self) -> int:
+        """Запись накопленных дельт; возвращает число обновлённых идей"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, defaultdict(int)
+
+        ideas = models.Idea.__table__
+        statement = update(ideas).where(
+            ideas.c.id == bindparam("b_id")
+        ).values(
+            votes_count=ideas.c.votes_count + bindparam("b_delta")
+        )
+        params = [{"b_id": idea_id, "b_delta": delta} for idea_id, delta in batch.items() if delta]
+
+        db = self.session_factory()
+        try:
+            if params:
+                db.connection().execute(statement, params)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка записи счётчиков голосов: {e}")
+            # Возвращаем дельты в буфер, чтобы не потерять голоса
+            with self._lock:
+                for idea_id, delta in batch.items():
+                    self._pending[idea_id] += delta
+            raise
+        else:
+            # Новые счётчики — подписчикам живых обновлений (вне except: голоса уже записаны)
+            live_updates.ideas_voted(db, (item["b_id"] for item in params))
+        finally:
+            db.close()
+
+        response_cache.ideas_voted(item["b_id"] for item in params)
+        return len(params)
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-buffer", daemon=True)
+        self._thread.start()
+        logger.info(f"Буфер голосов запущен, интервал {self.interval_ms} мс")
+
+    def stop(self):
+        """Остановка фонового потока с финальной записью"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_ms / 1000):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+# Интервал записи в мс; 0 — буфер выключен, счётчик обновляется сразу
+vote_buffer = VoteCounterBuffer(SessionLocal, int(os.getenv("VOTE_FLUSH_INTERVAL_MS", "0")))
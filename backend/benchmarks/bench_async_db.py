@@ -0,0 +1,115 @@
+"""Запросы к БД из async-кода: синхронная сессия против AsyncSession
+
+Во временной SQLite с идеями одновременно запускается заданное число
+корутин, каждая делает несколько выборок ленты идей:
+  - sync в цикле: SessionLocal и crud.get_ideas прямо в корутине (как
+    прежний notify_new_idea) — цикл событий стоит, пока идёт запрос;
+  - async: AsyncSession и crud_async.get_ideas через aiosqlite.
+Параллельно тикер раз в миллисекунду меряет задержку цикла событий —
+столько ждал бы любой другой запрос к этому процессу.
+
+Запуск из папки backend:
+    python benchmarks/bench_async_db.py [корутин] [запросов на корутину]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, crud_async, models
+from app.database import Base, create_app_engine, create_async_app_engine
+
+IDEAS = 20000
+TICK = 0.001
+
+def seed(engine):
+    rnd = random.Random(1)
+    author = {'id': str(uuid.uuid4()), 'email': "bench@gorod-kontur.ru"}
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея {i}",
+        'description': "Описание идеи для проверки нагрузки",
+        'category': rnd.choice(list(models.IdeaCategory)).name,
+        'status': models.IdeaStatus.NEW.name,
+        'latitude': 54.0 + rnd.uniform(-0.05, 0.05),
+        'longitude': 86.6 + rnd.uniform(-0.05, 0.05),
+        'author_id': author['id'],
+        'importance_score': rnd.random()
+    } for i in range(IDEAS)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), [author])
+        connection.execute(insert(models.Idea.__table__), ideas)
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+async def run(worker, tasks: int):
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(tasks)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    category = list(models.IdeaCategory)[0]
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{directory}/bench.db"
+        engine = create_app_engine(url)
+        Base.metadata.create_all(bind=engine)
+        seed(engine)
+        Session = sessionmaker(bind=engine)
+
+        async def sync_worker():
+            for _ in range(queries):
+                db = Session()
+                try:
+                    crud.get_ideas(db, limit=50, category=category)
+                finally:
+                    db.close()
+                await asyncio.sleep(0)
+
+        async def bench():
+            async_engine = create_async_app_engine(url)
+            AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+            async def async_worker():
+                for _ in range(queries):
+                    async with AsyncSession() as db:
+                        await crud_async.get_ideas(db, limit=50, category=category)
+
+            results = [("sync в цикле", await run(sync_worker, tasks)),
+                       ("async", await run(async_worker, tasks))]
+            await async_engine.dispose()
+            return results
+
+        print(f"Корутин: {tasks}, запросов на корутину: {queries}, идей: {IDEAS}")
+        print(f"{'вариант':<14} {'запросов/с':>11} {'лаг p50, мс':>12} {'лаг max, мс':>12}")
+        for name, (elapsed, lags) in asyncio.run(bench()):
+            lags = lags or [0.0]
+            print(f"{name:<14} {tasks * queries / elapsed:>11.0f} "
+                  f"{statistics.median(lags) * 1000:>12.2f} {max(lags) * 1000:>12.2f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Выборка идей по bbox: R*Tree против фильтра по координатам
+
+Для нескольких размеров таблицы ideas создаёт временную SQLite, в которой
+идеи разбросаны по области, растущей вместе с их числом, — в окно карты
+(~2 × 2 км) попадает примерно одинаковое число идей. Меряется медиана
+crud.get_ideas(bbox=...) через пространственный индекс и тот же запрос
+с простым фильтром по широте и долготе (полный проход по таблице).
+
+Запуск из папки backend:
+    python benchmarks/bench_bbox.py [размеры через запятую]
+"""
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models, spatial
+from app.database import Base, database_key
+
+CENTER = (53.99, 86.66)  # Киселёвск
+VISIBLE = 200            # идей в окне карты в среднем
+WINDOW = 0.02            # сторона окна в градусах
+RUNS = 30
+
+def fill(db, n: int):
+    # Сторона области, при которой в окно попадает в среднем VISIBLE идей
+    side = WINDOW * math.sqrt(n / VISIBLE)
+    rnd = random.Random(n)
+    author = models.User(email="bench@gorod-kontur.ru", full_name="bench")
+    db.add(author)
+    db.commit()
+    table = models.Idea.__table__
+    batch = []
+    for i in range(n):
+        batch.append({
+            'id': str(uuid.uuid4()),
+            'title': f"Идея {i}",
+            'description': "Описание",
+            'category': rnd.choice(list(models.IdeaCategory)).name,
+            'status': models.IdeaStatus.NEW.name,
+            'latitude': CENTER[0] + rnd.uniform(-side / 2, side / 2),
+            'longitude': CENTER[1] + rnd.uniform(-side / 2, side / 2),
+            'author_id': author.id,
+            'importance_score': rnd.random()
+        })
+        if len(batch) == 10000:
+            db.execute(insert(table), batch)
+            batch.clear()
+    if batch:
+        db.execute(insert(table), batch)
+    db.commit()
+
+def measure(db, bbox) -> float:
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        ideas = crud.get_ideas(db, limit=1000, bbox=bbox)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000, len(ideas)
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+    bbox = (CENTER[0] - WINDOW / 2, CENTER[1] - WINDOW / 2, CENTER[0] + WINDOW / 2, CENTER[1] + WINDOW / 2)
+
+    print(f"{'идей':>9} {'в окне':>7} {'R*Tree, мс':>11} {'без индекса, мс':>16}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{directory}/bench.db")
+            Base.metadata.create_all(bind=engine)
+            spatial.ensure_index(engine)
+            db = sessionmaker(bind=engine)()
+            fill(db, n)
+
+            indexed, visible = measure(db, bbox)
+            spatial._modes[database_key(engine)] = "plain"
+            plain, plain_visible = measure(db, bbox)
+            assert visible == plain_visible
+            print(f"{n:>9} {visible:>7} {indexed:>11.2f} {plain:>16.2f}")
+
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Скорость категоризации: прежний перебор списков против индекса и categorize_batch
+
+Генерирует пачку текстов из ключевых слов, синонимов, их словоформ и
+случайных слов, затем сравнивает прежнюю реализацию categorize (перебор
+категорий и списков ключевых слов на каждое слово), текущую поштучную
+и пакетную categorize_batch. Для текстов без словоформ проверяется, что
+оценки совпадают с прежними.
+
+Запуск из папки backend:
+    python benchmarks/bench_categorizer.py [кол-во текстов]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.categorizer import SimpleAICategorizer
+
+FILLER = ['жители', 'просим', 'сделать', 'около', 'нашего', 'дома', 'улица', 'района',
+          'город', 'очень', 'нужно', 'давно', 'хотим', 'вечером', 'двор', 'рядом']
+FORMS = ['а', 'и', 'ой', 'ую', 'ые', 'ами']
+
+def legacy_categorize(categorizer: SimpleAICategorizer, text: str, title: str = ""):
+    """Прежняя реализация categorize"""
+    full_text = re.sub(r'[^\w\s]', ' ', (title + " " + text).lower())
+    stop_words = {'и', 'в', 'на', 'не', 'что', 'это', 'для', 'по', 'к', 'у'}
+    tokens = [t for t in full_text.split() if t not in stop_words and len(t) > 2]
+
+    scores = {}
+    total_matches = 0
+    for category, keywords in categorizer.category_keywords.items():
+        matches = 0
+        for token in tokens:
+            if token in keywords:
+                matches += 1
+            elif token in categorizer.synonyms and categorizer.synonyms[token] in keywords:
+                matches += 0.8
+        scores[category] = matches
+        total_matches += matches
+
+    if total_matches > 0:
+        for category in scores:
+            scores[category] = scores[category] / total_matches
+    else:
+        for category in categorizer.category_keywords:
+            scores[category] = 1 / len(categorizer.category_keywords)
+    return scores
+
+def best_of(runs: int, func):
+    """Лучшее время из нескольких прогонов и результат последнего"""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def make_texts(categorizer: SimpleAICategorizer, n: int, inflect: bool):
+    rnd = random.Random(42)
+    words = [w for keywords in categorizer.category_keywords.values() for w in keywords]
+    words += list(categorizer.synonyms)
+    texts = []
+    for _ in range(n):
+        tokens = []
+        for _ in range(rnd.randint(15, 60)):
+            if rnd.random() < 0.3:
+                word = rnd.choice(words)
+                if inflect and rnd.random() < 0.5:
+                    word = word[:-1] + rnd.choice(FORMS)
+                tokens.append(word)
+            else:
+                tokens.append(rnd.choice(FILLER))
+        texts.append(" ".join(tokens) + ".")
+    return texts
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    categorizer = SimpleAICategorizer()
+
+    exact = make_texts(categorizer, n, inflect=False)
+    legacy_time, legacy = best_of(3, lambda: np.array(
+        [list(legacy_categorize(categorizer, text).values()) for text in exact]))
+    single_time, single = best_of(3, lambda: np.array(
+        [list(categorizer.categorize(text)['all_scores'].values()) for text in exact]))
+    batch_time, batch = best_of(3, lambda: categorizer.categorize_batch(exact))
+
+    print(f"Текстов: {n}")
+    print(f"прежний categorize:  {legacy_time:7.3f} с")
+    print(f"categorize (индекс): {single_time:7.3f} с  (x{legacy_time / single_time:.1f})")
+    print(f"categorize_batch:    {batch_time:7.3f} с  (x{legacy_time / batch_time:.1f})")
+    print(f"Макс. расхождение с прежними оценками: "
+          f"{np.abs(legacy - single).max():.2e} / {np.abs(legacy - batch).max():.2e}")
+
+    inflected = make_texts(categorizer, n, inflect=True)
+    legacy_hits = sum(1 for text in inflected
+                      if len(set(legacy_categorize(categorizer, text).values())) > 1)
+    batch_hits = int((categorizer.categorize_batch(inflected).max(axis=1) > 1 / len(categorizer.categories)).sum())
+    print(f"Тексты со словоформами, получившие категорию: прежний {legacy_hits}, индекс {batch_hits}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Параллельные писатели и читатели SQLite: профиль движка против настроек по умолчанию
+
+Для каждого варианта движка (app.database.create_app_engine с tuned=False
+и tuned=True) создаёт временную базу с идеями и пользователями и на
+протяжении заданного времени гоняет потоки:
+  - писатели: голос за случайную идею и увеличение votes_count, commit;
+  - читатели: лента идей по важности (crud.get_ideas), а каждое пятое
+    чтение — полный пересчёт снимка аналитики (долгое чтение, как при
+    сверке reconcile).
+Печатает число операций в секунду и число ошибок «database is locked».
+
+Запуск из папки backend:
+    python benchmarks/bench_db_concurrency.py [писателей] [читателей] [секунд]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models
+from app.analytics_snapshot import AnalyticsSnapshot
+from app.database import Base, create_app_engine
+
+IDEAS = 5000
+USERS = 2000
+
+def seed(engine):
+    rnd = random.Random(1)
+    users = [{'id': str(uuid.uuid4()), 'email': f"user{i}@bench.ru"} for i in range(USERS)]
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея {i}",
+        'description': "Описание идеи для проверки нагрузки",
+        'category': rnd.choice(list(models.IdeaCategory)).name,
+        'status': models.IdeaStatus.NEW.name,
+        'latitude': 54.0 + rnd.uniform(-0.05, 0.05),
+        'longitude': 86.6 + rnd.uniform(-0.05, 0.05),
+        'author_id': users[i % USERS]['id'],
+        'importance_score': rnd.random(),
+        'votes_count': 0
+    } for i in range(IDEAS)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), users)
+        connection.execute(insert(models.Idea.__table__), ideas)
+    return [u['id'] for u in users], [i['id'] for i in ideas]
+
+def run(tuned: bool, writers: int, readers: int, seconds: float):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_app_engine(f"sqlite:///{directory}/bench.db", tuned=tuned)
+        Base.metadata.create_all(bind=engine)
+        user_ids, idea_ids = seed(engine)
+        Session = sessionmaker(bind=engine)
+
+        stop = threading.Event()
+        counts = {'writes': 0, 'reads': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def count(name):
+            with lock:
+                counts[name] += 1
+
+        def writer(number):
+            # У каждого писателя свои пары (пользователь, идея) — без конфликтов уникальности
+            pairs = (divmod(k, IDEAS) for k in range(number, USERS * IDEAS, writers))
+            while not stop.is_set():
+                db = Session()
+                try:
+                    user, idea = next(pairs)
+                    idea_id = idea_ids[(idea * 7919) % IDEAS]
+                    db.add(models.Vote(id=str(uuid.uuid4()), user_id=user_ids[user],
+                                       idea_id=idea_id, vote_type="up"))
+                    db.execute(update(models.Idea).where(models.Idea.id == idea_id)
+                               .values(votes_count=models.Idea.votes_count + 1))
+                    db.commit()
+                    count('writes')
+                except OperationalError:
+                    db.rollback()
+                    count('locked')
+                finally:
+                    db.close()
+
+        def reader(number):
+            reads = 0
+            while not stop.is_set():
+                db = Session()
+                try:
+                    if reads % 5 == 4:
+                        AnalyticsSnapshot._compute(db)
+                    else:
+                        crud.get_ideas(db, limit=50)
+                    reads += 1
+                    count('reads')
+                except OperationalError:
+                    count('locked')
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        return counts
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print(f"Писателей: {writers}, читателей: {readers}, {seconds:.0f} с на вариант")
+    print(f"{'движок':<22} {'записей/с':>10} {'чтений/с':>10} {'locked':>8}")
+    for name, tuned in (("по умолчанию", False), ("профиль (WAL и пул)", True)):
+        counts = run(tuned, writers, readers, seconds)
+        print(f"{name:<22} {counts['writes'] / seconds:>10.1f} {counts['reads'] / seconds:>10.1f} "
+              f"{counts['locked']:>8}")
+
+if __name__ == "__main__":
+    main()
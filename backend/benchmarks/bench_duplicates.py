@@ -0,0 +1,94 @@
+"""Поиск дубликатов: полный перебор find_duplicates против MinHash/LSH
+
+Генерирует описания идей из словаря с распределением Ципфа, среди них
+near-дубликаты (копии с заменой части слов). Строит LSH-индекс по
+сигнатурам и сравнивает с прежним полным перебором: время запроса
+(кандидаты из индекса + точная проверка Жаккара по заранее разобранным
+словам) и полноту относительно перебора на выборке запросов.
+
+Запуск из папки backend:
+    python benchmarks/bench_duplicates.py [кол-во идей] [кол-во запросов]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.categorizer import SimpleAICategorizer
+from app.ai.minhash import MinHashLSH
+
+VOCABULARY = 20000
+
+def make_ideas(n: int):
+    rnd = random.Random(42)
+    words = [f"слово{i}" for i in range(VOCABULARY)]
+    weights = 1 / np.arange(1, VOCABULARY + 1)
+    weights /= weights.sum()
+    generator = np.random.default_rng(42)
+
+    ideas = []
+    for i in range(n):
+        if ideas and rnd.random() < 0.05:
+            # Near-дубликат: копия случайной идеи с заменой 10–40% слов
+            tokens = ideas[rnd.randrange(len(ideas))]['description'].split()
+            for _ in range(int(len(tokens) * rnd.uniform(0.1, 0.4))):
+                tokens[rnd.randrange(len(tokens))] = words[generator.choice(VOCABULARY, p=weights)]
+        else:
+            tokens = [words[j] for j in generator.choice(VOCABULARY, size=rnd.randint(15, 60), p=weights)]
+        ideas.append({'id': f"idea-{i}", 'title': f"Идея {i}", 'description': " ".join(tokens)})
+    return ideas
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    categorizer = SimpleAICategorizer()
+    index = MinHashLSH(num_perm=64, bands=32)
+
+    ideas = make_ideas(n)
+    by_id = {idea['id']: idea for idea in ideas}
+
+    started = time.perf_counter()
+    for idea in ideas:
+        # Слова описаний считаются один раз, как в idea_fingerprints
+        idea['tokens'] = categorizer._preprocess_text(idea['description'])
+    signatures = np.stack([index.signature(idea['tokens']) for idea in ideas])
+    signing = time.perf_counter() - started
+    started = time.perf_counter()
+    index.load([idea['id'] for idea in ideas], signatures)
+    loading = time.perf_counter() - started
+    print(f"Идей: {n}; сигнатуры: {signing:.1f} с, загрузка индекса: {loading:.2f} с")
+
+    rnd = random.Random(7)
+    samples = [ideas[rnd.randrange(n)] for _ in range(queries)]
+
+    lsh_times, found, expected = [], 0, 0
+    brute_time = 0.0
+    for sample in samples:
+        text = sample['description']
+
+        started = time.perf_counter()
+        text_tokens = categorizer._preprocess_text(text)
+        candidates = index.query(index.signature(text_tokens), limit=50)
+        result = categorizer.find_duplicates(text, [by_id[key] for key, _ in candidates], text_tokens=text_tokens)
+        lsh_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        reference = categorizer.find_duplicates(text, ideas)
+        brute_time += time.perf_counter() - started
+
+        # Полнота по первым 10 (столько возвращает API)
+        top = {item['idea_id'] for item in reference[:10]}
+        expected += len(top)
+        found += len(top & {item['idea_id'] for item in result})
+
+    lsh_times = np.array(lsh_times) * 1000
+    print(f"Полный перебор: {brute_time / queries * 1000:9.1f} мс на запрос")
+    print(f"LSH + проверка: {np.median(lsh_times):9.2f} мс медиана, {lsh_times.max():.2f} мс максимум")
+    print(f"Полнота (топ-10 перебора найдено через LSH): {found}/{expected}")
+
+if __name__ == "__main__":
+    main()
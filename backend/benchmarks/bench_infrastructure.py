@@ -0,0 +1,119 @@
+"""Справочник инфраструктуры: потоковый импорт и поиск ближайших объектов
+
+Генерирует GeoJSON с объектами по городу, загружает его через
+app.infrastructure_loader во временную SQLite и считает фактор
+инфраструктуры для идей двумя способами: через пространственный индекс
+(GridIndex.nearest_many) и прежним перебором всех пар идея × объект.
+Перебор меряется на выборке и пересчитывается на все идеи.
+
+Запуск из папки backend:
+    python benchmarks/bench_infrastructure.py [кол-во идей] [кол-во объектов]
+"""
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import geo_index, models
+from app.database import Base
+from app.infrastructure_loader import load_infrastructure
+from app.services import IdeaPrioritizer, _category_key
+
+CATEGORIES = ['sport', 'art', 'ecology', 'infrastructure', 'education', 'culture', 'other']
+INFRA_TYPES = ['football_field', 'playground', 'sport_complex', 'mural', 'park',
+               'green_zone', 'bench', 'lighting', 'road']
+CENTER = (53.99, 86.66)  # Киселёвск
+
+def make_geojson(n: int) -> str:
+    rnd = random.Random(7)
+    features = [{
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [
+            CENTER[1] + rnd.uniform(-0.08, 0.08), CENTER[0] + rnd.uniform(-0.05, 0.05)
+        ]},
+        'properties': {
+            'type': rnd.choice(INFRA_TYPES),
+            'name': f"Объект {i}",
+            'condition': rnd.choice(['poor', 'average', 'good', None])
+        }
+    } for i in range(n)]
+    return json.dumps({'type': 'FeatureCollection', 'features': features}, ensure_ascii=False)
+
+def make_ideas(n: int):
+    rnd = random.Random(42)
+    lat = np.array([CENTER[0] + rnd.uniform(-0.06, 0.06) for _ in range(n)])
+    lon = np.array([CENTER[1] + rnd.uniform(-0.09, 0.09) for _ in range(n)])
+    groups = {}
+    for i in range(n):
+        groups.setdefault(rnd.choice(CATEGORIES), []).append(i)
+    return lat, lon, groups
+
+def main():
+    n_ideas = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{directory}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        data = make_geojson(n_objects)
+        started = time.perf_counter()
+        loaded = load_infrastructure(db, io.StringIO(data))
+        print(f"Импорт GeoJSON: {loaded} объектов за {time.perf_counter() - started:.2f} с")
+
+        started = time.perf_counter()
+        geo_index.reset()
+        geo_index.ensure_loaded(db)
+        print(f"Построение индекса: {time.perf_counter() - started:.2f} с")
+
+        infrastructure = [geo_index.infrastructure_payload(obj)
+                          for obj in db.query(models.InfrastructureObject)]
+        db.close()
+
+    prioritizer = IdeaPrioritizer()
+    lat, lon, groups = make_ideas(n_ideas)
+
+    started = time.perf_counter()
+    indexed = prioritizer._batch_infrastructure_factor(lat, lon, groups, None)
+    first_time = time.perf_counter() - started
+    started = time.perf_counter()
+    indexed = prioritizer._batch_infrastructure_factor(lat, lon, groups, None)
+    index_time = time.perf_counter() - started
+
+    # Прежний путь: матрица расстояний идея × объект на выборке
+    sample = np.array(sorted(random.Random(1).sample(range(n_ideas), min(5000, n_ideas))))
+    sample_groups = {}
+    position = {i: j for j, i in enumerate(sample)}
+    for category, rows in groups.items():
+        selected = [position[i] for i in rows if i in position]
+        if selected:
+            sample_groups[category] = selected
+    started = time.perf_counter()
+    scanned = prioritizer._batch_infrastructure_factor(lat[sample], lon[sample], sample_groups, infrastructure)
+    scan_time = (time.perf_counter() - started) / len(sample) * n_ideas
+
+    # Поштучный расчёт через индекс — для сверки
+    single = np.array([
+        prioritizer._calculate_infrastructure_factor(lat[i], lon[i], _category_key(category))
+        for category, rows in groups.items() for i in rows[:200]
+    ])
+    checked = np.array([indexed[i] for rows in groups.values() for i in rows[:200]])
+
+    print(f"Идей: {n_ideas}, объектов: {n_objects}")
+    print(f"Индекс (nearest_many):  {index_time:8.2f} с (первый вызов со снимками {first_time:.2f} с)")
+    print(f"Перебор всех пар:       {scan_time:8.2f} с (оценка по {len(sample)} идеям)")
+    print(f"Макс. расхождение с перебором:   {np.abs(indexed[sample] - scanned).max():.2e}")
+    print(f"Макс. расхождение с поштучным:   {np.abs(single - checked).max():.2e}")
+
+if __name__ == "__main__":
+    main()
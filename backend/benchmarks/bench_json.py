@@ -0,0 +1,109 @@
+"""Ответ со списком идей: IdeaResponse + JSONResponse против fast_json
+
+Для списков разной длины меряется медиана полного пути ответа без HTTP:
+  - обычный: crud.get_ideas (ORM-объекты) → проверка по
+    List[IdeaResponse] и сериализация так же, как это делает FastAPI
+    (fastapi.routing.serialize_response) → JSONResponse;
+  - быстрый: crud.get_ideas(as_dicts=True) (кортежи столбцов) →
+    FastJSONResponse (orjson), а также тот же путь с json.dumps.
+Тела ответов сравниваются после разбора — быстрый путь отдаёт то же самое.
+
+Запуск из папки backend:
+    python benchmarks/bench_json.py [размеры через запятую]
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, fast_json, models, schemas
+from app.database import Base, create_app_engine
+
+RUNS = 15
+
+def seed(engine, n: int):
+    rnd = random.Random(1)
+    author = {'id': str(uuid.uuid4()), 'email': "bench@gorod-kontur.ru"}
+    start = datetime(2024, 1, 1)
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея номер {i}",
+        'description': "Описание идеи для проверки сериализации ответа " * 3,
+        'category': rnd.choice(list(models.IdeaCategory)).name,
+        'status': rnd.choice(list(models.IdeaStatus)).name,
+        'latitude': 54.0 + rnd.uniform(-0.05, 0.05),
+        'longitude': 86.6 + rnd.uniform(-0.05, 0.05),
+        'address': f"ул. Ленина, {i % 200}",
+        'author_id': author['id'],
+        'importance_score': rnd.random(),
+        'votes_count': rnd.randint(0, 500),
+        'created_at': start + timedelta(minutes=i, microseconds=rnd.randint(0, 999999)),
+        'updated_at': start + timedelta(minutes=i + 5) if i % 2 else None
+    } for i in range(n)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), [author])
+        connection.execute(insert(models.Idea.__table__), ideas)
+
+def median_ms(call) -> float:
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100, 1000, 10000]
+    field = create_response_field(name="response", type_=List[schemas.IdeaResponse])
+    loop = asyncio.new_event_loop()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_app_engine(f"sqlite:///{directory}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, max(sizes))
+        db = sessionmaker(bind=engine)()
+
+        def pydantic_path(n):
+            ideas = crud.get_ideas(db, limit=n)
+            content = loop.run_until_complete(serialize_response(field=field, response_content=ideas))
+            return JSONResponse(content).body
+
+        def fast_path(n):
+            return fast_json.FastJSONResponse(crud.get_ideas(db, limit=n, as_dicts=True)).body
+
+        def fast_path_stdlib(n):
+            orjson, fast_json.orjson = fast_json.orjson, None
+            try:
+                return fast_path(n)
+            finally:
+                fast_json.orjson = orjson
+
+        print(f"{'идей':>6} {'pydantic, мс':>13} {'fast+orjson, мс':>16} {'fast+json, мс':>14} {'ускорение':>10}")
+        for n in sizes:
+            assert json.loads(pydantic_path(n)) == json.loads(fast_path(n)) == json.loads(fast_path_stdlib(n))
+            base = median_ms(lambda: pydantic_path(n))
+            fast = median_ms(lambda: fast_path(n))
+            stdlib = median_ms(lambda: fast_path_stdlib(n))
+            print(f"{n:>6} {base:>13.2f} {fast:>16.2f} {stdlib:>14.2f} {base / fast:>9.1f}x")
+
+        db.close()
+        engine.dispose()
+    loop.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Раздача живых обновлений: стоимость события при тысячах подписчиков
+
+N подписчиков со случайными bbox (видимая область карты ~2×2 км) и
+категориями получают поток событий по идеям города. Меряется время
+раздачи одного события (фильтр + постановка в очереди) и то, что
+очереди «спящих» клиентов (никто не читает, очередь — QUEUE_SIZE) остаются
+ограниченными: вместо роста памяти они получают resync.
+
+Запуск из папки backend:
+    python benchmarks/bench_live.py [подписчиков через запятую]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.live_updates import LiveBus
+
+EVENTS = 2000
+QUEUE_SIZE = 32
+CATEGORIES = ["sport", "art", "ecology", "infrastructure", "education", "culture", "other"]
+CITY = (53.93, 86.55, 54.05, 86.78)
+
+def random_point(rnd):
+    south, west, north, east = CITY
+    return rnd.uniform(south, north), rnd.uniform(west, east)
+
+async def run(subscribers: int):
+    rnd = random.Random(1)
+    bus = LiveBus(queue_size=QUEUE_SIZE, max_subscribers=subscribers)
+    bus.start()
+    subscriptions = []
+    for _ in range(subscribers):
+        lat, lon = random_point(rnd)
+        categories = rnd.sample(CATEGORIES, 2) if rnd.random() < 0.5 else None
+        subscriptions.append(bus.subscribe((lat - 0.01, lon - 0.015, lat + 0.01, lon + 0.015), categories))
+
+    events = []
+    for i in range(EVENTS):
+        lat, lon = random_point(rnd)
+        events.append({"id": str(i), "category": rnd.choice(CATEGORIES), "latitude": lat,
+                       "longitude": lon, "votes_count": i})
+
+    started = time.perf_counter()
+    for event in events:
+        bus.publish("idea_voted", event)
+    elapsed = time.perf_counter() - started
+
+    stats = bus.stats()
+    print(f"{subscribers:>12} {elapsed / EVENTS * 1e6:>12.1f} {stats['delivered'] / EVENTS:>14.1f} "
+          f"{stats['max_queued']:>10} {stats['resyncs']:>8}")
+    for subscription in subscriptions:
+        bus.unsubscribe(subscription)
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 10000]
+    print(f"{'подписчиков':>12} {'мкс/событие':>12} {'получателей':>14} {'макс. очер.':>10} {'resync':>8}")
+    for size in sizes:
+        asyncio.run(run(size))
+
+if __name__ == "__main__":
+    main()
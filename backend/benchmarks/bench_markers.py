@@ -0,0 +1,95 @@
+"""Метки карты: полные идеи против проекции IdeaMarker
+
+Для одного и того же набора идей меряется медиана времени ответа и его
+размер:
+  - полные сущности: crud.get_ideas (ORM-объекты со всеми столбцами,
+    кроме отложенного photo_urls);
+  - лента: crud.get_ideas(as_dicts=True) — столбцы IdeaResponse;
+  - метки: crud.get_idea_markers — только id, координаты, категория,
+    заголовок и важность.
+Описания в тестовых данных длинные (~2 КБ), как у реальных обращений.
+
+Запуск из папки backend:
+    python benchmarks/bench_markers.py [число идей]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, fast_json, models
+from app.database import Base, create_app_engine
+
+RUNS = 15
+
+def seed(engine, n: int):
+    rnd = random.Random(1)
+    author = {'id': str(uuid.uuid4()), 'email': "bench@gorod-kontur.ru"}
+    start = datetime(2024, 1, 1)
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея номер {i}",
+        'description': "Подробное описание проблемы во дворе и предложения жителей. " * 35,
+        'category': rnd.choice(list(models.IdeaCategory)).name,
+        'status': rnd.choice(list(models.IdeaStatus)).name,
+        'latitude': 54.0 + rnd.uniform(-0.05, 0.05),
+        'longitude': 86.6 + rnd.uniform(-0.05, 0.05),
+        'address': f"ул. Ленина, {i % 200}",
+        'author_id': author['id'],
+        'importance_score': rnd.random(),
+        'photo_urls': [f"https://cdn.gorod-kontur.ru/photos/{uuid.uuid4()}.jpg" for _ in range(3)],
+        'created_at': start + timedelta(minutes=i)
+    } for i in range(n)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), [author])
+        connection.execute(insert(models.Idea.__table__), ideas)
+
+def median_ms(call) -> float:
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_app_engine(f"sqlite:///{directory}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, n)
+        db = sessionmaker(bind=engine)()
+
+        def entities():
+            ideas = crud.get_ideas(db, limit=n)
+            db.expunge_all()
+            return ideas
+
+        cases = [
+            ("полные сущности", entities),
+            ("лента (IdeaResponse)", lambda: crud.get_ideas(db, limit=n, as_dicts=True)),
+            ("метки (IdeaMarker)", lambda: crud.get_idea_markers(db, limit=n)),
+        ]
+        print(f"{'идей: ' + str(n):<22} {'мс':>8} {'тело, КБ':>9}")
+        for name, call in cases:
+            elapsed = median_ms(call)
+            result = call()
+            size = f"{len(fast_json.FastJSONResponse(result).body) / 1024:>9.0f}" \
+                if isinstance(result[0], dict) else f"{'—':>9}"
+            print(f"{name:<22} {elapsed:>8.2f} {size}")
+
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Горячие выборки через кэш ответов против расчёта из БД
+
+Во временной SQLite с идеями меряется медиана ответа ленты идей
+(100 записей), одной идеи и аналитики: без кэша (crud + сериализация
+IdeaResponse) и с кэшем в памяти и в LocalRedis (попадания). Отдельно —
+доля попаданий при опросе ленты, перемежаемом голосами за идеи.
+
+Запуск из папки backend:
+    python benchmarks/bench_response_cache.py [идей]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import crud, models, response_cache, schemas
+from app.database import Base, create_app_engine
+
+RUNS = 200
+
+def seed(engine, n: int):
+    rnd = random.Random(1)
+    author = {'id': str(uuid.uuid4()), 'email': "bench@gorod-kontur.ru"}
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея номер {i}",
+        'description': "Описание идеи для проверки нагрузки",
+        'category': rnd.choice(list(models.IdeaCategory)).name,
+        'status': models.IdeaStatus.NEW.name,
+        'latitude': 54.0 + rnd.uniform(-0.05, 0.05),
+        'longitude': 86.6 + rnd.uniform(-0.05, 0.05),
+        'author_id': author['id'],
+        'importance_score': rnd.random()
+    } for i in range(n)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), [author])
+        connection.execute(insert(models.Idea.__table__), ideas)
+    return author['id'], [idea['id'] for idea in ideas]
+
+def median_ms(call) -> float:
+    times = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_app_engine(f"sqlite:///{directory}/bench.db")
+        Base.metadata.create_all(bind=engine)
+        user_id, idea_ids = seed(engine, n)
+        db = sessionmaker(bind=engine)()
+        idea_id = idea_ids[0]
+
+        calls = {
+            "лента (100)": lambda: crud.get_ideas_cached(db, limit=100),
+            "идея": lambda: crud.get_idea_cached(db, idea_id),
+            "аналитика": lambda: crud.get_analytics_cached(db),
+        }
+        backends = (
+            ("без кэша", None),
+            ("memory", response_cache.MemoryBackend()),
+            ("LocalRedis", response_cache.RedisBackend(response_cache.LocalRedis())),
+        )
+        print(f"Идей: {n}, медиана из {RUNS}, мс")
+        print(f"{'ответ':<14}" + "".join(f"{name:>12}" for name, _ in backends))
+        results = {name: [] for name in calls}
+        for _, backend in backends:
+            response_cache.response_cache = response_cache.ResponseCache(backend, ttl=60)
+            for name, call in calls.items():
+                call()
+                results[name].append(median_ms(call))
+        for name, values in results.items():
+            print(f"{name:<14}" + "".join(f"{value:>12.3f}" for value in values))
+
+        # Опрос ленты с голосами: голос сбрасывает только ленты с этой идеей
+        response_cache.response_cache = response_cache.ResponseCache(response_cache.MemoryBackend(), ttl=60)
+        rnd = random.Random(2)
+        categories = [None] + list(models.IdeaCategory)
+        for step in range(2000):
+            crud.get_ideas_cached(db, limit=50, category=rnd.choice(categories))
+            if step % 10 == 9:
+                crud.create_vote(db, schemas.VoteCreate(idea_id=rnd.choice(idea_ids), vote_type="up"), user_id)
+        stats = response_cache.response_cache.stats()
+        print(f"опрос лент с голосами (каждый 10-й запрос): hit_rate {stats['hit_rate']:.2%}, "
+              f"устаревших {stats['stale']}")
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
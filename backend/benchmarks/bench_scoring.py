@@ -0,0 +1,118 @@
+"""Сравнение поштучного и пакетного (score_batch) ранжирования идей
+
+На выборке идей проверяется, что неокруглённые компоненты и итоговая
+оценка обоих путей при одном и том же now расходятся не больше TOLERANCE.
+
+Запуск из папки backend:
+    python benchmarks/bench_scoring.py [кол-во идей] [размер выборки для поштучного расчёта]
+"""
+import os
+import sys
+import random
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import IdeaPrioritizer
+
+CATEGORIES = ['sport', 'art', 'ecology', 'infrastructure', 'education', 'culture', 'other']
+INFRA_TYPES = ['football_field', 'playground', 'sport_complex', 'mural', 'park',
+               'green_zone', 'bench', 'lighting', 'road']
+CENTER = (53.99, 86.66)  # Киселёвск
+# Допустимое расхождение пакетного и поштучного расчёта (см. score_batch)
+TOLERANCE = 1e-6
+
+def make_ideas(n: int, now: datetime):
+    rnd = random.Random(42)
+    return [{
+        'id': f"idea-{i}",
+        'latitude': CENTER[0] + rnd.uniform(-0.05, 0.05),
+        'longitude': CENTER[1] + rnd.uniform(-0.08, 0.08),
+        'category': rnd.choice(CATEGORIES),
+        'votes_count': rnd.randint(0, 300),
+        'comments_count': rnd.randint(0, 50),
+        'created_at': now - timedelta(days=rnd.randint(0, 60), seconds=rnd.randint(0, 86399))
+    } for i in range(n)]
+
+def make_infrastructure(n: int):
+    rnd = random.Random(7)
+    return [{
+        'type': rnd.choice(INFRA_TYPES),
+        'latitude': CENTER[0] + rnd.uniform(-0.05, 0.05),
+        'longitude': CENTER[1] + rnd.uniform(-0.08, 0.08),
+        'condition': rnd.choice(['poor', 'average', 'good', None])
+    } for _ in range(n)]
+
+def main():
+    n_ideas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sample_size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    now = datetime.now()
+    ideas = make_ideas(n_ideas, now)
+    infrastructure = make_infrastructure(500)
+    context = {
+        'similar_ideas': ideas,
+        'infrastructure_objects': infrastructure,
+        'city_population': 84369,
+        'now': now
+    }
+    prioritizer = IdeaPrioritizer()
+
+    started = time.perf_counter()
+    batch = prioritizer.score_batch(ideas, context)
+    batch_time = time.perf_counter() - started
+
+    # Поштучный путь слишком медленный для всего набора — меряем на выборке
+    sample = random.Random(1).sample(range(n_ideas), min(sample_size, n_ideas))
+    single_contexts = {}
+    started = time.perf_counter()
+    single = []
+    for i in sample:
+        idea = ideas[i]
+        similar = [o for o in ideas if o['category'] == idea['category'] and o['id'] != idea['id']]
+        single_contexts[i] = {
+            'similar_ideas': similar,
+            'infrastructure_objects': infrastructure,
+            'city_population': context['city_population'],
+            'now': now
+        }
+        single.append(prioritizer.calculate_importance_score(idea, single_contexts[i]))
+    single_time = (time.perf_counter() - started) / len(sample) * n_ideas
+
+    # Сверка неокруглённых компонент при одном и том же now
+    arrays = prioritizer._score_arrays(ideas, context, now)
+    max_diff = 0.0
+    priority_mismatches = 0
+    for i, result in zip(sample, single):
+        idea, single_context = ideas[i], single_contexts[i]
+        components = {
+            'duplicate': prioritizer._calculate_duplicate_factor(
+                idea['latitude'], idea['longitude'], idea['category'],
+                single_context['similar_ideas'], now
+            ),
+            'social': prioritizer._calculate_social_factor(
+                idea['votes_count'], idea['comments_count'], context['city_population']
+            ),
+            'infrastructure': prioritizer._calculate_infrastructure_factor(
+                idea['latitude'], idea['longitude'], idea['category'], infrastructure
+            )
+        }
+        components['final'] = sum(
+            components[name] * prioritizer.weights[f'{name}_factor']
+            for name in ('duplicate', 'social', 'infrastructure')
+        )
+        for name, value in components.items():
+            max_diff = max(max_diff, abs(value - arrays[name][i]))
+        priority_mismatches += result['priority'] != batch[i]['priority']
+
+    print(f"Идей: {n_ideas}, объектов инфраструктуры: {len(infrastructure)}")
+    print(f"score_batch:                {batch_time:8.2f} с")
+    print(f"calculate_importance_score: {single_time:8.2f} с (оценка по {len(sample)} идеям)")
+    print(f"Ускорение: x{single_time / batch_time:.0f}")
+    print(f"Макс. расхождение неокруглённых оценок: {max_diff:.2e}, "
+          f"несовпадений приоритета: {priority_mismatches}")
+    assert max_diff <= TOLERANCE, f"расхождение {max_diff:.2e} больше {TOLERANCE}"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Пропускная способность вебхука Telegram: блокирующий requests против httpx
+
+Поднимает локальную заглушку Telegram API и приложение на uvicorn, затем
+шлёт в /telegram/webhook конкурентные обновления с командой /start (на каждое
+бот отвечает одним сообщением). Первый прогон подменяет отправку прежней
+реализацией (requests.post внутри async-обработчика), второй — текущей.
+
+Очередь исходящих сообщений и фоновая обработка вебхука выключены
+(TELEGRAM_QUEUE_WORKERS=0, TELEGRAM_UPDATE_WORKERS=0): обновление
+обрабатывается внутри запроса, и ответ уходит через send_message. У прогонов
+разные диапазоны update_id (иначе второй получил бы только "duplicate"),
+а время останавливается, когда заглушка получила все ответы.
+
+Запуск из папки backend:
+    python benchmarks/bench_telegram_webhook.py [кол-во обновлений] [конкурентность]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import requests
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram_stub import TelegramStub
+
+STUB_PORT = 8091
+APP_PORT = 8092
+
+stub = TelegramStub(port=STUB_PORT, latency=0.03)
+os.environ["TELEGRAM_API_URL"] = stub.url
+os.environ["TELEGRAM_BOT_TOKEN"] = "0:bench"
+os.environ["ANALYTICS_RECONCILE_INTERVAL"] = "0"
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+os.environ["TELEGRAM_QUEUE_WORKERS"] = "0"
+os.environ["TELEGRAM_UPDATE_WORKERS"] = "0"
+
+from app.main import app
+from app.telegram_bot import TelegramBot
+
+def legacy_send_message(self, chat_id, text, parse_mode="HTML", reply_markup=None):
+    """Прежняя реализация: блокирующий requests.post без сессии и таймаута"""
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+    if reply_markup:
+        payload["reply_markup"] = reply_markup
+    try:
+        response = requests.post(f"{self.base_url}/sendMessage", json=payload)
+        response.raise_for_status()
+        return True
+    except Exception:
+        return False
+
+async def blocking_send_message(self, *args, **kwargs):
+    return legacy_send_message(self, *args, **kwargs)
+
+async def fire(first_update_id: int, total: int, concurrency: int) -> float:
+    """Время до получения заглушкой ответов на все total обновлений"""
+    semaphore = asyncio.Semaphore(concurrency)
+    expected = len(stub.messages) + total
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{APP_PORT}", timeout=120) as client:
+        async def one(update_id: int):
+            async with semaphore:
+                response = await client.post("/telegram/webhook", json={
+                    "update_id": update_id,
+                    "message": {"message_id": update_id, "chat": {"id": update_id % 97}, "text": "/start"}
+                })
+                response.raise_for_status()
+                assert response.json()["status"] == "ok", response.json()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(first_update_id + i) for i in range(total)))
+        while len(stub.messages) < expected:
+            if time.perf_counter() - started > 120:
+                raise RuntimeError(f"Заглушка получила {len(stub.messages)} из {expected} сообщений")
+            await asyncio.sleep(0.001)
+        return time.perf_counter() - started
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    stub.start()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=APP_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    pooled_send_message = TelegramBot.send_message
+    try:
+        TelegramBot.send_message = blocking_send_message
+        blocking = asyncio.run(fire(0, total, concurrency))
+        TelegramBot.send_message = pooled_send_message
+        pooled = asyncio.run(fire(total, total, concurrency))
+    finally:
+        TelegramBot.send_message = pooled_send_message
+        server.should_exit = True
+        thread.join()
+        stub.stop()
+
+    print(f"Обновлений: {total}, конкурентность: {concurrency}, задержка API: {stub.latency * 1000:.0f} мс")
+    print(f"requests (блокирующий): {total / blocking:8.1f} обновл./с")
+    print(f"httpx (пул, async):     {total / pooled:8.1f} обновл./с")
+    print(f"Ускорение: x{blocking / pooled:.1f}; сообщений получено заглушкой: "
+          f"{len(stub.messages)} из {2 * total}")
+
+if __name__ == "__main__":
+    main()
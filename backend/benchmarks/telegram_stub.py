@@ -0,0 +1,71 @@
+"""Локальная заглушка Telegram Bot API для тестов и бенчмарков
+
+Принимает POST /bot<token>/<method>, отвечает {"ok": true} с заданной
+задержкой и запоминает полученные сообщения. Бота направляют на заглушку
+переменной окружения TELEGRAM_API_URL.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+class TelegramStub:
+    def __init__(self, port: int = 8081, latency: float = 0.03, rate_limit_every: int = 0):
+        self.port = port
+        self.latency = latency
+        # Каждый N-й запрос получает 429 с retry_after (0 — никогда)
+        self.rate_limit_every = rate_limit_every
+        self.requests_count = 0
+        self.messages: List[Dict] = []
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _handle(self, request: Request):
+        self.requests_count += 1
+        await asyncio.sleep(self.latency)
+
+        if self.rate_limit_every and self.requests_count % self.rate_limit_every == 0:
+            return JSONResponse({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1}
+            }, status_code=429)
+
+        payload = await request.json()
+        self.messages.append({"method": request.path_params["method"], **payload})
+        return JSONResponse({"ok": True, "result": {"message_id": len(self.messages)}})
+
+    def start(self):
+        app = Starlette(routes=[Route("/bot{token}/{method}", self._handle, methods=["POST"])])
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port,
+                                                     log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join()
+
+if __name__ == "__main__":
+    stub = TelegramStub().start()
+    print(f"Заглушка Telegram API: {stub.url} (Ctrl+C для остановки)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
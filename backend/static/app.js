@@ -10,6 +10,12 @@ let map;
 let placemarks = [];
 let userLocation = null;
 let currentIdeas = [];
+let mapLayer = null;
+let heatmapEnabled = false;
+let mapRequest = 0;
+let ideasRequest = 0;
+let liveSocket = null;
+let liveRefreshTimer = null;
 
 // Инициализация при загрузке страницы
 document.addEventListener('DOMContentLoaded', async function() {
@@ -44,6 +50,16 @@ function initMap() {
         const geolocationControl = new ymaps.control.GeolocationControl();
         map.controls.add(geolocationControl);
         
+        // Кластеры, тепловая карта и список идей приходят с сервера для видимой области
+        map.events.add('boundschange', () => {
+            loadMapLayer();
+            loadIdeas();
+            sendLiveFilter();
+        });
+        loadMapLayer();
+        loadIdeas();
+        connectLiveUpdates();
+        
         // Обработка клика по карте
         map.events.add('click', function(e) {
             const coords = e.get('coords');
@@ -81,15 +97,22 @@ async function geocode(coords) {
     });
 }
 
-// Загрузка идей с сервера
+// Загрузка идей с сервера (после появления карты — только видимых)
 async function loadIdeas() {
+    const params = new URLSearchParams({ limit: 50 });
+    if (map) {
+        const [[south, west], [north, east]] = map.getBounds();
+        params.set('bbox', [south, west, north, east].join(','));
+    }
+    
+    const request = ++ideasRequest;
     try {
-        const response = await fetch(`${CONFIG.API_URL}/ideas?limit=50`);
+        const response = await fetch(`${CONFIG.API_URL}/ideas?${params}`);
         const ideas = await response.json();
+        if (request !== ideasRequest) return;
         currentIdeas = ideas;
         
         displayIdeas(ideas);
-        updateMapWithIdeas(ideas);
     } catch (error) {
         console.error('Ошибка загрузки идей:', error);
         document.getElementById('ideas-list').innerHTML = 
@@ -133,47 +156,103 @@ function displayIdeas(ideas) {
     });
 }
 
-// Обновление карты с идеями
-function updateMapWithIdeas(ideas) {
-    // Очищаем старые метки
-    placemarks.forEach(pm => map.geoObjects.remove(pm));
-    placemarks = [];
+// Загрузка слоя карты: кластеры или ячейки тепловой карты видимой области
+async function loadMapLayer() {
+    if (!map) return;
     
-    // Создаём кластеризатор
-    const clusterer = new ymaps.Clusterer({
-        clusterDisableClickZoom: true,
-        clusterOpenBalloonOnClick: true,
-        clusterBalloonContentLayout: 'cluster#balloonTwoColumns'
+    const [[south, west], [north, east]] = map.getBounds();
+    const params = new URLSearchParams({
+        bbox: [south, west, north, east].join(','),
+        zoom: Math.round(map.getZoom())
     });
+    const category = document.getElementById('filter-category').value;
+    if (category !== 'all') params.set('category', category);
     
-    // Добавляем метки для каждой идеи
-    ideas.forEach(idea => {
-        const placemark = new ymaps.Placemark(
-            [idea.latitude, idea.longitude],
-            {
+    // Ответ на устаревший запрос (карту успели сдвинуть) не рисуем
+    const request = ++mapRequest;
+    try {
+        const endpoint = heatmapEnabled ? 'heatmap' : 'clusters';
+        const response = await fetch(`${CONFIG.API_URL}/map/${endpoint}?${params}`);
+        const data = await response.json();
+        if (request !== mapRequest) return;
+        
+        if (heatmapEnabled) {
+            showHeatmap(data.cells);
+        } else {
+            showClusters(data.clusters);
+        }
+    } catch (error) {
+        console.error('Ошибка загрузки карты:', error);
+    }
+}
+
+function replaceMapLayer(collection) {
+    if (mapLayer) map.geoObjects.remove(mapLayer);
+    mapLayer = collection;
+    map.geoObjects.add(mapLayer);
+}
+
+// Кластеры: число идей в группе, одиночные идеи — обычной меткой
+function showClusters(clusters) {
+    const collection = new ymaps.GeoObjectCollection();
+    
+    clusters.forEach(cluster => {
+        const coords = [cluster.latitude, cluster.longitude];
+        const idea = cluster.idea;
+        
+        if (idea) {
+            collection.add(new ymaps.Placemark(coords, {
                 balloonContentHeader: idea.title,
                 balloonContentBody: `
                     <p><strong>Категория:</strong> ${getCategoryName(idea.category)}</p>
-                    <p><strong>Описание:</strong> ${idea.description.substring(0, 150)}...</p>
                     <p><strong>Приоритет:</strong> ${getPriorityName(idea.priority)}</p>
-                    <p><strong>Голосов:</strong> ${idea.votes_count || 0}</p>
                     <button onclick="voteForIdea('${idea.id}')" class="map-btn">
                         <i class="fas fa-thumbs-up"></i> Поддержать
                     </button>
                 `,
                 hintContent: idea.title
-            },
-            {
+            }, {
                 preset: getPlacemarkPreset(idea.priority),
                 balloonCloseButton: true
-            }
-        );
+            }));
+            return;
+        }
         
-        clusterer.add(placemark);
-        placemarks.push(placemark);
+        const placemark = new ymaps.Placemark(coords, {
+            iconContent: cluster.count,
+            hintContent: `Идей: ${cluster.count}`
+        }, {
+            preset: cluster.max_score >= 0.7 ? 'islands#redCircleIcon' : 'islands#blueCircleIcon'
+        });
+        // Клик по кластеру приближает карту
+        placemark.events.add('click', () => {
+            map.setCenter(coords, Math.min(map.getZoom() + 2, 19), { duration: 300 });
+        });
+        collection.add(placemark);
+    });
+    
+    replaceMapLayer(collection);
+}
+
+// Тепловая карта: круги с прозрачностью по суммарной важности ячейки
+function showHeatmap(cells) {
+    const collection = new ymaps.GeoObjectCollection();
+    const maxWeight = Math.max(...cells.map(cell => cell[3] || cell[2]), 1);
+    const [[south], [north]] = map.getBounds();
+    // Радиус круга — примерно половина ячейки кластеризации на текущем зуме
+    const radius = (north - south) * 111000 / 16;
+    
+    cells.forEach(([lat, lon, count, weight]) => {
+        collection.add(new ymaps.Circle([[lat, lon], radius], {
+            hintContent: `Идей: ${count}`
+        }, {
+            fillColor: '#ff3b30',
+            fillOpacity: 0.15 + 0.6 * (weight || count) / maxWeight,
+            strokeWidth: 0
+        }));
     });
     
-    map.geoObjects.add(clusterer);
+    replaceMapLayer(collection);
 }
 
 // Вспомогательные функции
@@ -237,6 +316,7 @@ function setupEventListeners() {
             if (response.ok) {
                 alert('Идея успешно отправлена!');
                 loadIdeas();
+                loadMapLayer();
                 updateStats();
             } else {
                 throw new Error('Ошибка отправки');
@@ -320,12 +400,12 @@ async function suggestAddress(query) {
     }
 }
 
-// Применение фильтров
-function applyFilters() {
+// Идеи списка с учётом фильтров
+function filterIdeas(ideas) {
     const category = document.getElementById('filter-category').value;
     const priority = document.getElementById('filter-priority').value;
     
-    let filtered = currentIdeas;
+    let filtered = ideas;
     
     if (category !== 'all') {
         filtered = filtered.filter(idea => idea.category === category);
@@ -335,8 +415,79 @@ function applyFilters() {
         filtered = filtered.filter(idea => idea.priority === priority);
     }
     
-    displayIdeas(filtered);
-    updateMapWithIdeas(filtered);
+    return filtered;
+}
+
+// Применение фильтров
+function applyFilters() {
+    displayIdeas(filterIdeas(currentIdeas));
+    loadMapLayer();
+    sendLiveFilter();
+}
+
+// Живые обновления: новые идеи и голоса в видимой области приходят по WebSocket
+function connectLiveUpdates(retryDelay = 1000) {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    liveSocket = new WebSocket(`${protocol}//${window.location.host}/api/live/ws`);
+    
+    liveSocket.addEventListener('open', () => {
+        retryDelay = 1000;
+        sendLiveFilter();
+    });
+    liveSocket.addEventListener('message', message => handleLiveEvent(JSON.parse(message.data)));
+    // Переподключение с растущей паузой; пропущенное догружается обычными запросами
+    liveSocket.addEventListener('close', () => {
+        setTimeout(() => {
+            connectLiveUpdates(Math.min(retryDelay * 2, 30000));
+            scheduleLiveRefresh();
+        }, retryDelay);
+    });
+}
+
+// Подписка только на видимую область и выбранную категорию
+function sendLiveFilter() {
+    if (!map || !liveSocket || liveSocket.readyState !== WebSocket.OPEN) return;
+    
+    const [[south, west], [north, east]] = map.getBounds();
+    const category = document.getElementById('filter-category').value;
+    liveSocket.send(JSON.stringify({
+        bbox: [south, west, north, east].join(','),
+        category: category !== 'all' ? [category] : null
+    }));
+}
+
+function handleLiveEvent(event) {
+    if (event.type === 'idea_voted') {
+        // Голос меняет только счётчик — обновляем список без запроса к серверу
+        const idea = currentIdeas.find(item => item.id === event.idea.id);
+        if (idea) {
+            idea.votes_count = event.idea.votes_count;
+            displayIdeas(filterIdeas(currentIdeas));
+        }
+        return;
+    }
+    // Новая или изменённая идея, а также resync (часть событий потеряна)
+    scheduleLiveRefresh();
+}
+
+// Пачка событий подряд — одна перезагрузка видимых данных
+function scheduleLiveRefresh() {
+    clearTimeout(liveRefreshTimer);
+    liveRefreshTimer = setTimeout(() => {
+        loadIdeas();
+        loadMapLayer();
+        updateStats();
+    }, 500);
+}
+
+// Постоянный id посетителя: по нему сервер отличает голоса разных людей
+function getVisitorId() {
+    let visitorId = localStorage.getItem('visitorId');
+    if (!visitorId) {
+        visitorId = crypto.randomUUID();
+        localStorage.setItem('visitorId', visitorId);
+    }
+    return visitorId;
 }
 
 // Голосование за идею (доступно из балуна карты)
@@ -346,6 +497,7 @@ window.voteForIdea = async function(ideaId) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'X-Visitor-Id': getVisitorId(),
             },
             body: JSON.stringify({ vote_type: 'up' })
         });
@@ -363,36 +515,34 @@ window.voteForIdea = async function(ideaId) {
 // Обновление статистики
 async function updateStats() {
     try {
-        const response = await fetch(`${CONFIG.API_URL}/ideas/analytics?period_days=365`);
+        const response = await fetch(`${CONFIG.API_URL}/analytics?period_days=365`);
         const data = await response.json();
         
-        document.getElementById('total-ideas').textContent = data.summary?.total_ideas || 0;
-        document.getElementById('active-ideas').textContent = data.summary?.active_ideas || 0;
-        document.getElementById('completed-ideas').textContent = data.summary?.completed_ideas || 0;
-        document.getElementById('total-users').textContent = data.summary?.total_users || 0;
+        document.getElementById('total-ideas').textContent = data.total_ideas || 0;
+        document.getElementById('active-ideas').textContent = data.active_ideas || 0;
+        document.getElementById('completed-ideas').textContent = data.completed_ideas || 0;
+        document.getElementById('total-users').textContent = data.total_users || 0;
     } catch (error) {
         console.error('Ошибка загрузки статистики:', error);
     }
 }
 
-// Тепловая карта (упрощённая реализация)
+// Тепловая карта
 function toggleHeatmap() {
     const btn = document.getElementById('heatmap-toggle');
     btn.classList.toggle('active');
+    heatmapEnabled = btn.classList.contains('active');
     
-    // Заглушка для тепловой карты
-    if (btn.classList.contains('active')) {
-        alert('Тепловая карта включена. Показаны области с наибольшей концентрацией проблем.');
-    }
+    // Тепловая карта и кластеры показываются по очереди
+    document.getElementById('cluster-toggle').classList.toggle('active', !heatmapEnabled);
+    loadMapLayer();
 }
 
 // Кластеризация
 function toggleClustering() {
     const btn = document.getElementById('cluster-toggle');
-    btn.classList.toggle('active');
-    
-    if (btn.classList.contains('active')) {
-        updateMapWithIdeas(currentIdeas);
-        alert('Кластеризация включена. Схожие идеи сгруппированы.');
-    }
-}
\ No newline at end of file
+    btn.classList.add('active');
+    document.getElementById('heatmap-toggle').classList.remove('active');
+    heatmapEnabled = false;
+    loadMapLayer();
+}
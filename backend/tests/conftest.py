@@ -0,0 +1,18 @@
+"""Общая настройка тестов: отдельная временная БД и выключенные фоновые задачи
+
+Переменные окружения выставляются до импорта app: движок и фоновые
+компоненты читают их при импорте модулей.
+"""
+import os
+import sys
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix="gorod-kontur-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_directory}/test.db"
+os.environ["TELEGRAM_BOT_TOKEN"] = ""
+os.environ["ANALYTICS_RECONCILE_INTERVAL"] = "0"
+os.environ["PRIORITY_DEBOUNCE_MS"] = "-1"
+os.environ["VOTE_FLUSH_INTERVAL_MS"] = "0"
+os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
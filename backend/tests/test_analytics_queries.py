@@ -0,0 +1,54 @@
+"""Аналитика из БД — фиксированное число запросов при любом объёме данных"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base
+
+ANALYTICS_QUERIES = 4
+
+def _seed(engine, n: int):
+    users = [{'id': str(uuid.uuid4()), 'email': f"user{i}@gorod-kontur.ru"} for i in range(max(n // 10, 1))]
+    categories = list(models.IdeaCategory)
+    statuses = list(models.IdeaStatus)
+    now = datetime.now()
+    ideas = [{
+        'id': str(uuid.uuid4()),
+        'title': f"Идея номер {i}",
+        'description': "Описание идеи для аналитики",
+        'category': categories[i % len(categories)].name,
+        'status': statuses[i % len(statuses)].name,
+        'latitude': 54.0,
+        'longitude': 86.6,
+        'author_id': users[i % len(users)]['id'],
+        'importance_score': (i % 10) / 10,
+        'created_at': now - timedelta(days=i % 60)
+    } for i in range(n)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User.__table__), users)
+        connection.execute(insert(models.Idea.__table__), ideas)
+
+@pytest.mark.parametrize("n", [10, 500])
+def test_compute_analytics_query_count(n):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    _seed(engine, n)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        result = crud.compute_analytics(db, period_days=30)
+    finally:
+        db.close()
+        engine.dispose()
+
+    assert len(statements) == ANALYTICS_QUERIES
+    assert result["total_ideas"] == n
+    assert sum(result["by_category"].values()) == sum(result["by_priority"].values())
@@ -0,0 +1,41 @@
+"""categorize_batch даёт те же оценки, что и categorize по одному тексту"""
+import numpy as np
+import pytest
+
+from app.ai.categorizer import SimpleAICategorizer
+
+TEXTS = [
+    "Нужна футбольная ПЛОЩАДКА и новые мячи во дворе",
+    "Зелёные деревья вместо свалки; «мусор» вывезти!",
+    "Ремонт дороги, освещение и лавочки у остановки",
+    "",
+    "спорт2 _мяч бег бегом зал_ по и на",
+    "Экологический кружок в школе — учителя и студенты",
+    "Библиотеками и лабораториями пользуются жители",
+]
+
+def _single(categorizer, texts, titles):
+    return np.array([
+        list(categorizer.categorize(text, title)['all_scores'].values())
+        for text, title in zip(texts, titles)
+    ])
+
+@pytest.mark.parametrize("extra", [
+    [],
+    # Символ, который lower() превращает в два
+    ["İфутбол и стадион"],
+    ["\U0001F600 театр,концерт\xa0и\x00выставка"],
+])
+def test_batch_matches_single(extra):
+    categorizer = SimpleAICategorizer()
+    texts = TEXTS + extra
+    titles = ["Футбол" if i % 2 else "" for i in range(len(texts))]
+
+    batch = categorizer.categorize_batch(texts, titles)
+
+    assert batch.shape == (len(texts), len(categorizer.categories))
+    np.testing.assert_allclose(batch, _single(categorizer, texts, titles), atol=1e-12)
+
+def test_empty_batch():
+    categorizer = SimpleAICategorizer()
+    assert categorizer.categorize_batch([]).shape == (0, len(categorizer.categories))
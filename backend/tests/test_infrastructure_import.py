@@ -0,0 +1,50 @@
+"""Импорт справочника инфраструктуры: замена атомарна, битые объекты пропускаются"""
+import io
+import json
+
+import pytest
+
+from app import geo_index, infrastructure_loader, models
+from app.database import Base, SessionLocal, engine
+
+def _feature(name, coordinates):
+    return {"type": "Feature", "properties": {"type": "school", "name": name},
+            "geometry": {"type": "Point", "coordinates": coordinates}}
+
+def _collection(features):
+    return io.StringIO(json.dumps({"type": "FeatureCollection", "features": features}))
+
+def _names(db):
+    return sorted(name for (name,) in db.query(models.InfrastructureObject.name))
+
+def test_failed_replace_keeps_old_objects():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        old = [_feature(f"Школа {i}", [86.6 + i * 1e-3, 54.0]) for i in range(10)]
+        infrastructure_loader.load_infrastructure(db, _collection(old), replace=True)
+        geo_index.ensure_loaded(db)
+
+        # Вторая пачка оборвана: первая уже записана в транзакцию
+        new = [_feature(f"Новая {i}", [86.7, 54.1]) for i in range(3)]
+        broken = io.StringIO(json.dumps({"type": "FeatureCollection", "features": new})[:-20])
+        with pytest.raises(ValueError):
+            infrastructure_loader.load_infrastructure(db, broken, replace=True, batch_size=2)
+
+        assert _names(db) == sorted(f"Школа {i}" for i in range(10))
+        geo_index.ensure_loaded(db)
+        assert len(geo_index.infrastructure_index) == 10
+    finally:
+        db.close()
+
+def test_geojson_skips_bad_coordinates():
+    features = [
+        _feature("Целая", [86.6, 54.0]),
+        _feature("Строка", ["восток", 54.0]),
+        _feature("Пустая", []),
+        _feature("Без координат", None),
+        {"type": "Feature", "properties": {"type": "school"},
+         "geometry": {"type": "Polygon", "coordinates": 5}},
+    ]
+    rows = list(infrastructure_loader.iter_geojson(_collection(features)))
+    assert [row["name"] for row in rows] == ["Целая"]
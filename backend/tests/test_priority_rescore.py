@@ -0,0 +1,53 @@
+"""Пересчёт приоритетов пачкой: число запросов не зависит от числа идей"""
+from sqlalchemy import event, update
+
+from app import analytics_snapshot, crud, models, schemas
+from app.database import Base, SessionLocal, engine
+from app.priority_updates import priority_updater
+
+def _count_queries():
+    counter = {"n": 0}
+    def listener(*args):
+        counter["n"] += 1
+    event.listen(engine, "before_cursor_execute", listener)
+    return counter, lambda: event.remove(engine, "before_cursor_execute", listener)
+
+def test_rescore_does_not_reload_changed_ideas():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        ideas = [
+            crud.create_idea(db, schemas.IdeaCreate(
+                title=f"Площадка номер {i}", description="Описание идеи для пересчёта",
+                category="sport", latitude=54.0 + i * 1e-4, longitude=86.6
+            ))
+            for i in range(50)
+        ]
+        ids = [idea.id for idea in ideas]
+        analytics_snapshot.analytics_snapshot.get(db, 30)
+        db.execute(update(models.Idea).where(models.Idea.id.in_(ids)).values(
+            importance_score=0, social_weight=0, infrastructure_deficit=0
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    db = SessionLocal()
+    counter, stop = _count_queries()
+    try:
+        changed_before = priority_updater.stats["changed"]
+        priority_updater.rescore(db, ids)
+    finally:
+        stop()
+        db.close()
+
+    assert priority_updater.stats["changed"] - changed_before == len(ids)
+    # SELECT идей, пакетный UPDATE и служебные запросы — без SELECT на каждую идею
+    assert counter["n"] <= 5
+
+    db = SessionLocal()
+    try:
+        snapshot = analytics_snapshot.analytics_snapshot.get(db, 30)
+        assert snapshot["by_priority"] == crud.compute_analytics(db, 30)["by_priority"]
+    finally:
+        db.close()
@@ -0,0 +1,30 @@
+"""Ответы бота без очереди исходящих сообщений (TELEGRAM_QUEUE_WORKERS=0)"""
+import asyncio
+
+from app import telegram_bot, telegram_queue
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode="HTML", reply_markup=None):
+        self.sent.append((chat_id, text, reply_markup))
+        return True
+
+def test_handle_update_sends_directly_without_dispatcher(monkeypatch):
+    bot = RecordingBot()
+    monkeypatch.setattr(telegram_bot, "telegram_bot", bot)
+    monkeypatch.setattr(telegram_queue, "message_dispatcher", None)
+
+    asyncio.run(telegram_bot.handle_update({
+        "update_id": 1,
+        "message": {"chat": {"id": 42}, "text": "/start"}
+    }))
+    asyncio.run(telegram_bot.handle_update({
+        "update_id": 2,
+        "callback_query": {"data": "vote_up_1", "message": {"chat": {"id": 42}}}
+    }))
+
+    assert [chat_id for chat_id, _, _ in bot.sent] == [42, 42]
+    assert "Добро пожаловать" in bot.sent[0][1]
+    assert bot.sent[1][2] == {"remove_keyboard": True}
@@ -0,0 +1,37 @@
+"""Отправка сообщений бота в локальную заглушку Telegram API"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from telegram_stub import TelegramStub
+
+from app.telegram_bot import TelegramBot
+
+@pytest.fixture
+def stub():
+    stub = TelegramStub(port=8093, latency=0, rate_limit_every=2).start()
+    yield stub
+    stub.stop()
+
+def test_send_message_retries_after_429(stub):
+    bot = TelegramBot("0:test", api_url=stub.url)
+
+    async def run():
+        try:
+            return [
+                await bot.send_message(42, "первое"),
+                # Второй запрос получает 429 с retry_after и уходит повторно
+                await bot.send_message(42, "второе", reply_markup={"remove_keyboard": True})
+            ]
+        finally:
+            await bot.close()
+
+    assert asyncio.run(run()) == [True, True]
+    assert stub.requests_count == 3
+    assert [message["text"] for message in stub.messages] == ["первое", "второе"]
+    assert stub.messages[1]["reply_markup"] == {"remove_keyboard": True}
+    assert all(message["method"] == "sendMessage" and message["chat_id"] == 42 for message in stub.messages)
@@ -0,0 +1,35 @@
+"""Приём обновлений вебхука: update_id не теряется при ошибке записи"""
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.database import Base, SessionLocal, engine
+from app.telegram_updates import UpdateProcessor
+
+async def _noop(update):
+    pass
+
+def test_failed_register_does_not_mark_update_as_seen(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    processor = UpdateProcessor(_noop, SessionLocal, workers=1)
+    update = {"update_id": 9001, "message": {"chat": {"id": 7}, "text": "/start"}}
+
+    async def run():
+        await processor.start()
+        try:
+            def locked(update_id):
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            with monkeypatch.context() as patch:
+                patch.setattr(processor, "_register", locked)
+                with pytest.raises(OperationalError):
+                    await processor.submit(update)
+            # Повтор от Telegram принимается, а не считается дубликатом
+            assert await processor.submit(update) is True
+            assert await processor.submit(update) is False
+        finally:
+            await processor.stop()
+
+    asyncio.run(run())
+    assert processor.stats["accepted"] == 1
+    assert processor.stats["duplicates"] == 1
@@ -0,0 +1,71 @@
+"""Голоса посетителей сайта без регистрации не сливаются в один"""
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+
+from app import crud, models, schemas
+from app.api.endpoints.ideas import vote_for_idea
+from app.database import Base, SessionLocal, engine
+
+def _idea(db):
+    return crud.create_idea(db, schemas.IdeaCreate(
+        title="Лавочки у остановки", description="Поставить лавочки у остановки",
+        category="infrastructure", latitude=54.2, longitude=86.6
+    ))
+
+def test_each_visitor_vote_counts():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        idea_id = uuid.UUID(_idea(db).id)
+        visitors = [uuid.uuid4() for _ in range(3)]
+        for visitor_id in visitors:
+            vote_for_idea(idea_id, "up", None, visitor_id, db)
+        # Повторный голос того же посетителя не добавляется
+        vote_for_idea(idea_id, "down", None, visitors[0], db)
+
+        db.expire_all()
+        assert crud.get_idea(db, idea_id).votes_count == 3
+        assert db.query(models.Vote).filter(models.Vote.idea_id == str(idea_id)).count() == 3
+
+        with pytest.raises(HTTPException) as error:
+            vote_for_idea(idea_id, "up", None, None, db)
+        assert error.value.status_code == 400
+    finally:
+        db.close()
+
+def test_constraint_migration_keeps_anonymous_votes(tmp_path):
+    old_engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    Base.metadata.create_all(bind=old_engine)
+    with old_engine.begin() as connection:
+        # Таблица голосов в том виде, как до появления уникального индекса
+        connection.execute(text("DROP TABLE votes"))
+        connection.execute(text(
+            "CREATE TABLE votes (id VARCHAR(36) PRIMARY KEY, user_id VARCHAR(36) NOT NULL, "
+            "idea_id VARCHAR(36) NOT NULL, vote_type VARCHAR(10), created_at DATETIME)"
+        ))
+        connection.execute(text(
+            "INSERT INTO users (id, email, hashed_password) VALUES "
+            "('anon', :anonymous, 'x'), ('user', 'user@example.com', 'x')"
+        ), {"anonymous": crud.ANONYMOUS_EMAIL})
+        connection.execute(text(
+            "INSERT INTO ideas (id, title, category, latitude, longitude, votes_count, author_id) "
+            "VALUES ('idea', 'Идея', 'SPORT', 54.0, 86.0, 5, 'anon')"
+        ))
+        connection.execute(text(
+            "INSERT INTO votes (id, user_id, idea_id, vote_type) VALUES "
+            "('1', 'anon', 'idea', 'up'), ('2', 'anon', 'idea', 'up'), ('3', 'anon', 'idea', 'up'), "
+            "('4', 'user', 'idea', 'up'), ('5', 'user', 'idea', 'up')"
+        ))
+
+    crud.ensure_vote_constraint(old_engine)
+
+    with old_engine.connect() as connection:
+        voters = connection.execute(text("SELECT user_id FROM votes")).scalars().all()
+        votes_count = connection.execute(text("SELECT votes_count FROM ideas")).scalar()
+    # Три анонимных голоса — три разных посетителя, повтор пользователя удалён
+    assert len(voters) == len(set(voters)) == 4
+    assert votes_count == 4
+    old_engine.dispose()